@@ -49,6 +49,7 @@ def generate_fake_data():
 
         # Create 2-4 items per IP
         num_items = random.randint(2, 4)
+        items = []
         for item_no in range(1, num_items + 1):
             item_type = random.choice(types)
             bq_ref = f"BQ{random.randint(1,50):03d}" if random.random() > 0.3 else ""
@@ -60,10 +61,15 @@ def generate_fake_data():
             paid_amt = certified_amt * random.uniform(0.5, 1.0) if random.random() > 0.2 else 0
             item_remark = random.choice(remarks)
 
-            manager.add_ip_item(
-                ip_no, item_no, item_type, bq_ref, vo_ref, doc_ref,
-                description, applied_amt, certified_amt, paid_amt, item_remark
-            )
+            items.append({
+                "IP": ip_no, "Item": item_no, "Type": item_type,
+                "BQ Ref": bq_ref, "VO Ref": vo_ref, "DOC Ref": doc_ref,
+                "Description": description, "Applied Amount": applied_amt,
+                "Certified Amount": certified_amt, "Paid Amount": paid_amt, "Remark": item_remark
+            })
+
+        # Insert all items of this IP in one transaction
+        db.insert_many("Main Contract IP Item", items)
 
         # Calculate totals for this IP
         manager.calculate_ip_totals(ip_no)
@@ -0,0 +1,131 @@
+"""
+Generate a large synthetic project database for benchmarking.
+
+Builds a fresh database from Project_db_Schema.txt and fills it with a
+configurable number of trades and cost lines spread across
+"Main Contract BQ", "VO Item", "Sub Con Works", "SC VO Item" and
+"Contra Charge Item".
+
+Usage:
+    python fake_data/generate_large_db.py [db_path] [--trades 500] [--lines 200000]
+"""
+import sys
+import os
+import random
+import argparse
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from function.DB_manager import DB_Manager
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(PROJECT_ROOT, "database", "Project_db_Schema.txt")
+
+UNITS = ["m", "m2", "m3", "kg", "t", "no", "item", "sum"]
+
+# Share of the requested lines that goes to each cost table
+LINE_SPLIT = {
+    "Main Contract BQ": 0.60,
+    "VO Item": 0.15,
+    "Sub Con Works": 0.10,
+    "SC VO Item": 0.10,
+    "Contra Charge Item": 0.05,
+}
+
+
+def _insert_rows(db, table, columns, rows):
+    cols = ', '.join(f'"{c}"' for c in columns)
+    placeholders = ', '.join(['?'] * len(columns))
+    db.cursor.executemany(f'INSERT INTO "{table}" ({cols}) VALUES ({placeholders})', rows)
+
+
+def generate_large_db(db_path, trades=500, lines=200000, subcontracts=300, seed=1):
+    """Create `db_path` from the schema and populate it. Returns a dict of row counts."""
+    rnd = random.Random(seed)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    db = DB_Manager(db_path)
+    db.create_tables_from_schema(SCHEMA_PATH)
+
+    counts = {table: int(lines * share) for table, share in LINE_SPLIT.items()}
+    trade_names = [f"T{i:03d}" for i in range(1, trades + 1)]
+    sc_nos = [f"SC{i:03d}" for i in range(1, subcontracts + 1)]
+
+    _insert_rows(db, "Unit Table", ["Order", "Unit", "Description"],
+                 [(i, u, u) for i, u in enumerate(UNITS, start=1)])
+    _insert_rows(db, "Trade Budget", ["Trade", "Description", "Qty", "Unit", "Rate", "Discount Factor"],
+                 [(t, f"Trade {t}", rnd.randint(1, 500), rnd.choice(UNITS), round(rnd.uniform(100, 5000), 2), 0.0)
+                  for t in trade_names])
+    _insert_rows(db, "Sub Contract", ["Sub Contract No", "Sub Contract Name", "Company Name", "Contract Type", "Contract Sum", "Final Account Amount"],
+                 [(sc, f"Package {sc}", f"Company {sc}", "Remeasurement", 0.0, 0.0) for sc in sc_nos])
+
+    # Main Contract BQ
+    _insert_rows(db, "Main Contract BQ", ["BQ ID", "Bill", "Section", "Page", "Item", "description", "Qty", "Unit", "Rate", "Discount", "Trade", "Remark"],
+                 [(f"BQ{i:06d}", f"Bill {i % 20 + 1}", f"Section {i % 7 + 1}", f"Page {i // 25 + 1}", f"Item {i}",
+                   f"Description for item {i}", round(rnd.uniform(1, 1000), 2), rnd.choice(UNITS),
+                   round(rnd.uniform(10, 500), 2), round(rnd.choice([0, 0, 0.05, 0.1]), 2), rnd.choice(trade_names), "")
+                  for i in range(1, counts["Main Contract BQ"] + 1)])
+
+    # Main Contract VO + items
+    vo_count = max(1, counts["VO Item"] // 20)
+    _insert_rows(db, "Main Contract VO", ["VO ref", "Date", "Description", "Application Amount", "Agree"],
+                 [(f"VO{i:04d}", "2025-01-01", f"Variation {i}", 0.0, 0) for i in range(1, vo_count + 1)])
+    _insert_rows(db, "VO Item", ["VO ref", "Item", "Description", "Qty", "Unit", "Rate", "Discount", "Trade", "Agree"],
+                 [(f"VO{rnd.randint(1, vo_count):04d}", f"{i}", f"VO item {i}", round(rnd.uniform(1, 100), 2), rnd.choice(UNITS),
+                   round(rnd.uniform(10, 500), 2), 0, rnd.choice(trade_names), rnd.choice([0, 1, None]))
+                  for i in range(1, counts["VO Item"] + 1)])
+
+    # Sub Con Works
+    works = []
+    for i in range(1, counts["Sub Con Works"] + 1):
+        works.append((rnd.choice(sc_nos), f"W{i:06d}", round(rnd.uniform(1, 1000), 2), rnd.choice(UNITS),
+                      round(rnd.uniform(10, 400), 2), 0.0, rnd.choice(trade_names)))
+    _insert_rows(db, "Sub Con Works", ["Subcontract", "Works", "Qty", "Unit", "Rate", "Discount", "Trade"], works)
+
+    # Sub Contract VO + items
+    sc_vo_count = max(1, counts["SC VO Item"] // 20)
+    _insert_rows(db, "Sub Contract VO", ["VO ref", "Subcontract", "Date", "Description", "Application Amount", "Agree"],
+                 [(f"SCVO{i:04d}", rnd.choice(sc_nos), "2025-01-01", f"SC variation {i}", 0.0, 0) for i in range(1, sc_vo_count + 1)])
+    _insert_rows(db, "SC VO Item", ["VO ref", "Item", "Description", "Qty", "Unit", "Rate", "Discount", "Trade", "Agree"],
+                 [(f"SCVO{rnd.randint(1, sc_vo_count):04d}", f"{i}", f"SC VO item {i}", round(rnd.uniform(1, 100), 2), rnd.choice(UNITS),
+                   round(rnd.uniform(10, 400), 2), 0, rnd.choice(trade_names), rnd.choice([0, 1, None]))
+                  for i in range(1, counts["SC VO Item"] + 1)])
+
+    # Contra Charge + items given to works
+    cc_count = max(1, counts["Contra Charge Item"] // 10)
+    _insert_rows(db, "Contra Charge", ["CC No", "Date", "Title", "Reason", "Agree Amount", "Deduct To"],
+                 [(f"CC{i:04d}", "2025-01-01", f"Contra charge {i}", "", 0.0, rnd.choice(sc_nos)) for i in range(1, cc_count + 1)])
+    _insert_rows(db, "Contra Charge Item", ["CC No", "Description", "Qty", "Unit", "Rate", "Admin Rate", "Give to"],
+                 [(f"CC{rnd.randint(1, cc_count):04d}", f"Contra item {i}", round(rnd.uniform(1, 50), 2), rnd.choice(UNITS),
+                   round(rnd.uniform(10, 200), 2), 0.15, rnd.choice(works)[1])
+                  for i in range(1, counts["Contra Charge Item"] + 1)])
+
+    db.conn.commit()
+    db.close()
+    counts["Trade Budget"] = trades
+    counts["Sub Contract"] = subcontracts
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic QS project database")
+    parser.add_argument("db_path", nargs="?", default=os.path.join(PROJECT_ROOT, "database", "QS_Project_Large.db"))
+    parser.add_argument("--trades", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--subcontracts", type=int, default=300)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = generate_large_db(args.db_path, args.trades, args.lines, args.subcontracts)
+    elapsed = time.perf_counter() - start
+    for table, n in counts.items():
+        print(f"{table}: {n}")
+    print(f"Generated {args.db_path} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 from .DB_manager import DB_Manager
+from .Sequence_manager import Sequence_Manager
 
 class Abortive_Manager:
     def __init__(self, db_manager: DB_Manager):
         self.db = db_manager
+        self.ids = Sequence_Manager(db_manager)
 
     def add_abortive_work(self, abortive_ref, date, issue_date, coordinator, cost_imp, time_imp, inspection_date, endorsement, description):
         data = {
@@ -31,13 +33,7 @@ class Abortive_Manager:
         self.db.delete("Abortive Work Record", "\"Abortive Ref\" = ?", (abortive_ref,))
 
     def get_next_abortive_ref(self):
-        result = self.db.fetch_one("SELECT \"Abortive Ref\" FROM \"Abortive Work Record\" ORDER BY rowid DESC LIMIT 1")
-        if result:
-            last_ref = result['Abortive Ref']
-            num = int(last_ref[2:]) + 1
-        else:
-            num = 1
-        return f"AW{num:03d}"
+        return self.ids.next_ref("AW")
 
     def link_to_vo(self, vo_ref, abortive_ref, remark=""):
         data = {"VO ref": vo_ref, "Abortive Work ref": abortive_ref, "Remark": remark}
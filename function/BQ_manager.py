@@ -1,9 +1,21 @@
 from .DB_manager import DB_Manager
-import openpyxl
+from .Sequence_manager import Sequence_Manager
+from .Export_manager import Export_Manager
 
 class BQ_Manager:
+    # Filter/sort field names used by the BQ screen -> SQL column expressions
+    FILTER_FIELDS = {
+        'BQ ID': '"BQ ID"', 'Bill': 'Bill', 'Section': 'Section', 'Page': 'Page',
+        'Item': 'Item', 'Description': 'description', 'Trade': 'Trade'
+    }
+    SORT_FIELDS = {
+        'BQ ID': '"BQ ID"', 'Bill': 'Bill', 'Section': 'Section', 'Page': 'Page', 'Item': 'Item',
+        'Qty': 'COALESCE(Qty, 0)', 'Rate': 'COALESCE(Rate, 0)', 'Amount': 'COALESCE(Amount, 0)', 'Trade': 'Trade'
+    }
+
     def __init__(self, db_manager: DB_Manager):
         self.db = db_manager
+        self.ids = Sequence_Manager(db_manager)
 
     def add_bq_item(self, bq_id, bill, section, page, item, description, qty, unit, rate, discount, trade, remark):
         data = {
@@ -30,6 +42,38 @@ class BQ_Manager:
         query = '''SELECT * FROM "Main Contract BQ"'''
         return self.db.fetch_all(query)
 
+    def _bq_filter(self, filter_field, text):
+        """WHERE clause and params for a case-insensitive substring filter."""
+        column = self.FILTER_FIELDS.get(filter_field)
+        text = (text or "").strip()
+        if not column or not text:
+            return "", ()
+        escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f"WHERE {column} LIKE ? ESCAPE '\\'", (f"%{escaped}%",)
+
+    def query_bq_items(self, filter_field=None, text="", sort_field="BQ ID", ascending=True, offset=0, limit=None):
+        """
+        Filter, sort and page "Main Contract BQ" in SQL.
+        Returns (items, count, total_amount): the requested page of rows plus the row
+        count and SUM(Amount) of the whole filtered set. limit=None returns every row,
+        limit=0 only the count and total.
+        """
+        where, params = self._bq_filter(filter_field, text)
+        summary = self.db.fetch_one(
+            f'SELECT COUNT(*) AS count, COALESCE(SUM(Amount), 0) AS total FROM "Main Contract BQ" {where}', params)
+        count = summary['count'] if summary else 0
+        total = summary['total'] if summary else 0.0
+        if limit == 0:
+            return [], count, total
+
+        order = self.SORT_FIELDS.get(sort_field, '"BQ ID"')
+        direction = "ASC" if ascending else "DESC"
+        # rowid keeps rows with equal sort keys in a stable order across pages
+        query = f'''SELECT * FROM "Main Contract BQ" {where}
+                    ORDER BY {order} {direction}, rowid ASC LIMIT ? OFFSET ?'''
+        items = self.db.fetch_all(query, params + (-1 if limit is None else limit, offset))
+        return items, count, total
+
     def update_bq_item(self, bq_id, data):
         self.db.update("Main Contract BQ", data, '''"BQ ID" = ?''', (bq_id,))
 
@@ -37,90 +81,81 @@ class BQ_Manager:
         self.db.delete("Main Contract BQ", '''"BQ ID" = ?''', (bq_id,))
 
     def get_next_bq_id(self):
-        query = '''SELECT "BQ ID" FROM "Main Contract BQ" ORDER BY rowid DESC LIMIT 1'''
-        result = self.db.fetch_one(query)
-        if result:
-            last_id = result['BQ ID']
-            num = int(last_id[2:]) + 1  # Assuming format BQ001
-        else:
-            num = 1
-        return f"BQ{num:03d}"
+        return self.ids.next_ref("BQ")
 
     # Methods for import/export can be added here or in UI
 
-    def import_from_excel(self, file_path):
-        wb = openpyxl.load_workbook(file_path)
-        sheet = wb.active
-        headers = [cell.value for cell in sheet[1]]  # Assume first row is headers
-        
-        imported_count = 0
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            data = dict(zip(headers, row))
-            bq_id = data.get("BQ ID")
-            if not bq_id:
-                continue  # Skip if no BQ ID
-            
-            # Check if exists
-            existing = self.get_bq_item(bq_id)
-            if existing:
-                # Update
-                update_data = {
-                    "Bill": data.get("Bill", ""),
-                    "Section": data.get("Section", ""),
-                    "Page": data.get("Page", ""),
-                    "Item": data.get("Item", ""),
-                    "description": data.get("Description", ""),
-                    "Qty": data.get("Qty", 0),
-                    "Unit": data.get("Unit", ""),
-                    "Rate": data.get("Rate", 0),
-                    "Discount": data.get("Discount", 0),
-                    "Trade": data.get("Trade", ""),
-                    "Remark": data.get("Remark", "")
-                }
-                self.update_bq_item(bq_id, update_data)
-            else:
-                # Insert
-                self.add_bq_item(
-                    bq_id,
-                    data.get("Bill", ""),
-                    data.get("Section", ""),
-                    data.get("Page", ""),
-                    data.get("Item", ""),
-                    data.get("Description", ""),
-                    data.get("Qty", 0),
-                    data.get("Unit", ""),
-                    data.get("Rate", 0),
-                    data.get("Discount", 0),
-                    data.get("Trade", ""),
-                    data.get("Remark", "")
-                )
-            imported_count += 1
-        
-        return imported_count
-
-    def export_to_excel(self, file_path):
-        wb = openpyxl.Workbook()
-        sheet = wb.active
+    def _bq_row(self, data):
+        """Map a workbook row (by header) to "Main Contract BQ" columns."""
+        return {
+            "BQ ID": data.get("BQ ID"),
+            "Bill": data.get("Bill", ""),
+            "Section": data.get("Section", ""),
+            "Page": data.get("Page", ""),
+            "Item": data.get("Item", ""),
+            "description": data.get("Description", ""),
+            "Qty": data.get("Qty", 0),
+            "Unit": data.get("Unit", ""),
+            "Rate": data.get("Rate", 0),
+            "Discount": data.get("Discount", 0),
+            "Trade": data.get("Trade", ""),
+            "Remark": data.get("Remark", "")
+        }
+
+    def import_from_excel(self, file_path, progress=None, chunk_size=5000):
+        """
+        Stream a BQ workbook into "Main Contract BQ".
+        The sheet is read row by row (read_only, values_only) and upserted in chunks of
+        chunk_size rows, each chunk in its own transaction, so memory stays bounded and
+        other users are not locked out for the whole import.
+        progress(done, total) is called after each chunk; total is the sheet's row count
+        from its dimensions (None if the file does not record them).
+        Returns the number of rows imported.
+        """
+        import openpyxl  # loaded on first import, not at application start
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = wb.active
+            rows = sheet.iter_rows(values_only=True)
+            headers = list(next(rows, None) or [])  # Assume first row is headers
+            total = sheet.max_row - 1 if sheet.max_row else None
+
+            imported = 0
+            chunk = []
+            for row in rows:
+                data = dict(zip(headers, row))
+                if not data.get("BQ ID"):
+                    continue  # Skip if no BQ ID
+                chunk.append(self._bq_row(data))
+                if len(chunk) >= chunk_size:
+                    imported += self._upsert_chunk(chunk, imported)
+                    chunk = []
+                    if progress:
+                        progress(imported, total)
+            if chunk:
+                imported += self._upsert_chunk(chunk, imported)
+            # The sheet brings its own BQ IDs: new items added after it must not reuse them
+            self.ids.sync("BQ")
+            if progress:
+                progress(imported, imported)
+            return imported
+        finally:
+            wb.close()
+
+    def _upsert_chunk(self, chunk, imported):
+        # Insert new items and update existing ones; ON CONFLICT resolves existing BQ IDs in SQL
+        if self.db.upsert_many("Main Contract BQ", chunk, ["BQ ID"]) is None:
+            raise RuntimeError(f"Failed to import BQ items after {imported} rows were saved")
+        return len(chunk)
+
+    def export_to_excel(self, file_path, progress=None):
+        """
+        Stream every BQ item from the database into a write-only workbook. Returns the row count.
+        progress(done, total) as in Export_Manager.write.
+        """
         headers = ["BQ ID", "Bill", "Section", "Page", "Item", "Description", "Qty", "Unit", "Rate", "Discount", "Trade", "Remark"]
-        sheet.append(headers)
-        
-        items = self.get_all_bq_items()
-        for item in items:
-            row = [
-                item.get("BQ ID", ""),
-                item.get("Bill", ""),
-                item.get("Section", ""),
-                item.get("Page", ""),
-                item.get("Item", ""),
-                item.get("description", ""),
-                item.get("Qty", ""),
-                item.get("Unit", ""),
-                item.get("Rate", ""),
-                item.get("Discount", ""),
-                item.get("Trade", ""),
-                item.get("Remark", "")
-            ]
-            sheet.append(row)
-        
-        wb.save(file_path)
-        return len(items)
\ No newline at end of file
+        query = '''SELECT "BQ ID", Bill, Section, Page, Item, description, Qty, Unit, Rate, Discount, Trade, Remark
+                   FROM "Main Contract BQ" ORDER BY rowid'''
+        total = self.db.fetch_one('SELECT COUNT(*) AS count FROM "Main Contract BQ"') if progress else None
+        sheet = Export_Manager.sheet("Sheet", headers, self.db.iter_query(query), total=total['count'] if total else None)
+        return Export_Manager().write(file_path, [sheet], progress=progress)
@@ -1,6 +1,5 @@
 from .DB_manager import DB_Manager
-import pandas as pd
-import os
+from .Export_manager import Export_Manager
 
 class Budget_Manager:
     def __init__(self, db_manager: DB_Manager):
@@ -72,42 +71,77 @@ class Budget_Manager:
             "Budget Variance (Budget - Expense)": budget_amount - expense
         }
 
-    def get_budget_analysis(self, trade):
-        """Return detailed figures for analysis display.
-        Fields returned:
-          - main_bq, vo_agreed, vo_potential
-          - sc_works, sc_vo_agreed, sc_vo_potential, contra_charge
-          - total_income, total_expense, net_profit
+    # One grouped pass per source table; every branch yields (Source, Trade, Total, Potential).
+    # Potential is only meaningful for the VO tables (items not yet agreed).
+    TRADE_TOTALS_QUERY = '''
+        SELECT 'main_bq' AS Source, Trade, SUM(Amount) AS Total, 0 AS Potential
+        FROM "Main Contract BQ" {where} GROUP BY Trade
+        UNION ALL
+        SELECT 'vo', Trade,
+               SUM(CASE WHEN Agree = 1 THEN Amount END),
+               SUM(CASE WHEN Agree IS NULL OR Agree = 0 THEN Amount END)
+        FROM "VO Item" {where} GROUP BY Trade
+        UNION ALL
+        SELECT 'sc_works', Trade, SUM(Amount), 0
+        FROM "Sub Con Works" {where} GROUP BY Trade
+        UNION ALL
+        SELECT 'sc_vo', Trade,
+               SUM(CASE WHEN Agree = 1 THEN Amount END),
+               SUM(CASE WHEN Agree IS NULL OR Agree = 0 THEN Amount END)
+        FROM "SC VO Item" {where} GROUP BY Trade
+        UNION ALL
+        SELECT 'contra_charge', s.Trade, SUM(c.Qty * (c.Rate + COALESCE(c."Admin Rate",0))), 0
+        FROM "Contra Charge Item" c
+        JOIN "Sub Con Works" s ON c."Give to" = s.Works
+        {contra_where} GROUP BY s.Trade
+    '''
+
+    def get_trade_totals(self, trade=None):
+        """Return raw income/expense totals keyed by trade, computed with grouped SQL.
+        All trades are aggregated in a single statement; pass `trade` to restrict it to one.
+        Each value is a dict with main_bq, vo_agreed, vo_potential, sc_works,
+        sc_vo_agreed, sc_vo_potential and contra_charge (missing figures are 0).
         """
-        # Income
-        row = self.db.fetch_one('SELECT SUM(Amount) as Total FROM "Main Contract BQ" WHERE Trade = ?', (trade,))
-        main_bq = row['Total'] if row and row['Total'] else 0
-
-        row = self.db.fetch_one('SELECT SUM(Amount) as Total FROM "VO Item" WHERE Trade = ? AND Agree = 1', (trade,))
-        vo_agreed = row['Total'] if row and row['Total'] else 0
-
-        row = self.db.fetch_one('SELECT SUM(Amount) as Total FROM "VO Item" WHERE Trade = ? AND (Agree IS NULL OR Agree = 0)', (trade,))
-        vo_potential = row['Total'] if row and row['Total'] else 0
+        if trade is None:
+            query = self.TRADE_TOTALS_QUERY.format(where='', contra_where='')
+            params = ()
+        else:
+            query = self.TRADE_TOTALS_QUERY.format(where='WHERE Trade = ?', contra_where='WHERE s.Trade = ?')
+            params = (trade,) * 5
+
+        totals = {}
+        for row in self.db.fetch_all(query, params):
+            t = totals.setdefault(row['Trade'], {
+                "main_bq": 0, "vo_agreed": 0, "vo_potential": 0,
+                "sc_works": 0, "sc_vo_agreed": 0, "sc_vo_potential": 0,
+                "contra_charge": 0
+            })
+            total = row['Total'] or 0
+            potential = row['Potential'] or 0
+            source = row['Source']
+            if source == 'vo':
+                t['vo_agreed'] = total
+                t['vo_potential'] = potential
+            elif source == 'sc_vo':
+                t['sc_vo_agreed'] = total
+                t['sc_vo_potential'] = potential
+            else:
+                t[source] = total
+        return totals
+
+    @staticmethod
+    def _build_analysis(totals):
+        """Derive the analysis figures from the raw trade totals."""
+        t = totals or {}
+        main_bq = t.get('main_bq', 0)
+        vo_agreed = t.get('vo_agreed', 0)
+        vo_potential = t.get('vo_potential', 0)
+        sc_works = t.get('sc_works', 0)
+        sc_vo_agreed = t.get('sc_vo_agreed', 0)
+        sc_vo_potential = t.get('sc_vo_potential', 0)
+        contra_charge = t.get('contra_charge', 0)
 
         total_income = main_bq + vo_agreed
-
-        # Expense
-        row = self.db.fetch_one('SELECT SUM(Amount) as Total FROM "Sub Con Works" WHERE Trade = ?', (trade,))
-        sc_works = row['Total'] if row and row['Total'] else 0
-
-        row = self.db.fetch_one('SELECT SUM(Amount) as Total FROM "SC VO Item" WHERE Trade = ? AND Agree = 1', (trade,))
-        sc_vo_agreed = row['Total'] if row and row['Total'] else 0
-
-        row = self.db.fetch_one('SELECT SUM(Amount) as Total FROM "SC VO Item" WHERE Trade = ? AND (Agree IS NULL OR Agree = 0)', (trade,))
-        sc_vo_potential = row['Total'] if row and row['Total'] else 0
-
-        # Contra Charge: join on Give to (works) matching sub con works where trade = ?
-        row = self.db.fetch_one('''SELECT SUM(c.Qty * (c.Rate + COALESCE(c."Admin Rate",0))) as Total
-                                    FROM "Contra Charge Item" c
-                                    JOIN "Sub Con Works" s ON c."Give to" = s.Works
-                                    WHERE s.Trade = ?''', (trade,))
-        contra_charge = row['Total'] if row and row['Total'] else 0
-
         # Contra Charge reduces the total expense (it's a deduction/credit)
         total_expense = sc_works + sc_vo_agreed - contra_charge
         net_profit = total_income - total_expense
@@ -125,13 +159,25 @@ class Budget_Manager:
             "net_profit": net_profit
         }
 
+    def get_budget_analysis(self, trade):
+        """Return detailed figures for analysis display.
+        Fields returned:
+          - main_bq, vo_agreed, vo_potential
+          - sc_works, sc_vo_agreed, sc_vo_potential, contra_charge
+          - total_income, total_expense, net_profit
+        """
+        totals = self.get_trade_totals(trade)
+        return self._build_analysis(totals.get(trade))
+
     def get_all_budget_analysis(self):
         """Return list of analysis dicts for every trade."""
         trades = self.get_all_trade_budgets()
+        # Aggregate every trade in one grouped pass instead of querying per trade
+        totals = self.get_trade_totals()
         rows = []
         for t in trades:
             trade = t['Trade']
-            a = self.get_budget_analysis(trade)
+            a = self._build_analysis(totals.get(trade))
             expected = a['total_income'] + a['vo_potential'] - (a['total_expense'] + a['sc_vo_potential'])
             rows.append({
                 'Trade': trade,
@@ -149,39 +195,21 @@ class Budget_Manager:
             })
         return rows
 
-    def export_analysis_to_excel(self, file_path):
-        """Export analysis for every trade to an Excel file (tabular format)."""
+    def export_analysis_to_excel(self, file_path, progress=None):
+        """Export analysis for every trade to an Excel file (tabular format). progress as in Export_Manager.write."""
         rows = self.get_all_budget_analysis()
-        df = pd.DataFrame(rows)
+        headers = list(rows[0].keys()) if rows else ['Trade']
         # Make Contra Charge a negative value to reflect deduction
-        if 'Contra Charge' in df.columns:
-            df['Contra Charge'] = -df['Contra Charge']
-
-        # Ensure output directory exists
-        out_dir = os.path.dirname(file_path)
-        if out_dir and not os.path.exists(out_dir):
-            os.makedirs(out_dir, exist_ok=True)
-
-        # Write to Excel with formatting (parentheses for negatives)
-        try:
-            with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-                df.to_excel(writer, index=False, sheet_name='Budget Analysis')
-                workbook = writer.book
-                worksheet = writer.sheets['Budget Analysis']
-
-                # Number format with parentheses for negatives
-                money_fmt = workbook.add_format({'num_format': '_(* #,##0.00_);_(* (#,##0.00);_(* "-"??_);_(@_)'})
-                # Apply to all monetary columns (heuristic by column name)
-                money_cols = [i for i, c in enumerate(df.columns) if c.lower() != 'trade' and c not in ['Expected Total Profit/Loss']]
-                # Set column widths and formats
-                for idx, col in enumerate(df.columns):
-                    width = max(12, min(30, max(df[col].astype(str).map(len).max() + 2, len(col) + 2)))
-                    worksheet.set_column(idx, idx, width)
-                    if idx in money_cols:
-                        worksheet.set_column(idx, idx, width, money_fmt)
-        except Exception:
-            # Fall back to simple write if xlsxwriter not available
-            df.to_excel(file_path, index=False, sheet_name='Budget Analysis')
+        for row in rows:
+            if 'Contra Charge' in row:
+                row['Contra Charge'] = -row['Contra Charge']
+
+        # Parentheses for negatives on the monetary columns
+        money_cols = [i for i, c in enumerate(headers) if c.lower() != 'trade' and c not in ['Expected Total Profit/Loss']]
+        widths = [max(12, min(30, max([len(str(r[c])) for r in rows] + [len(c)]) + 2)) for c in headers]
+        sheet = Export_Manager.sheet('Budget Analysis', headers, ([r[c] for c in headers] for r in rows),
+                                     money_columns=money_cols, widths=widths, total=len(rows))
+        Export_Manager().write(file_path, [sheet], progress=progress)
         return file_path
 
     def get_cashflow_client(self):
@@ -205,151 +233,112 @@ class Budget_Manager:
             })
         return rows, total_paid
 
+    # Payment dates are stored as ISO text ('YYYY-MM-DD'), so the month is the first 7 chars.
+    # Grouping happens in NumPy: a SQL GROUP BY over the month expression needs a sort.
+    SC_PAYMENTS_QUERY = '''SELECT "Sub Contract No", substr("Payment Date", 1, 7), COALESCE("Paid Amount", 0)
+                            FROM "Sub Contract IP Application" WHERE "Payment Date" IS NOT NULL'''
+    CLIENT_PAYMENTS_QUERY = '''SELECT substr("Payment Date", 1, 7), COALESCE("Paid Amount", 0)
+                                FROM "Main Contract IP Application" WHERE "Payment Date" IS NOT NULL'''
+
+    @staticmethod
+    def _month_key(month):
+        """'YYYY-MM' -> (year, month), or None for dates that are not ISO text."""
+        try:
+            year, mon = month.split('-')
+            return (int(year), int(mon)) if len(year) == 4 and 1 <= int(mon) <= 12 else None
+        except (AttributeError, ValueError):
+            return None
+
+    def _fetch_rows(self, query):
+        cursor = self.db.read_query(query)
+        return cursor.fetchall() if cursor else []
+
+    def get_cashflow_matrix(self):
+        """
+        Accumulated paid amounts as NumPy arrays over the months with any client or
+        subcontract payment.
+        Returns a dict with 'months' (mm/yy labels), 'subcontracts' ([(no, name)]),
+        'paid' (months x subcontracts, accumulated), 'total' (accumulated paid to all
+        subcontractors), 'client' (accumulated paid by the client) and 'net'
+        (client - total, the net cash position).
+        """
+        import numpy as np  # loaded on first use, not at application start
+        scs = self.db.fetch_all('SELECT "Sub Contract No" as sc_no FROM "Sub Contract" ORDER BY "Sub Contract No"')
+        sc_index = {s['sc_no']: i for i, s in enumerate(scs)}
+        sc_paid = [p for p in self._fetch_rows(self.SC_PAYMENTS_QUERY) if p[0] in sc_index]
+        client_paid = self._fetch_rows(self.CLIENT_PAYMENTS_QUERY)
+
+        keys = {m: self._month_key(m) for m in {p[1] for p in sc_paid} | {p[0] for p in client_paid}}
+        months = sorted((m for m, key in keys.items() if key), key=keys.get)
+        month_index = {m: i for i, m in enumerate(months)}
+        n_months, n_scs = len(months), len(scs)
+
+        # Sum each (month, subcontract) cell with one bincount over the flattened matrix,
+        # then take running totals down the month axis
+        sc_paid = [p for p in sc_paid if p[1] in month_index]
+        cells = np.fromiter((month_index[p[1]] * n_scs + sc_index[p[0]] for p in sc_paid), dtype=np.intp, count=len(sc_paid))
+        amounts = np.fromiter((p[2] for p in sc_paid), dtype=float, count=len(sc_paid))
+        paid = np.bincount(cells, weights=amounts, minlength=n_months * n_scs).reshape(n_months, n_scs).cumsum(axis=0)
+
+        client_paid = [p for p in client_paid if p[0] in month_index]
+        client = np.bincount(np.fromiter((month_index[p[0]] for p in client_paid), dtype=np.intp, count=len(client_paid)),
+                             weights=np.fromiter((p[1] for p in client_paid), dtype=float, count=len(client_paid)),
+                             minlength=n_months).cumsum()
+        total = paid.sum(axis=1)
+        return {
+            "months": [f"{m[5:7]}/{m[2:4]}" for m in months],
+            "subcontracts": [(s['sc_no'], s.get('sc_name', '')) for s in scs],
+            "paid": paid, "total": total, "client": client, "net": client - total
+        }
+
     def get_cashflow_subcontracts(self):
         """Return a pivoted monthly accumulated paid amount table for all subcontracts.
-        Returns: (months_sorted, subcontract_list, rows)
-        where rows is a list of dicts with 'Month' and subcontract keys and 'Total'.
+        Returns: (months_sorted, subcontract_list, rows, total_paid_sc)
+        where rows is a list of dicts with 'Month', subcontract keys, 'Total',
+        'Client Paid' (accumulated) and 'Net Cash' (client paid - Total).
         """
-        # Get all subcontracts
-        scs = self.db.fetch_all('SELECT "Sub Contract No" as sc_no FROM "Sub Contract" ORDER BY "Sub Contract No"')
-        subcontract_list = [s['sc_no'] for s in scs]
-
-        # Collect payments by month and subcontract
-        payments = self.db.fetch_all('SELECT "Sub Contract No" as sc_no, "Payment Date" as PaymentDate, "Paid Amount" as Paid FROM "Sub Contract IP Application" WHERE "Payment Date" IS NOT NULL')
-        from collections import defaultdict
-        monthly = defaultdict(lambda: defaultdict(float))
-        for p in payments:
-            date = p.get('PaymentDate')
-            sc = p.get('sc_no')
-            paid = p.get('Paid') or 0
-            if not date or not sc:
-                continue
-            # Parse month key as mm/yy
-            try:
-                import datetime as _dt
-                dt = _dt.datetime.fromisoformat(date)
-                key = dt.strftime('%m/%y')
-            except Exception:
-                # fallback: try YYYY-MM-DD split
-                try:
-                    parts = str(date).split('-')
-                    key = f"{parts[1]}/{parts[0][2:]}"
-                except Exception:
-                    continue
-            monthly[key][sc] += paid
-
-        # Sort months
-        months = sorted(monthly.keys(), key=lambda x: (int(x.split('/')[1]), int(x.split('/')[0])))
-
-        # Build cumulative sums per subcontract
-        cum = {sc: 0.0 for sc in subcontract_list}
+        cf = self.get_cashflow_matrix()
+        sc_nos = [no for no, _ in cf["subcontracts"]]
         rows = []
-        for m in months:
-            row = {'Month': m}
-            total = 0.0
-            for sc in subcontract_list:
-                cum[sc] += monthly[m].get(sc, 0.0)
-                row[sc] = cum[sc]
-                total += row[sc]
+        for month, paid, total, client, net in zip(cf["months"], cf["paid"].tolist(), cf["total"].tolist(),
+                                                  cf["client"].tolist(), cf["net"].tolist()):
+            row = {'Month': month}
+            row.update(zip(sc_nos, paid))
             row['Total'] = total
+            row['Client Paid'] = client
+            row['Net Cash'] = net
             rows.append(row)
 
         # Final total paid to subcontractors (accumulated latest month total)
         total_paid_sc = rows[-1]['Total'] if rows else 0.0
         # Return subcontract list as tuples (no, name) for UI header labels
-        result = (months, [(s['sc_no'], s.get('sc_name', '')) for s in scs], rows, total_paid_sc)
-        return result
+        return cf["months"], cf["subcontracts"], rows, total_paid_sc
 
-    def export_cashflow_to_excel(self, file_path):
-        """Export client and subcontract cashflow tables to an Excel file with number formatting."""
+    def export_cashflow_to_excel(self, file_path, progress=None):
+        """
+        Export client and subcontract cashflow tables to an Excel file with number formatting.
+        progress as in Export_Manager.write.
+        """
         client_rows, total_paid_client = self.get_cashflow_client()
         months, sc_list, sc_rows, total_paid_sc = self.get_cashflow_subcontracts()
 
-        # Build DataFrames
-        df_client = pd.DataFrame(client_rows)
-        # ensure column order
-        if not df_client.empty:
-            df_client = df_client[['Date', 'IP', 'Applied Amount', 'Certified Amount', 'Paid Amount']]
-
-        # Subcontract DF: rows is list of dicts with Month, SC columns and Total
-        df_sc = pd.DataFrame(sc_rows)
-        # Reorder columns: Month, Total, then SCs
-        sc_cols = [sc_no for sc_no, _ in sc_list]
-        cols = ['Month', 'Total'] + sc_cols
-        # If df_sc empty, create empty with headers
-        if df_sc.empty:
-            df_sc = pd.DataFrame(columns=cols)
-        else:
-            df_sc = df_sc[cols]
-
-        # Ensure output directory exists
-        out_dir = os.path.dirname(file_path)
-        if out_dir and not os.path.exists(out_dir):
-            os.makedirs(out_dir, exist_ok=True)
-
-        try:
-            with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-                workbook = writer.book
-                # Write client sheet
-                df_client.to_excel(writer, index=False, sheet_name='Client Cash Flow')
-                ws_client = writer.sheets['Client Cash Flow']
-
-                # Write subcontract sheet
-                # Build header with names: 'SCno' on first line and '(name)' on second line
-                sc_header_names = [f"{no}\n({name})" if name else no for no, name in sc_list]
-                # Assign display headers
-                df_sc.columns = ['Month', 'Total'] + sc_header_names
-                df_sc.to_excel(writer, index=False, sheet_name='Subcontract Cash Flow')
-                ws_sc = writer.sheets['Subcontract Cash Flow']
-
-                # Formats
-                money_fmt = workbook.add_format({'num_format': '_(* #,##0.00_);_(* (#,##0.00);_(* "-"??_);_(@_)', 'align': 'right'})
-                header_fmt = workbook.add_format({'bold': True, 'text_wrap': True, 'align': 'center'})
-                red_money = workbook.add_format({'num_format': '_(* #,##0.00_);_(* (#,##0.00);_(* "-"??_);_(@_)', 'font_color': 'red', 'align': 'right'})
-
-                # Apply formatting to client sheet columns and set widths
-                import pandas as _pd
-                def autofit_and_format(ws, df):
-                    for idx, col in enumerate(df.columns):
-                        col_vals = df[col].astype(str).map(len)
-                        maxlen = max(col_vals.max() if not df.empty else 0, len(str(col))) + 2
-                        ws.set_column(idx, idx, min(maxlen, 50))
-                        # if column is numeric, apply money_fmt
-                        try:
-                            if _pd.api.types.is_numeric_dtype(df[col]):
-                                ws.set_column(idx, idx, min(maxlen, 50), money_fmt)
-                        except Exception:
-                            pass
-
-                autofit_and_format(ws_client, df_client)
-                # Set wrapped header row on SC sheet to respect newline
-                ws_sc.set_row(0, None, header_fmt)
-                autofit_and_format(ws_sc, df_sc)
-
-                # Add subtotal / total rows on Subcontract sheet
-                # Find last row index (1-based header + rows)
-                start_row = 1 + len(df_sc)
-                # Write subtotal line
-                subtotal_label = 'Total Payment to Subcontractor'
-                ws_sc.write(start_row, 0, subtotal_label, header_fmt)
-                # subtotal color red if negative
-                if total_paid_sc < 0:
-                    ws_sc.write(start_row, 1, total_paid_sc, red_money)
-                else:
-                    ws_sc.write(start_row, 1, total_paid_sc, money_fmt)
-                # Write Total Cash Flow (client total - subcontract total) below
-                total_cash_flow = total_paid_client - total_paid_sc
-                total_label = 'Total Cash Flow'
-                ws_sc.write(start_row + 2, 0, total_label, header_fmt)
-                # Format negative in parentheses is handled by money_fmt
-                if total_cash_flow < 0:
-                    ws_sc.write(start_row + 2, 1, total_cash_flow, red_money)
-                else:
-                    ws_sc.write(start_row + 2, 1, total_cash_flow, money_fmt)
-
-        except Exception:
-            # Fallback - write simple excel without formatting
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                df_client.to_excel(writer, index=False, sheet_name='Client Cash Flow')
-                df_sc.to_excel(writer, index=False, sheet_name='Subcontract Cash Flow')
+        client_cols = ['Date', 'IP', 'Applied Amount', 'Certified Amount', 'Paid Amount']
+        client_widths = [max(12, min(50, max([len(str(r.get(c))) for r in client_rows] + [len(c)]) + 2)) for c in client_cols]
+        client_sheet = Export_Manager.sheet(
+            'Client Cash Flow', client_cols, ([r.get(c) for c in client_cols] for r in client_rows),
+            money_columns=[2, 3, 4], widths=client_widths, total=len(client_rows))
+
+        # Reorder columns: Month, Total, Net Cash, then SCs
+        sc_cols = ['Month', 'Total', 'Net Cash'] + [sc_no for sc_no, _ in sc_list]
+        # Header with names: 'SCno' on first line and '(name)' on second line
+        sc_headers = ['Month', 'Total', 'Net Cash'] + [f"{no}\n({name})" if name else no for no, name in sc_list]
+        # Total Cash Flow = client total - subcontract total, shown red when negative
+        total_cash_flow = total_paid_client - total_paid_sc
+        sc_sheet = Export_Manager.sheet(
+            'Subcontract Cash Flow', sc_headers, ([r.get(c, 0.0) for c in sc_cols] for r in sc_rows),
+            money_columns=range(1, len(sc_cols)), wrap_header=True,
+            widths=[max(12, min(50, len(h) + 2)) for h in sc_cols], total=len(sc_rows),
+            footer=[('Total Payment to Subcontractor', total_paid_sc), None, ('Total Cash Flow', total_cash_flow)])
+
+        Export_Manager().write(file_path, [client_sheet, sc_sheet], progress=progress)
         return file_path
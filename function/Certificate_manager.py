@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import time
+import datetime
+from .DB_manager import DB_Manager
+from .Excel_manager import Excel_Template
+
+
+class Certificate_Manager:
+    """
+    Interim payment certificates for subcontracts, rendered from an Excel template.
+
+    The template names the cells it wants with defined names (see FIELDS) and a
+    one-row "Items" block for the IP items; names a template does not define are
+    skipped. create_default_template() writes a plain template with every name.
+    generate_certificates() renders one workbook per subcontract for a period on a
+    process pool, each worker with its own read-only connection.
+    """
+    # Defined name -> column of the certificate header query
+    FIELDS = {
+        "SubContractNo": "Sub Contract No", "SubContractName": "Sub Contract Name", "CompanyName": "Company Name",
+        "ContractSum": "Contract Sum", "IP": "IP", "DraftDate": "Draft Date", "IssueDate": "Issue Date",
+        "ApprovedDate": "Approved Date", "PaymentDate": "Payment Date",
+        "AccumulatedApplied": "Accumulated Applied Amount", "PreviousApplied": "Previous Applied Amount",
+        "ThisApplied": "This Applied Amount", "Certified": "Certified Amount", "Paid": "Paid Amount", "Remark": "Remark"
+    }
+    ITEMS_NAME = "Items"
+    ITEM_COLUMNS = ["Item", "Type", "Ref", "Description", "Applied Amount", "Certified Amount", "Paid Amount", "Remark"]
+
+    HEADER_QUERY = '''SELECT a.*, s."Sub Contract Name", s."Company Name", s."Contract Sum"
+                      FROM "Sub Contract IP Application" a
+                      LEFT JOIN "Sub Contract" s ON s."Sub Contract No" = a."Sub Contract No"
+                      WHERE a."Sub Contract No" = ? AND a.IP = ?'''
+    ITEMS_QUERY = '''SELECT Item, Type, COALESCE(NULLIF("Contract Work ref", ''), NULLIF("VO ref", ''),
+                                                  NULLIF("Contra Charge ref", '')) AS Ref, Description,
+                            "Applied Amount", "Certified Amount", "Paid Amount", Remark
+                     FROM "Sub Contract IP Item" WHERE "Sub Contract No" = ? AND IP = ? ORDER BY Item'''
+    # Each subcontract's latest IP drafted (else issued/approved) in the period ('YYYY-MM')
+    PERIOD_QUERY = '''SELECT "Sub Contract No" AS sc_no, MAX(IP) AS ip FROM "Sub Contract IP Application"
+                      WHERE substr(COALESCE(NULLIF("Draft Date", ''), NULLIF("Issue Date", ''), NULLIF("Approved Date", '')), 1, 7) = ?
+                      GROUP BY "Sub Contract No" ORDER BY "Sub Contract No"'''
+
+    def __init__(self, db_manager: DB_Manager):
+        self.db = db_manager
+
+    def get_period_certificates(self, period):
+        """[(sub_contract_no, ip_no)] to certify for a 'YYYY-MM' period."""
+        if not re.fullmatch(r"\d{4}-\d{2}", str(period or "")):
+            raise ValueError(f"Period must be 'YYYY-MM', got {period!r}")
+        return [(r['sc_no'], r['ip']) for r in self.db.fetch_all(self.PERIOD_QUERY, (period,))]
+
+    def get_certificate_data(self, sub_contract_no, ip_no):
+        """data_map for one certificate: FIELDS by defined name plus the "Items" rows. None if the IP does not exist."""
+        header = self.db.fetch_one(self.HEADER_QUERY, (sub_contract_no, ip_no))
+        if not header:
+            return None
+        data = {name: header.get(column) for name, column in self.FIELDS.items()}
+        cursor = self.db.read_query(self.ITEMS_QUERY, (sub_contract_no, ip_no))
+        data[self.ITEMS_NAME] = [tuple(row) for row in cursor.fetchall()] if cursor else []
+        return data
+
+    @staticmethod
+    def certificate_file(sub_contract_no, ip_no):
+        safe = re.sub(r'[^\w.-]+', '_', str(sub_contract_no))
+        return f"{safe}_IP{int(ip_no):02d}.xlsx"
+
+    def generate_certificates(self, period, template_path, out_dir, workers=None, progress=None):
+        """
+        Render a certificate for every subcontract with an IP in `period` into out_dir and
+        write out_dir/manifest.json (files, status and seconds per certificate).
+        workers: process count (default: CPU count, at most 8); 0 renders in this process.
+        progress(done, total) is called as certificates finish; if it raises, pending
+        certificates are cancelled and the exception propagates.
+        Returns the manifest dict.
+        """
+        jobs = [(sc_no, ip_no, os.path.join(out_dir, self.certificate_file(sc_no, ip_no)))
+                for sc_no, ip_no in self.get_period_certificates(period)]
+        os.makedirs(out_dir, exist_ok=True)
+        if workers is None:
+            workers = min(os.cpu_count() or 1, 8)
+        workers = min(workers, len(jobs))
+
+        start = time.perf_counter()
+        results = []
+        if workers <= 1:
+            _init_worker(self.db.db_path, self.db.profile, template_path)
+            try:
+                for job in jobs:
+                    results.append(_render_certificate(job))
+                    if progress:
+                        progress(len(results), len(jobs))
+            finally:
+                _worker.pop("db").close()
+        else:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            # spawn: a forked child would inherit the parent's open connection and Qt threads
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(self.db.db_path, self.db.profile, template_path)) as pool:
+                futures = [pool.submit(_render_certificate, job) for job in jobs]
+                try:
+                    for future in as_completed(futures):
+                        results.append(future.result())
+                        if progress:
+                            progress(len(results), len(jobs))
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+        order = {job[2]: i for i, job in enumerate(jobs)}
+        results.sort(key=lambda r: order[r["file"]])
+        manifest = {
+            "period": period,
+            "template": os.path.abspath(template_path),
+            "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+            "workers": workers,
+            "count": len(results),
+            "failed": sum(1 for r in results if r["status"] != "ok"),
+            "seconds": round(time.perf_counter() - start, 3),
+            "certificates": [dict(r, file=os.path.basename(r["file"])) for r in results]
+        }
+        with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    @classmethod
+    def create_default_template(cls, path):
+        """Write a plain certificate template that defines every FIELDS name and the Items block."""
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Border, Side
+        from openpyxl.workbook.defined_name import DefinedName
+
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Certificate"
+        ws["A1"] = "Interim Payment Certificate"
+        ws["A1"].font = Font(bold=True, size=14)
+        ws.merge_cells("A1:H1")
+        row = 3
+        for name, column in cls.FIELDS.items():
+            ws.cell(row, 1, column).font = Font(bold=True)
+            wb.defined_names[name] = DefinedName(name, attr_text=f"Certificate!$C${row}")
+            if column.endswith("Amount") or column == "Contract Sum":
+                ws.cell(row, 3).number_format = '#,##0.00'
+            row += 1
+
+        header_row, item_row = row + 1, row + 2
+        thin = Border(bottom=Side(style='thin'))
+        for col, title in enumerate(cls.ITEM_COLUMNS, start=1):
+            ws.cell(header_row, col, title).font = Font(bold=True)
+            ws.cell(item_row, col).border = thin
+            if title.endswith("Amount"):
+                ws.cell(item_row, col).number_format = '#,##0.00'
+        wb.defined_names[cls.ITEMS_NAME] = DefinedName(cls.ITEMS_NAME, attr_text=f"Certificate!$A${item_row}:$H${item_row}")
+        total_row = item_row + 2
+        ws.cell(total_row, 4, "Total").font = Font(bold=True)
+        for col in (5, 6, 7):
+            letter = "EFG"[col - 5]
+            cell = ws.cell(total_row, col, f"=SUM({letter}{item_row}:{letter}{item_row})")
+            cell.font = Font(bold=True)
+            cell.number_format = '#,##0.00'
+        for letter, width in zip("ABCDEFGH", (26, 10, 16, 40, 16, 16, 16, 24)):
+            ws.column_dimensions[letter].width = width
+        wb.save(path)
+        return path
+
+
+# Process pool workers: one read-only connection and one parsed template per process
+_worker = {}
+
+
+def _init_worker(db_path, profile, template_path):
+    db = DB_Manager(db_path, query_only=True, profile=profile)
+    template = Excel_Template(template_path)
+    wb = template.copy()
+    names = set(wb.defined_names)
+    for ws in wb.worksheets:
+        names.update(ws.defined_names)
+    _worker.update(db=db, manager=Certificate_Manager(db), template=template, names=names)
+
+
+def _render_certificate(job):
+    sc_no, ip_no, output_path = job
+    start = time.perf_counter()
+    result = {"sub_contract_no": sc_no, "ip": ip_no, "file": output_path, "status": "ok", "error": None}
+    try:
+        data = _worker["manager"].get_certificate_data(sc_no, ip_no)
+        if data is None:
+            raise LookupError(f"IP {ip_no} of {sc_no} not found")
+        result["items"] = len(data[Certificate_Manager.ITEMS_NAME])
+        _worker["template"].save(output_path, {k: v for k, v in data.items() if k in _worker["names"]})
+    except Exception as e:
+        result.update(status="error", error=str(e))
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
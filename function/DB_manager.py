@@ -1,26 +1,131 @@
 import sqlite3
 import os
 import time
+import itertools
+import functools
+from contextlib import contextmanager
+
+
+def _row_count(result):
+    """Rows returned or written by a DB_Manager call, for the profiler (None if unknown)."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return 1
+    if isinstance(result, int):
+        return result
+    rowcount = getattr(result, "rowcount", -1)
+    return rowcount if rowcount is not None and rowcount >= 0 else None
+
+
+def _profiled(method):
+    """Time a statement method with DB_Manager.profiler when one is enabled; a nested call
+    (fetch_all -> read_query) is counted once, by the outer method."""
+    @functools.wraps(method)
+    def wrapper(self, query, params=(), *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None or self._profiling:
+            return method(self, query, params, *args, **kwargs)
+        self._profiling = True
+        start = time.perf_counter()
+        result = None
+        try:
+            result = method(self, query, params, *args, **kwargs)
+            return result
+        finally:
+            self._profiling = False
+            profiler.record(self, query, params, time.perf_counter() - start, _row_count(result))
+    return wrapper
+
 
 class DB_Manager:
-    def __init__(self, db_path):
+    # Connection profile: PRAGMAs applied on every connect (None skips a PRAGMA).
+    # WAL lets readers and the writer work at the same time; it needs every user of the
+    # file on the same machine (e.g. one terminal server), not a network share.
+    DEFAULT_PROFILE = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",    # durable with WAL without an fsync per commit
+        "cache_size": -65536,       # negative = KiB, i.e. 64 MB page cache
+        "mmap_size": 268435456,     # 256 MB memory-mapped I/O
+        "temp_store": "MEMORY",
+        # Cascades stay off by default: the schema still has foreign keys that SQLite
+        # rejects as mismatched (see foreign_key_problems). Use STRICT_PROFILE once clean.
+        "foreign_keys": "OFF",
+    }
+    STRICT_PROFILE = dict(DEFAULT_PROFILE, foreign_keys="ON")
+    # Rollback-journal behaviour from before profiles existed
+    LEGACY_PROFILE = {"journal_mode": "DELETE", "synchronous": "FULL"}
+    # Query_Profiler timing every statement of every connection while enabled (Query_Profiler.enable)
+    profiler = None
+
+    def __init__(self, db_path, query_only=False, profile=None, check_same_thread=True):
         self.db_path = db_path
+        # A query_only connection refuses every write (PRAGMA query_only)
+        self.query_only = query_only
+        # False lets a pool hand the connection to any thread, one thread at a time
+        self.check_same_thread = check_same_thread
+        self.profile = dict(self.DEFAULT_PROFILE if profile is None else profile)
         self.conn = None
         self.cursor = None
+        self._in_transaction = False
+        self._profiling = False
         self.connect()
 
     def connect(self):
         try:
-            # Simple connection without WAL mode for now
-            self.conn = sqlite3.connect(self.db_path, timeout=30.0)
+            self.conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=self.check_same_thread)
             self.conn.row_factory = sqlite3.Row  # Access columns by name
             self.cursor = self.conn.cursor()
+            self.apply_profile(self.profile)
+            if self.query_only:
+                self.conn.execute("PRAGMA query_only = ON")
             print(f"Connected to database: {self.db_path}")
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
             self.conn = None
             self.cursor = None
 
+    def apply_profile(self, profile):
+        """Apply a connection profile ({pragma: value}) to the open connection."""
+        for pragma, value in profile.items():
+            if value is None:
+                continue
+            try:
+                self.conn.execute(f"PRAGMA {pragma} = {value}").fetchall()
+            except sqlite3.Error as e:
+                # e.g. WAL cannot be enabled on a read-only or network file system
+                print(f"Could not apply PRAGMA {pragma} = {value}: {e}")
+
+    def get_pragma(self, pragma):
+        row = self.conn.execute(f"PRAGMA {pragma}").fetchone()
+        return row[0] if row else None
+
+    def data_stamp(self):
+        """
+        Token that changes whenever the database content may have changed: a commit by
+        another connection (PRAGMA data_version) or a write on this one (total_changes).
+        Caches compare it to know when to reload.
+        """
+        if not self.conn:
+            return None
+        return (self.get_pragma("data_version"), self.conn.total_changes)
+
+    def foreign_key_problems(self):
+        """
+        Report what stops foreign_keys=ON from being safe on this database.
+        Returns a list of strings: schema mismatches (a REFERENCES clause SQLite cannot
+        resolve) and existing rows that violate a constraint.
+        """
+        problems = []
+        tables = [r['name'] for r in self.fetch_all("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        for table in tables:
+            try:
+                for row in self.conn.execute(f'PRAGMA foreign_key_check("{table}")').fetchall():
+                    problems.append(f'{row[0]} rowid {row[1]} references missing {row[2]} (constraint {row[3]})')
+            except sqlite3.OperationalError as e:
+                problems.append(f'{table}: {e}')
+        return problems
+
     def close(self):
         if self.conn:
             try:
@@ -30,18 +135,18 @@ class DB_Manager:
             except sqlite3.Error as e:
                 print(f"Error closing database: {e}")
 
-    def execute_query(self, query, params=(), max_retries=3):
-        """Execute query with retry logic for database locks"""
-        if not self.conn or not self.cursor:
-            print("Database connection not available")
-            return None
-            
+    def _run(self, cursor, query, params, commit, max_retries):
+        """Run a statement on `cursor`, retrying while the database is locked.
+        Inside a transaction() scope errors are raised so the scope can roll back."""
         for attempt in range(max_retries):
             try:
-                self.cursor.execute(query, params)
-                self.conn.commit()
-                return self.cursor
+                cursor.execute(query, params)
+                if commit and not self._in_transaction:
+                    self.conn.commit()
+                return cursor
             except sqlite3.OperationalError as e:
+                if self._in_transaction:
+                    raise
                 if "database is locked" in str(e).lower():
                     if attempt < max_retries - 1:
                         print(f"Database locked, retrying in {0.5 * (attempt + 1)} seconds... (attempt {attempt + 1}/{max_retries})")
@@ -54,23 +159,119 @@ class DB_Manager:
                     print(f"Error executing query: {query}\nParams: {params}\nError: {e}")
                     return None
             except sqlite3.Error as e:
+                if self._in_transaction:
+                    raise
                 print(f"Error executing query: {query}\nParams: {params}\nError: {e}")
                 return None
         return None
 
+    @_profiled
+    def execute_query(self, query, params=(), max_retries=3):
+        """Execute a write statement with retry logic for database locks.
+        Commits immediately unless running inside a transaction() scope."""
+        if not self.conn or not self.cursor:
+            print("Database connection not available")
+            return None
+        return self._run(self.cursor, query, params, True, max_retries)
+
+    @_profiled
+    def read_query(self, query, params=(), max_retries=3):
+        """Execute a read-only statement on its own cursor without committing."""
+        return self._read_query(query, params, max_retries)
+
+    def _read_query(self, query, params=(), max_retries=3):
+        if not self.conn:
+            print("Database connection not available")
+            return None
+        return self._run(self.conn.cursor(), query, params, False, max_retries)
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one transaction: commit on success, roll back on error.
+        Nested scopes join the outer transaction.
+
+        with db.transaction():
+            db.insert(...)
+            db.update(...)
+        """
+        if self._in_transaction:
+            yield self
+            return
+        if self.conn.in_transaction:
+            # A failed execute_query can leave sqlite3's implicit transaction open;
+            # settle it the way the next execute_query would have
+            self.conn.commit()
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._in_transaction = True
+        try:
+            yield self
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            self._in_transaction = False
+
+    @contextmanager
+    def savepoint(self, name="sp"):
+        """Inside transaction(): if the block raises, undo only its writes (the error still
+        propagates) and leave the rest of the transaction to commit."""
+        self.conn.execute(f'SAVEPOINT "{name}"')
+        try:
+            yield self
+        except BaseException:
+            # Some errors (e.g. disk full) already rolled the whole transaction back
+            if self.conn.in_transaction:
+                self.conn.execute(f'ROLLBACK TO "{name}"')
+            raise
+        finally:
+            if self.conn.in_transaction:
+                self.conn.execute(f'RELEASE "{name}"')
+
+    @_profiled
     def fetch_all(self, query, params=()):
-        cursor = self.execute_query(query, params)
+        cursor = self.read_query(query, params)
         if cursor:
             return [dict(row) for row in cursor.fetchall()]
         return []
 
+    @_profiled
     def fetch_one(self, query, params=()):
-        cursor = self.execute_query(query, params)
+        cursor = self.read_query(query, params)
         if cursor:
             row = cursor.fetchone()
+            cursor.close()  # release the read statement straight away
             return dict(row) if row else None
         return None
 
+    def iter_query(self, query, params=(), batch_size=1000):
+        """
+        Yield result rows as tuples, fetched batch_size at a time, so large results
+        (exports) never sit in memory as a whole.
+        """
+        profiler = self.profiler
+        start = time.perf_counter()
+        cursor = self._read_query(query, params)
+        if not cursor:
+            return
+        # Profiled as the time spent in SQLite, not in the consumer between batches
+        seconds, rows = time.perf_counter() - start, 0
+        try:
+            while True:
+                start = time.perf_counter()
+                batch = cursor.fetchmany(batch_size)
+                seconds += time.perf_counter() - start
+                rows += len(batch)
+                if not batch:
+                    break
+                for row in batch:
+                    yield tuple(row)
+        finally:
+            cursor.close()
+            if profiler is not None:
+                profiler.record(self, query, params, seconds, rows)
+
     def insert(self, table, data):
         """
         Insert a dictionary of data into a table.
@@ -87,6 +288,72 @@ class DB_Manager:
             return self.cursor.lastrowid
         return None
 
+    @_profiled
+    def execute_many(self, query, seq_of_params):
+        """
+        Execute one statement for every parameter tuple with executemany, as a single
+        transaction (committed once, rolled back on failure).
+        Returns number of rows affected, or None on error.
+        """
+        if not self.conn:
+            print("Database connection not available")
+            return None
+        try:
+            with self.transaction():
+                cursor = self.conn.executemany(query, seq_of_params)
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            if self._in_transaction:
+                raise  # let the enclosing transaction() roll back
+            print(f"Error executing batch: {query}\nError: {e}")
+            return None
+
+    def _batch_rows(self, rows):
+        """Split an iterable of dicts into (columns, parameter tuples) using the first row's keys."""
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return None, None
+        columns = list(first.keys())
+        params = (tuple(row.get(col) for col in columns) for row in itertools.chain([first], rows))
+        return columns, params
+
+    def insert_many(self, table, rows):
+        """
+        Insert an iterable of dictionaries (sharing the first row's keys) in one transaction.
+        Returns number of rows inserted, or None on error.
+        """
+        columns, params = self._batch_rows(rows)
+        if columns is None:
+            return 0
+        column_list = ', '.join([f'"{key}"' for key in columns])
+        placeholders = ', '.join(['?'] * len(columns))
+        query = f"INSERT INTO \"{table}\" ({column_list}) VALUES ({placeholders})"
+        return self.execute_many(query, params)
+
+    def upsert_many(self, table, rows, conflict_columns, update_columns=None):
+        """
+        Insert rows, updating existing ones that clash on `conflict_columns`
+        (INSERT ... ON CONFLICT DO UPDATE). `conflict_columns` must be the primary key or
+        a unique index. By default every non-conflict column is updated.
+        Returns number of rows written, or None on error.
+        """
+        columns, params = self._batch_rows(rows)
+        if columns is None:
+            return 0
+        if update_columns is None:
+            update_columns = [col for col in columns if col not in conflict_columns]
+        column_list = ', '.join([f'"{key}"' for key in columns])
+        placeholders = ', '.join(['?'] * len(columns))
+        conflict_list = ', '.join([f'"{key}"' for key in conflict_columns])
+        if update_columns:
+            set_clause = ', '.join([f'"{key}" = excluded."{key}"' for key in update_columns])
+            action = f"DO UPDATE SET {set_clause}"
+        else:
+            action = "DO NOTHING"
+        query = f"INSERT INTO \"{table}\" ({column_list}) VALUES ({placeholders}) ON CONFLICT ({conflict_list}) {action}"
+        return self.execute_many(query, params)
+
     def update(self, table, data, where_clause, where_params):
         """
         Update a table with a dictionary of data based on a where clause.
@@ -1,8 +1,10 @@
 from .DB_manager import DB_Manager
+from .Sequence_manager import Sequence_Manager
 
 class Doc_Manager:
     def __init__(self, db_manager: DB_Manager):
         self.db = db_manager
+        self.ids = Sequence_Manager(db_manager)
 
     def add_document(self, file_ref, date, doc_type, title, from_party, to_party, cost_imp, time_imp, remark):
         data = {
@@ -31,13 +33,7 @@ class Doc_Manager:
         self.db.delete("Document Manager", "File = ?", (file_ref,))
 
     def get_next_file_ref(self):
-        result = self.db.fetch_one("SELECT \"File\" FROM \"Document Manager\" ORDER BY rowid DESC LIMIT 1")
-        if result:
-            last_file = result['File']
-            num = int(last_file[3:]) + 1
-        else:
-            num = 1
-        return f"DOC{num:03d}"
+        return self.ids.next_ref("DOC")
 
     # Intermediate table operations
     def link_abortive_work(self, abortive_ref, doc_ref, remark=""):
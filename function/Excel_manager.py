@@ -1,16 +1,209 @@
-import openpyxl
-import win32com.client as win32
+import io
 import os
+import re
+from copy import copy
+
+# A cell or range reference inside a formula or defined name, optionally sheet-qualified,
+# e.g. B3, $F$10:$F$12, Certificate!$B$3, 'IP Summary'!A1
+_REF = re.compile(
+    r"(?<![\w.!$'\"])(?:(?P<sheet>'(?:[^']|'')+'|[A-Za-z_][\w.]*)!)?"
+    r"(?P<c1>\$?[A-Z]{1,3})(?P<d1>\$?)(?P<r1>\d+)"
+    r"(?::(?P<c2>\$?[A-Z]{1,3})(?P<d2>\$?)(?P<r2>\d+))?(?![\w(])"
+)
+
+
+class Excel_Template:
+    """
+    An .xlsx template filled with openpyxl, without Excel.
+
+    The file is read once; every render parses a fresh copy from the bytes held in
+    memory, so one template can produce many workbooks (deep-copying an openpyxl
+    workbook loses its styles). Styles, merged cells, row heights, defined names and
+    formulas of the template are kept.
+
+    data_map keys are cell addresses ('B3', or 'Summary!B3' for another sheet than the
+    first), defined names ('ContractNo') or ranges ('A10:F10'); values are written as is.
+    A list value fills a repeating row block: the key's rows are the block, repeated
+    once per record and inserted above whatever follows. A record is a sequence of
+    values written from the block's first column (None keeps the template cell, e.g. a
+    formula) or a {column letter: value} dict; for blocks taller than one row a record
+    is a list of such rows. Rows below move down: formulas, merged cells, row heights
+    and defined names are adjusted, and ranges ending on the block's last row (a
+    SUM under the items) grow to cover every record. Addresses in data_map always
+    refer to the template's layout. Conditional formats and data validations below a
+    block are not moved.
+    """
+    def __init__(self, template_path):
+        self.path = os.path.abspath(template_path)
+        self.mtime = os.path.getmtime(self.path)
+        with open(self.path, 'rb') as f:
+            self.data = f.read()
+
+    def copy(self):
+        """A fresh workbook parsed from the template in memory."""
+        from openpyxl import load_workbook
+        return load_workbook(io.BytesIO(self.data))
+
+    def render(self, data_map):
+        """The template filled with data_map, as an openpyxl Workbook."""
+        wb = self.copy()
+        blocks = []
+        for key, value in data_map.items():
+            ws, min_col, min_row, max_col, max_row = self._resolve(wb, key)
+            if isinstance(value, (list, tuple)):
+                blocks.append((ws, min_row, max_row, min_col, value))
+            elif (min_col, min_row) == (max_col, max_row):
+                ws.cell(min_row, min_col).value = value
+            else:
+                raise ValueError(f"{key} is a range: pass a list of rows")
+        # Expand blocks from the bottom up so the template rows of the ones above stay put
+        for ws, top, bottom, col, records in sorted(blocks, key=lambda b: (b[0].title, -b[1])):
+            self._fill_block(wb, ws, top, bottom, col, records)
+        return wb
+
+    def save(self, output_path, data_map):
+        """Render data_map into output_path. Returns output_path."""
+        out_dir = os.path.dirname(output_path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+        self.render(data_map).save(output_path)
+        return output_path
+
+    @staticmethod
+    def _resolve(wb, key):
+        """(worksheet, min_col, min_row, max_col, max_row) for an address or defined name."""
+        from openpyxl.utils.cell import range_boundaries
+        ws, ref = wb.worksheets[0], key
+        if key in wb.defined_names:
+            sheet, ref = next(iter(wb.defined_names[key].destinations))
+            ws = wb[sheet]
+        elif any(key in sheet.defined_names for sheet in wb.worksheets):
+            ws = next(sheet for sheet in wb.worksheets if key in sheet.defined_names)
+            sheet, ref = next(iter(ws.defined_names[key].destinations))
+            ws = wb[sheet] if sheet else ws
+        elif '!' in key:
+            sheet, ref = key.rsplit('!', 1)
+            ws = wb[sheet.strip("'").replace("''", "'")]
+        try:
+            min_col, min_row, max_col, max_row = range_boundaries(ref.replace('$', ''))
+        except (ValueError, TypeError):
+            raise KeyError(f"Unknown cell or name: {key}")
+        return ws, min_col, min_row, max_col, max_row
+
+    def _fill_block(self, wb, ws, top, bottom, col, records):
+        from openpyxl.cell.cell import MergedCell
+        from openpyxl.formula.translate import Translator
+        from openpyxl.utils.cell import column_index_from_string
+        height = bottom - top + 1
+        template = [[(cell.column, cell.value, cell._style) for cell in ws[row]] for row in range(top, bottom + 1)]
+        heights = [ws.row_dimensions[row].height for row in range(top, bottom + 1)]
+        merged = [m for m in ws.merged_cells.ranges if top <= m.min_row and m.max_row <= bottom]
+
+        extra = (len(records) - 1) * height
+        if extra > 0:
+            self._insert_rows(wb, ws, bottom, extra)
+
+        for i, record in enumerate(records):
+            base = top + i * height
+            if i:
+                # Copy the block's template rows: styles, heights, merges and formulas
+                for dr, row in enumerate(template):
+                    for column, value, style in row:
+                        target = ws.cell(base + dr, column)
+                        target._style = copy(style)
+                        if isinstance(value, str) and value.startswith('='):
+                            origin = ws.cell(top + dr, column).coordinate
+                            value = Translator(value, origin=origin).translate_formula(target.coordinate)
+                        target.value = value
+                    if heights[dr] is not None:
+                        ws.row_dimensions[base + dr].height = heights[dr]
+                for m in merged:
+                    ws.merge_cells(start_row=m.min_row + i * height, start_column=m.min_col,
+                                   end_row=m.max_row + i * height, end_column=m.max_col)
+            for dr, values in enumerate([record] if height == 1 else record):
+                if isinstance(values, dict):
+                    for letter, value in values.items():
+                        ws.cell(base + dr, column_index_from_string(letter)).value = value
+                    continue
+                for j, value in enumerate(values):
+                    if value is not None:
+                        ws.cell(base + dr, col + j).value = value
+
+        if not records:
+            # No records: leave the block's rows with their styles and formulas only
+            for dr, row in enumerate(template):
+                for column, value, _ in row:
+                    cell = ws.cell(top + dr, column)
+                    if not isinstance(cell, MergedCell) and not (isinstance(value, str) and value.startswith('=')):
+                        cell.value = None
+
+    @classmethod
+    def _insert_rows(cls, wb, ws, bottom, amount):
+        """Insert `amount` rows under row `bottom` of ws and move everything that pointed below it."""
+        ws.insert_rows(bottom + 1, amount)
+        for sheet in wb.worksheets:
+            for row in sheet.iter_rows():
+                for cell in row:
+                    if isinstance(cell.value, str) and cell.value.startswith('='):
+                        cell.value = cls._shift_refs(cell.value, ws.title, sheet.title, bottom, amount)
+
+        for m in ws.merged_cells.ranges:
+            if m.min_row > bottom:
+                m.shift(0, amount)
+            elif m.max_row > bottom:
+                m.expand(down=amount)
+
+        moved = sorted((row for row in ws.row_dimensions if row > bottom), reverse=True)
+        for row in moved:
+            dim = ws.row_dimensions.pop(row)
+            dim.index = row + amount
+            ws.row_dimensions[row + amount] = dim
+
+        names = list(wb.defined_names.values())
+        for sheet in wb.worksheets:
+            names.extend(sheet.defined_names.values())
+        for name in names:
+            if name.attr_text:
+                name.attr_text = cls._shift_refs(name.attr_text, ws.title, None, bottom, amount)
+
+    @staticmethod
+    def _shift_refs(text, target_sheet, own_sheet, bottom, amount):
+        """
+        Move references to rows below `bottom` of target_sheet down by `amount`; ranges
+        that reach `bottom` from above grow instead. own_sheet is the sheet unqualified
+        references belong to (None: only qualified references are moved).
+        """
+        def shift(m):
+            sheet = m.group('sheet')
+            name = sheet.strip("'").replace("''", "'") if sheet else own_sheet
+            if name != target_sheet:
+                return m.group(0)
+            r1 = int(m.group('r1'))
+            r2 = int(m.group('r2')) if m.group('r2') else None
+            if r1 > bottom:
+                r1 += amount
+                r2 = r2 + amount if r2 is not None else None
+            elif r2 is not None and r2 >= bottom:
+                r2 += amount
+            prefix = f"{sheet}!" if sheet else ""
+            ref = f"{prefix}{m.group('c1')}{m.group('d1')}{r1}"
+            if r2 is not None:
+                ref += f":{m.group('c2')}{m.group('d2')}{r2}"
+            return ref
+        return _REF.sub(shift, text)
+
 
 class Excel_Manager:
     def __init__(self):
-        pass
+        # Templates read so far, by path (re-read when the file changes)
+        self._templates = {}
 
     def read_excel(self, file_path):
         """
         Reads an Excel file using openpyxl and returns data.
         """
         try:
+            import openpyxl
             workbook = openpyxl.load_workbook(file_path, data_only=True)
             sheet = workbook.active
             data = []
@@ -21,27 +214,46 @@ class Excel_Manager:
             print(f"Error reading Excel file: {e}")
             return []
 
+    def load_template(self, template_path):
+        """The Excel_Template for template_path, read from disk only once while it is unchanged."""
+        path = os.path.abspath(template_path)
+        template = self._templates.get(path)
+        if template is None or template.mtime != os.path.getmtime(path):
+            template = self._templates[path] = Excel_Template(path)
+        return template
+
     def write_excel_template(self, template_path, output_path, data_map):
         """
-        Writes data to an Excel file using a template and win32com.
-        data_map: dict where key is cell address (e.g., 'A1') and value is content.
+        Writes data to an Excel file using a template (openpyxl, no Excel needed).
+        data_map: dict of cell address, defined name or repeating row block -> content,
+        see Excel_Template. Returns output_path, or None if it failed.
         """
         if not os.path.exists(template_path):
             print(f"Template not found: {template_path}")
-            return
+            return None
 
         try:
-            excel = win32.gencache.EnsureDispatch('Excel.Application')
-            excel.Visible = False
-            wb = excel.Workbooks.Open(os.path.abspath(template_path))
-            ws = wb.Worksheets(1)
-
-            for cell, value in data_map.items():
-                ws.Range(cell).Value = value
-
-            wb.SaveAs(os.path.abspath(output_path))
-            wb.Close()
-            excel.Quit()
+            self.load_template(template_path).save(output_path, data_map)
             print(f"File saved to: {output_path}")
+            return output_path
         except Exception as e:
-            print(f"Error writing Excel file with win32: {e}")
+            print(f"Error writing Excel file from template: {e}")
+            return None
+
+    def write_excel_templates(self, template_path, outputs):
+        """
+        Fill one template many times. outputs: iterable of (output_path, data_map).
+        The template is read once. Returns the paths written; failures are printed and skipped.
+        """
+        if not os.path.exists(template_path):
+            print(f"Template not found: {template_path}")
+            return []
+
+        template = self.load_template(template_path)
+        written = []
+        for output_path, data_map in outputs:
+            try:
+                written.append(template.save(output_path, data_map))
+            except Exception as e:
+                print(f"Error writing {output_path} from template: {e}")
+        return written
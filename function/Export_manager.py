@@ -0,0 +1,127 @@
+import os
+
+# openpyxl is imported in the methods that write, so importing this module (and every
+# manager that exports) does not load it at application start
+
+class Export_Manager:
+    """
+    Shared .xlsx export pipeline.
+
+    Rows are streamed into an openpyxl write-only workbook, which writes each row to
+    disk as it is appended, so exporting a large table (e.g. straight from
+    DB_Manager.iter_query) needs roughly constant memory.
+    A sheet is described by a dict, see sheet().
+    """
+    # Accounting format: negatives in parentheses, zero as "-"
+    MONEY_FORMAT = '_(* #,##0.00_);_(* (#,##0.00);_(* "-"??_);_(@_)'
+    # Rows between progress callbacks
+    PROGRESS_EVERY = 500
+
+    @staticmethod
+    def sheet(title, headers, rows, money_columns=(), widths=None, wrap_header=False, footer=(), total=None):
+        """
+        Describe one worksheet.
+        rows: iterable of sequences (consumed once, while writing).
+        total: expected number of rows, for progress reporting (default: len(rows) if it has one).
+        money_columns: indexes formatted with MONEY_FORMAT.
+        widths: column widths (default: from the header text).
+        footer: rows written after the data as (label, value) pairs or None for a
+        blank row; values get MONEY_FORMAT and a red font when negative.
+        """
+        return {
+            "title": title, "headers": list(headers), "rows": rows, "money_columns": set(money_columns),
+            "widths": widths, "wrap_header": wrap_header, "footer": list(footer),
+            "total": total if total is not None else (len(rows) if hasattr(rows, '__len__') else None)
+        }
+
+    def _money_cell(self, ws, value, negative_red=False, align_right=True):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Font
+        cell = WriteOnlyCell(ws, value=value)
+        cell.number_format = self.MONEY_FORMAT
+        if align_right:
+            cell.alignment = Alignment(horizontal='right')
+        if negative_red and isinstance(value, (int, float)) and value < 0:
+            cell.font = Font(color='FF0000')
+        return cell
+
+    def _write_sheet(self, wb, spec, report=None):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Font
+        from openpyxl.utils import get_column_letter
+        ws = wb.create_sheet(spec["title"])
+        headers = spec["headers"]
+        widths = spec["widths"] or [max(12, min(50, len(str(h)) + 2)) for h in headers]
+        # Column widths must be set before the first row in write-only mode
+        for idx, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(idx)].width = width
+
+        bold = Font(bold=True)
+        header_alignment = Alignment(wrap_text=True, horizontal='center') if spec["wrap_header"] else None
+        header_cells = []
+        for h in headers:
+            cell = WriteOnlyCell(ws, value=h)
+            cell.font = bold
+            if header_alignment:
+                cell.alignment = header_alignment
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        money = spec["money_columns"]
+        count = 0
+        for row in spec["rows"]:
+            if money:
+                row = [self._money_cell(ws, v) if i in money else v for i, v in enumerate(row)]
+            ws.append(row)
+            count += 1
+            if report and count % self.PROGRESS_EVERY == 0:
+                report(count)
+
+        for line in spec["footer"]:
+            if line is None:
+                ws.append([])
+                continue
+            label, value = line
+            label_cell = WriteOnlyCell(ws, value=label)
+            label_cell.font = bold
+            ws.append([label_cell, self._money_cell(ws, value, negative_red=True)])
+        return count
+
+    def write(self, file_path, sheets, progress=None):
+        """
+        Write the sheets to file_path. Returns the number of data rows written.
+        progress(done, total) is called every PROGRESS_EVERY rows and once at the end;
+        total is the sum of the sheets' totals (0 if any is unknown). If progress raises,
+        the export stops and nothing is saved.
+        """
+        # Ensure output directory exists
+        out_dir = os.path.dirname(file_path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+
+        totals = [spec.get("total") for spec in sheets]
+        total = 0 if None in totals else sum(totals)
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        count = 0
+        try:
+            for spec in sheets:
+                report = (lambda n, base=count: progress(base + n, total)) if progress else None
+                count += self._write_sheet(wb, spec, report)
+            if progress:
+                progress(count, max(total, count))
+        except BaseException:
+            self._discard(wb)
+            raise
+        wb.save(file_path)
+        return count
+
+    @staticmethod
+    def _discard(wb):
+        """Close and delete the temp files of an export that was stopped before saving."""
+        for ws in wb.worksheets:
+            try:
+                ws.close()
+                ws._writer.cleanup()
+            except Exception:
+                pass
@@ -1,8 +1,10 @@
 from .DB_manager import DB_Manager
+from .Sequence_manager import Sequence_Manager
 
 class MC_VO_Manager:
     def __init__(self, db_manager: DB_Manager):
         self.db = db_manager
+        self.ids = Sequence_Manager(db_manager)
 
     # Main Contract VO operations
     def create_vo(self, vo_ref, date, issue_date, description, app_amt, agree_amt, receive_assessment, dispute, agree, reject, remark):
@@ -34,13 +36,7 @@ class MC_VO_Manager:
         self.db.delete("Main Contract VO", '''"VO ref" = ?''', (vo_ref,))
 
     def get_next_vo_ref(self):
-        result = self.db.fetch_one('''SELECT "VO ref" FROM "Main Contract VO" ORDER BY rowid DESC LIMIT 1''')
-        if result:
-            last_ref = result['VO ref']
-            num = int(last_ref[2:]) + 1
-        else:
-            num = 1
-        return f"VO{num:03d}"
+        return self.ids.next_ref("VO")
 
     # VO Item operations
     def add_vo_item(self, vo_ref, item, description, qty, unit, rate, trade, remark, star_rate, bq_ref, agree, discount=0):
@@ -1,8 +1,14 @@
+import sqlite3
 from .DB_manager import DB_Manager
+from .Sequence_manager import Sequence_Manager
 
 class Payment_Application_Manager:
     def __init__(self, db_manager: DB_Manager):
         self.db = db_manager
+        self.ids = Sequence_Manager(db_manager)
+        # Dropdown reference lists, see _cached_refs
+        self._ref_cache = {}
+        self._ref_stamp = None
 
     # Main Contract IP Application (Header)
     def create_payment_application(self, ip_no, draft_date=None, issue_date=None, approved_date=None, payment_date=None, remark=""):
@@ -19,7 +25,10 @@ class Payment_Application_Manager:
             "Paid Amount": 0.0,
             "Remark": remark
         }
-        return self.db.insert("Main Contract IP Application", data)
+        rowid = self.db.insert("Main Contract IP Application", data)
+        # The new header's Previous amount (and the next IP's, if inserted in between)
+        self.recalculate_ip_totals(ip_no)
+        return rowid
 
     def get_payment_application(self, ip_no):
         return self.db.fetch_one("SELECT * FROM \"Main Contract IP Application\" WHERE IP = ?", (ip_no,))
@@ -34,6 +43,8 @@ class Payment_Application_Manager:
         # Items should be deleted by CASCADE, but let's be safe
         self.db.delete("Main Contract IP Item", "IP = ?", (ip_no,))
         self.db.delete("Main Contract IP Application", "IP = ?", (ip_no,))
+        # The next IP now follows the one before the deleted IP
+        self.recalculate_ip_totals(ip_no)
 
     def get_next_ip_no(self):
         result = self.db.fetch_one("SELECT IP FROM \"Main Contract IP Application\" ORDER BY IP DESC LIMIT 1")
@@ -76,54 +87,117 @@ class Payment_Application_Manager:
         else:
             return 1
 
+    # The items of IP ? copied into IP ?, in one statement
+    COPY_ITEMS_QUERY = '''
+        INSERT INTO "Main Contract IP Item" ("IP", "Item", "Type", "BQ Ref", "VO Ref", "DOC Ref", "Description",
+                                            "Applied Amount", "Certified Amount", "Paid Amount", "Remark")
+        SELECT ?, "Item", "Type", "BQ Ref", "VO Ref", "DOC Ref", "Description",
+               "Applied Amount", "Certified Amount", "Paid Amount", "Remark"
+        FROM "Main Contract IP Item" WHERE IP = ?
+    '''
+
     def copy_previous_ip_items(self, current_ip):
+        """
+        Copy the items of the previous IP into current_ip with one INSERT ... SELECT and
+        update the header totals in the same transaction. Returns True if any item was copied.
+        """
         if current_ip <= 1:
             return False
-        
-        prev_ip = current_ip - 1
-        prev_items = self.get_ip_items(prev_ip)
-        
-        if not prev_items:
+        try:
+            with self.db.transaction():
+                copied = self.db.execute_query(self.COPY_ITEMS_QUERY, (current_ip, current_ip - 1)).rowcount
+                if copied:
+                    self.db.execute_query(self.IP_TOTALS_QUERY, (current_ip,))
+            return copied > 0
+        except sqlite3.Error as e:
+            print(f"Error copying items into IP {current_ip}: {e}")
             return False
-            
-        for item in prev_items:
-            self.add_ip_item(
-                current_ip,
-                item['Item'],
-                item['Type'],
-                item['BQ Ref'],
-                item['VO Ref'],
-                item['DOC Ref'],
-                item['Description'],
-                item['Applied Amount'], 
-                item['Certified Amount'], 
-                item['Paid Amount'], 
-                item['Remark']
+
+    # IP items are cumulative: an IP's Accumulated Applied Amount is the sum of its own
+    # items and its Previous Applied Amount is the Accumulated of the IP before it
+    IP_TOTALS_QUERY = '''
+        UPDATE "Main Contract IP Application"
+        SET "Accumulated Applied Amount" = r.accumulated,
+            "Previous Applied Amount" = r.previous,
+            "This Applied Amount" = r.accumulated - r.previous,
+            "Certified Amount" = r.certified,
+            "Paid Amount" = r.paid
+        FROM (
+            SELECT *, COALESCE(LAG(accumulated) OVER (ORDER BY IP), 0) AS previous
+            FROM (
+                SELECT a.IP,
+                       COALESCE(SUM(i."Applied Amount"), 0) AS accumulated,
+                       COALESCE(SUM(i."Certified Amount"), 0) AS certified,
+                       COALESCE(SUM(i."Paid Amount"), 0) AS paid
+                FROM "Main Contract IP Application" a
+                LEFT JOIN "Main Contract IP Item" i ON i.IP = a.IP
+                GROUP BY a.IP
             )
-        return True
+        ) AS r
+        WHERE r.IP = "Main Contract IP Application".IP AND r.IP >= ?
+    '''
+
+    def recalculate_ip_totals(self, from_ip=None):
+        """
+        Recompute the totals of every IP header (from from_ip onwards) from the items in
+        one statement, so later IPs pick up edits to an earlier one.
+        Returns the number of headers updated, or None on error.
+        """
+        cursor = self.db.execute_query(self.IP_TOTALS_QUERY, (from_ip if from_ip is not None else 0,))
+        return cursor.rowcount if cursor else None
 
     def calculate_ip_totals(self, ip_no):
-        items = self.get_ip_items(ip_no)
-        total_applied = sum(item['Applied Amount'] for item in items if item['Applied Amount'])
-        total_certified = sum(item['Certified Amount'] for item in items if item['Certified Amount'])
-        total_paid = sum(item['Paid Amount'] for item in items if item['Paid Amount'])
-        
-        # Get previous IP totals for "Previous Applied Amount"
-        prev_applied = 0.0
-        if ip_no > 1:
-            prev_app = self.get_payment_application(ip_no - 1)
-            if prev_app:
-                prev_applied = prev_app['Accumulated Applied Amount']
-        
-        # Update Header
-        data = {
-            "Accumulated Applied Amount": total_applied,
-            "Previous Applied Amount": prev_applied,
-            "This Applied Amount": total_applied - prev_applied,
-            "Certified Amount": total_certified,
-            "Paid Amount": total_paid
-        }
-        self.update_payment_application(ip_no, data)
+        # Later IPs carry this IP's Accumulated forward, so they are recomputed too
+        return self.recalculate_ip_totals(ip_no)
+
+    # Item triggers keep the header rollups current: each item write adds its change to
+    # its IP's totals and to the Previous/This Applied Amount of the next IP
+    ROLLUP_TRIGGERS = ("MC IP Item Rollup AI", "MC IP Item Rollup AD", "MC IP Item Rollup AU")
+
+    def _rollup_sql(self, row, sign):
+        """Trigger statements adding (sign '+') or removing ('-') item `row` (new/old) from the headers."""
+        back = '-' if sign == '+' else '+'
+        applied = f'COALESCE({row}."Applied Amount", 0)'
+        return f'''
+            UPDATE "Main Contract IP Application" SET
+                "Accumulated Applied Amount" = COALESCE("Accumulated Applied Amount", 0) {sign} {applied},
+                "This Applied Amount" = COALESCE("This Applied Amount", 0) {sign} {applied},
+                "Certified Amount" = COALESCE("Certified Amount", 0) {sign} COALESCE({row}."Certified Amount", 0),
+                "Paid Amount" = COALESCE("Paid Amount", 0) {sign} COALESCE({row}."Paid Amount", 0)
+            WHERE IP = {row}.IP;
+            UPDATE "Main Contract IP Application" SET
+                "Previous Applied Amount" = COALESCE("Previous Applied Amount", 0) {sign} {applied},
+                "This Applied Amount" = COALESCE("This Applied Amount", 0) {back} {applied}
+            WHERE IP = (SELECT MIN(IP) FROM "Main Contract IP Application" WHERE IP > {row}.IP);'''
+
+    def _rollup_statements(self):
+        ai, ad, au = (f'"{name}"' for name in self.ROLLUP_TRIGGERS)
+        return [
+            f'CREATE TRIGGER IF NOT EXISTS {ai} AFTER INSERT ON "Main Contract IP Item" BEGIN {self._rollup_sql("new", "+")} END',
+            f'CREATE TRIGGER IF NOT EXISTS {ad} AFTER DELETE ON "Main Contract IP Item" BEGIN {self._rollup_sql("old", "-")} END',
+            f'''CREATE TRIGGER IF NOT EXISTS {au} AFTER UPDATE OF IP, "Applied Amount", "Certified Amount", "Paid Amount" ON "Main Contract IP Item"
+                WHEN old.IP IS NOT new.IP OR old."Applied Amount" IS NOT new."Applied Amount"
+                  OR old."Certified Amount" IS NOT new."Certified Amount" OR old."Paid Amount" IS NOT new."Paid Amount"
+                BEGIN {self._rollup_sql("old", "-")} {self._rollup_sql("new", "+")} END''',
+        ]
+
+    def ensure_rollup_triggers(self):
+        """
+        Create the header rollup triggers if missing, recomputing every header once so the
+        triggers start from correct totals. Returns True on success.
+        """
+        existing = {r['name'] for r in self.db.fetch_all("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        if all(name in existing for name in self.ROLLUP_TRIGGERS):
+            return True
+        try:
+            with self.db.transaction():
+                for stmt in self._rollup_statements():
+                    self.db.conn.execute(stmt)
+                self.db.conn.execute(self.IP_TOTALS_QUERY, (0,))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error creating IP rollup triggers: {e}")
+            return False
 
     # Main Contract BQ (Unchanged)
     def add_bq_item(self, bq_id, bill, section, page, item, description, qty, unit, rate, trade, remark, discount=0):
@@ -176,16 +250,7 @@ class Payment_Application_Manager:
         self.db.delete("Main Contract VO", "\"VO ref\" = ?", (vo_ref,))
 
     def get_next_vo_ref(self):
-        result = self.db.fetch_one("SELECT \"VO ref\" FROM \"Main Contract VO\" ORDER BY rowid DESC LIMIT 1")
-        if result:
-            last_ref = result['VO ref']
-            try:
-                num = int(last_ref[2:]) + 1
-            except ValueError:
-                num = 1
-        else:
-            num = 1
-        return f"VO{num:03d}"
+        return self.ids.next_ref("VO")
 
     def add_vo_item(self, vo_ref, item, description, qty, unit, rate, trade, remark, star_rate, bq_ref, agree, discount=0):
         data = {
@@ -213,47 +278,81 @@ class Payment_Application_Manager:
     def delete_vo_item(self, id):
         self.db.delete("VO Item", "ID = ?", (id,))
 
+    @staticmethod
+    def ref_label(ref, text):
+        """Dropdown label for a reference: 'REF - text', or just REF when text is blank."""
+        text = (text or '').strip()
+        return f"{ref} - {text}" if text else ref
+
+    def _cached_refs(self, name, query):
+        """
+        Dropdown labels for one reference list, loaded once and reused until the
+        database is written to (by any manager or another user, see DB_Manager.data_stamp).
+        """
+        stamp = self.db.data_stamp()
+        if stamp != self._ref_stamp:
+            self._ref_cache = {}
+            self._ref_stamp = stamp
+        if name not in self._ref_cache:
+            rows = self.db.read_query(query)
+            # dict.fromkeys drops duplicates and keeps the ORDER BY order
+            self._ref_cache[name] = list(dict.fromkeys(self.ref_label(r[0], r[1]) for r in rows)) if rows else []
+        return list(self._ref_cache[name])
+
+    def invalidate_ref_cache(self):
+        self._ref_cache = {}
+        self._ref_stamp = None
+
     def get_existing_bq_refs(self):
         """Get all existing BQ IDs with descriptions for dropdown"""
-        results = self.db.fetch_all("SELECT \"BQ ID\", description FROM \"Main Contract BQ\" WHERE \"BQ ID\" IS NOT NULL AND \"BQ ID\" != '' ORDER BY \"BQ ID\"")
-        refs = []
-        for row in results:
-            bq_id = row['BQ ID']
-            desc = row.get('description', '').strip()
-            if desc:
-                display = f"{bq_id} - {desc}"
-            else:
-                display = bq_id
-            refs.append(display)
-        return list(set(refs))  # Remove duplicates
+        return self._cached_refs("bq", "SELECT \"BQ ID\", description FROM \"Main Contract BQ\" WHERE \"BQ ID\" IS NOT NULL AND \"BQ ID\" != '' ORDER BY \"BQ ID\"")
 
     def get_existing_vo_refs(self):
         """Get all existing VO refs with descriptions for dropdown"""
-        results = self.db.fetch_all("SELECT \"VO ref\", \"Description\" FROM \"Main Contract VO\" WHERE \"VO ref\" IS NOT NULL AND \"VO ref\" != '' ORDER BY \"VO ref\"")
-        refs = []
-        for row in results:
-            vo_ref = row['VO ref']
-            desc = row.get('Description', '').strip()
-            if desc:
-                display = f"{vo_ref} - {desc}"
-            else:
-                display = vo_ref
-            refs.append(display)
-        return list(set(refs))  # Remove duplicates
+        return self._cached_refs("vo", "SELECT \"VO ref\", \"Description\" FROM \"Main Contract VO\" WHERE \"VO ref\" IS NOT NULL AND \"VO ref\" != '' ORDER BY \"VO ref\"")
 
     def get_existing_doc_refs(self):
         """Get all existing DOC refs with titles for dropdown"""
-        results = self.db.fetch_all("SELECT \"File\", \"Title\" FROM \"Document Manager\" WHERE \"File\" IS NOT NULL AND \"File\" != '' ORDER BY \"File\"")
-        refs = []
-        for row in results:
-            doc_ref = row['File']
-            title = row.get('Title', '').strip()
-            if title:
-                display = f"{doc_ref} - {title}"
-            else:
-                display = doc_ref
-            refs.append(display)
-        return list(set(refs))  # Remove duplicates
+        return self._cached_refs("doc", "SELECT \"File\", \"Title\" FROM \"Document Manager\" WHERE \"File\" IS NOT NULL AND \"File\" != '' ORDER BY \"File\"")
+
+    # Refs may be stored as the display text 'REF - description'; join on the part before ' - '
+    IP_ITEM_GRID_QUERY = '''
+        WITH items AS (
+            SELECT i.*,
+                   CASE WHEN instr(i."BQ Ref", ' - ') > 0 THEN substr(i."BQ Ref", 1, instr(i."BQ Ref", ' - ') - 1) ELSE i."BQ Ref" END AS bq_key,
+                   CASE WHEN instr(i."VO Ref", ' - ') > 0 THEN substr(i."VO Ref", 1, instr(i."VO Ref", ' - ') - 1) ELSE i."VO Ref" END AS vo_key,
+                   CASE WHEN instr(i."DOC Ref", ' - ') > 0 THEN substr(i."DOC Ref", 1, instr(i."DOC Ref", ' - ') - 1) ELSE i."DOC Ref" END AS doc_key
+            FROM "Main Contract IP Item" i
+            WHERE i.IP = ?
+        )
+        SELECT items.*,
+               b."BQ ID" AS bq_match, b.description AS bq_text,
+               COALESCE(b.Amount, COALESCE(b.Qty, 0) * COALESCE(b.Rate, 0) * (1 - COALESCE(b.Discount, 0)), 0) AS "BQ Amount",
+               v."VO ref" AS vo_match, v.Description AS vo_text,
+               COALESCE(v."Application Amount", 0) AS "VO Amount",
+               d.File AS doc_match, d.Title AS doc_text
+        FROM items
+        LEFT JOIN "Main Contract BQ" b ON b."BQ ID" = items.bq_key
+        LEFT JOIN "Main Contract VO" v ON v."VO ref" = items.vo_key
+        LEFT JOIN "Document Manager" d ON d.File = items.doc_key
+        ORDER BY items.Item ASC
+    '''
+
+    def get_ip_item_grid(self, ip_no):
+        """
+        Items of one IP ready for the item grid, in a single query: each item dict also
+        has "BQ Amount", "VO Amount" and the dropdown labels "BQ Display", "VO Display"
+        and "DOC Display" (the stored ref when it matches nothing).
+        """
+        rows = self.db.fetch_all(self.IP_ITEM_GRID_QUERY, (ip_no,))
+        grid = []
+        for row in rows:
+            item = {k: v for k, v in row.items() if not k.endswith(('_key', '_match', '_text'))}
+            for label, prefix, field in (("BQ Display", "bq", "BQ Ref"), ("VO Display", "vo", "VO Ref"), ("DOC Display", "doc", "DOC Ref")):
+                match = row[f"{prefix}_match"]
+                item[label] = self.ref_label(match, row[f"{prefix}_text"]) if match is not None else (row[field] or "")
+            grid.append(item)
+        return grid
 
     def get_bq_amount(self, bq_id):
         """Return the BQ item amount (stored 'Amount' column) for a given BQ ID. Returns 0.0 if not found."""
@@ -0,0 +1,204 @@
+import os
+import re
+import sys
+import json
+import time
+import datetime
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Tokens replaced when SQL strings are grouped: string and number literals, IN lists
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"$.])-?\d+(?:\.\d+)?(?![\w\"])")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+_module_dir = os.path.dirname(os.path.abspath(__file__))
+_root_dir = os.path.dirname(_module_dir)
+# Frames that only pass a statement through: skipped when looking for who ran it
+_PLUMBING = {os.path.join(_module_dir, "DB_manager.py"), os.path.abspath(__file__),
+             os.path.join(_root_dir, "ui", "Task_runner.py"), os.path.join(_root_dir, "ui", "Autosave_queue.py")}
+_UI_FILES = (os.path.join(_root_dir, "ui") + os.sep, os.path.join(_root_dir, "main.py"))
+
+# UI action label of the running thread, see action()
+_state = threading.local()
+
+
+@contextmanager
+def action(label):
+    """
+    Attribute the statements run inside the block to `label` (e.g. a background task
+    key). Without one, the nearest ui/ or main.py frame names the action.
+    Cheap enough to leave in place when no profiler is enabled.
+    """
+    previous = getattr(_state, "action", None)
+    _state.action = label
+    try:
+        yield
+    finally:
+        _state.action = previous
+
+
+def normalize_sql(sql):
+    """One line per statement shape: literals become ? and IN (?, ?, ...) lists become (?...)."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class Query_Profiler:
+    """
+    Opt-in timings of every statement run through DB_Manager, on every connection and
+    thread, while it is enabled (DB_Manager.profiler).
+
+    Statements are grouped by normalized SQL, the calling manager method (first frame
+    in function/) and the UI action (action() label, else the first frame in ui/ or
+    main.py); each group keeps count, total and rows plus the last SAMPLES durations
+    for p50/p95. A statement slower than slow_ms is kept in the slow log with its
+    EXPLAIN QUERY PLAN (explained once per statement shape) and, with slow_log_path,
+    appended to that file. dump() writes everything as JSON for offline analysis.
+    Statements run straight on db.conn (schema setup, sequences) are not measured.
+    """
+    SAMPLES = 1000
+    SLOW_KEPT = 200
+
+    def __init__(self, slow_ms=100.0, slow_log_path=None):
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self._lock = threading.Lock()
+        self._normalized = {}
+        self.reset()
+
+    # Enabling -----------------------------------------------------------------
+
+    def enable(self):
+        """Start timing statements on every DB_Manager."""
+        from .DB_manager import DB_Manager
+        DB_Manager.profiler = self
+        return self
+
+    def disable(self):
+        from .DB_manager import DB_Manager
+        if DB_Manager.profiler is self:
+            DB_Manager.profiler = None
+
+    @property
+    def enabled(self):
+        from .DB_manager import DB_Manager
+        return DB_Manager.profiler is self
+
+    def reset(self):
+        with self._lock:
+            self.started = datetime.datetime.now()
+            self._stats = {}
+            self._plans = {}
+            self.slow = deque(maxlen=self.SLOW_KEPT)
+
+    # Recording ----------------------------------------------------------------
+
+    def record(self, db, query, params, seconds, rows):
+        """Called by DB_Manager after each statement; rows is the row count (None if unknown)."""
+        sql = self._normalized.get(query)
+        if sql is None:
+            sql = normalize_sql(query)
+            if len(self._normalized) < 10000:
+                self._normalized[query] = sql
+        caller, ui_action = self._attribution()
+        key = (sql, caller, ui_action)
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = {"count": 0, "total": 0.0, "max": 0.0, "rows": 0,
+                                           "samples": deque(maxlen=self.SAMPLES)}
+            stat["count"] += 1
+            stat["total"] += seconds
+            stat["max"] = max(stat["max"], seconds)
+            stat["rows"] += rows or 0
+            stat["samples"].append(seconds)
+        if seconds * 1000 >= self.slow_ms:
+            self._log_slow(db, query, sql, params, seconds, rows, caller, ui_action)
+
+    def _attribution(self):
+        """(manager method, UI action) that ran the current statement."""
+        caller = ui_action = None
+        frame = sys._getframe(2)
+        while frame is not None and (caller is None or ui_action is None):
+            filename = frame.f_code.co_filename
+            if filename not in _PLUMBING:
+                if caller is None and filename.startswith(_module_dir):
+                    caller = _frame_name(frame)
+                elif ui_action is None and filename.startswith(_UI_FILES):
+                    ui_action = _frame_name(frame)
+            frame = frame.f_back
+        return caller or "-", getattr(_state, "action", None) or ui_action or "-"
+
+    def _log_slow(self, db, query, sql, params, seconds, rows, caller, ui_action):
+        plan = self._plans.get(sql)
+        if plan is None and isinstance(params, (tuple, list, dict)):
+            try:
+                plan = [row[3] for row in db.conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()]
+            except Exception as e:
+                plan = [f"(no plan: {e})"]
+            self._plans[sql] = plan
+        entry = {
+            "time": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "ms": round(seconds * 1000, 3), "rows": rows, "sql": sql, "caller": caller, "action": ui_action,
+            "database": os.path.basename(db.db_path), "plan": plan or []
+        }
+        with self._lock:
+            self.slow.append(entry)
+            if self.slow_log_path:
+                try:
+                    with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                        f.write(f"{entry['time']} {entry['ms']:.1f} ms rows={rows} {caller} [{ui_action}]\n  {sql}\n")
+                        for line in entry["plan"]:
+                            f.write(f"    {line}\n")
+                except OSError as e:
+                    print(f"Could not write slow query log {self.slow_log_path}: {e}")
+
+    # Reporting ----------------------------------------------------------------
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    def report(self, sort="total"):
+        """One dict per (sql, caller, action) with count, rows and total/mean/p50/p95/max in ms, sorted by `sort` descending."""
+        with self._lock:
+            items = [(key, dict(stat, samples=sorted(stat["samples"]))) for key, stat in self._stats.items()]
+        rows = []
+        for (sql, caller, ui_action), stat in items:
+            ordered = stat["samples"]
+            rows.append({
+                "sql": sql, "caller": caller, "action": ui_action, "count": stat["count"], "rows": stat["rows"],
+                "total_ms": round(stat["total"] * 1000, 3),
+                "mean_ms": round(stat["total"] * 1000 / stat["count"], 3),
+                "p50_ms": round(self._percentile(ordered, 0.5) * 1000, 3),
+                "p95_ms": round(self._percentile(ordered, 0.95) * 1000, 3),
+                "max_ms": round(stat["max"] * 1000, 3),
+            })
+        rows.sort(key=lambda r: r.get(f"{sort}_ms", r.get(sort, 0)), reverse=True)
+        return rows
+
+    def dump(self, path):
+        """Write the report and the slow log to `path` as JSON. Returns path."""
+        with self._lock:
+            slow = list(self.slow)
+        data = {
+            "started": self.started.isoformat(timespec="seconds"),
+            "dumped": datetime.datetime.now().isoformat(timespec="seconds"),
+            "slow_ms": self.slow_ms,
+            "statements": self.report(),
+            "slow": slow,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        return path
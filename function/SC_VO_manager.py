@@ -1,8 +1,10 @@
 from .DB_manager import DB_Manager
+from .Sequence_manager import Sequence_Manager
 
 class SC_VO_Manager:
     def __init__(self, db_manager: DB_Manager):
         self.db = db_manager
+        self.ids = Sequence_Manager(db_manager)
 
     # Sub Contract VO operations
     def create_sc_vo(self, vo_ref, sc_no, date, receive_date, description, app_amt, agree_amt, issue_assessment, dispute, agree, reject, remark):
@@ -38,13 +40,7 @@ class SC_VO_Manager:
         self.db.delete("Sub Contract VO", '''"VO ref" = ?''', (vo_ref,))
 
     def get_next_sc_vo_ref(self):
-        result = self.db.fetch_one('''SELECT "VO ref" FROM "Sub Contract VO" ORDER BY rowid DESC LIMIT 1''')
-        if result:
-            last_ref = result['VO ref']
-            num = int(last_ref[4:]) + 1  # Assuming format SCVO001
-        else:
-            num = 1
-        return f"SCVO{num:03d}"
+        return self.ids.next_ref("SCVO")
 
     # SC VO Item operations
     def add_sc_vo_item(self, vo_ref, item, description, qty, unit, rate, trade, remark, star_rate, bq_ref, agree, discount=0):
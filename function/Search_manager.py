@@ -0,0 +1,118 @@
+import sqlite3
+from .DB_manager import DB_Manager
+
+class Search_Manager:
+    """
+    Full-text search (SQLite FTS5) over documents, BQ descriptions, VO items and
+    abortive work records.
+
+    Each source table gets an external-content FTS5 table that stores only the index
+    (the text stays in the source table) and three triggers that keep it in sync.
+    Row ids of tables without an INTEGER PRIMARY KEY can change on VACUUM, so call
+    rebuild() after vacuuming the database.
+    """
+    # scope -> source table, its rowid column, indexed columns, ref column, title column
+    SCOPES = {
+        "document": {
+            "table": "Document Manager", "fts": "Document Search", "rowid": "rowid",
+            "columns": ["Title", "Remark", "From", "To"], "ref": "File", "title": "Title"
+        },
+        "bq": {
+            "table": "Main Contract BQ", "fts": "BQ Search", "rowid": "rowid",
+            "columns": ["description"], "ref": "BQ ID", "title": "description"
+        },
+        "vo_item": {
+            "table": "VO Item", "fts": "VO Item Search", "rowid": "ID",
+            "columns": ["Description"], "ref": "VO ref", "title": "Description"
+        },
+        "sc_vo_item": {
+            "table": "SC VO Item", "fts": "SC VO Item Search", "rowid": "ID",
+            "columns": ["Description"], "ref": "VO ref", "title": "Description"
+        },
+        "abortive": {
+            "table": "Abortive Work Record", "fts": "Abortive Search", "rowid": "rowid",
+            "columns": ["Description"], "ref": "Abortive Ref", "title": "Description"
+        },
+    }
+
+    def __init__(self, db_manager: DB_Manager):
+        self.db = db_manager
+
+    @staticmethod
+    def _quote(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def _index_statements(self, scope):
+        s = self.SCOPES[scope]
+        fts, table, rowid = self._quote(s["fts"]), self._quote(s["table"]), s["rowid"]
+        cols = ', '.join(self._quote(c) for c in s["columns"])
+        new_vals = ', '.join(f'new.{self._quote(c)}' for c in s["columns"])
+        old_vals = ', '.join(f'old.{self._quote(c)}' for c in s["columns"])
+        delete_old = f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.{rowid}, {old_vals});"
+        insert_new = f"INSERT INTO {fts} (rowid, {cols}) VALUES (new.{rowid}, {new_vals});"
+        return [
+            f'''CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content={table}, content_rowid={self._quote(rowid)},
+                tokenize = 'unicode61 remove_diacritics 2')''',
+            f'CREATE TRIGGER IF NOT EXISTS {self._quote(s["fts"] + " AI")} AFTER INSERT ON {table} BEGIN {insert_new} END',
+            f'CREATE TRIGGER IF NOT EXISTS {self._quote(s["fts"] + " AD")} AFTER DELETE ON {table} BEGIN {delete_old} END',
+            # Only edits to indexed columns touch the index
+            f'''CREATE TRIGGER IF NOT EXISTS {self._quote(s["fts"] + " AU")} AFTER UPDATE OF {cols} ON {table}
+                BEGIN {delete_old} {insert_new} END''',
+        ]
+
+    def ensure_index(self):
+        """Create any missing search tables and triggers and fill new ones. Returns True on success."""
+        existing = {r['name'] for r in self.db.fetch_all("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        try:
+            with self.db.transaction():
+                for scope, s in self.SCOPES.items():
+                    if s["fts"] in existing or s["table"] not in existing:
+                        continue
+                    for stmt in self._index_statements(scope):
+                        self.db.conn.execute(stmt)
+                    fts = self._quote(s["fts"])
+                    self.db.conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+            return True
+        except sqlite3.Error as e:
+            # e.g. an SQLite build without FTS5; nothing is created so writes keep working
+            print(f"Error creating search index: {e}")
+            return False
+
+    def rebuild(self):
+        """Rebuild every search table from its source table."""
+        with self.db.transaction():
+            for s in self.SCOPES.values():
+                fts = self._quote(s["fts"])
+                self.db.conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+    @staticmethod
+    def _match_query(text):
+        """Turn free text into an FTS5 query: every word must match, as a prefix."""
+        terms = [t for t in text.split() if t]
+        return ' '.join('"' + t.replace('"', '""') + '"*' for t in terms)
+
+    def search(self, text, scopes=None, limit=50):
+        """
+        Ranked full-text search.
+        Returns a list of dicts (scope, ref, rowid, title, snippet, rank), best match first.
+        scopes limits the search to some of SCOPES (default: all).
+        """
+        match = self._match_query(text or "")
+        if not match:
+            return []
+        selects, params = [], []
+        for scope in scopes or self.SCOPES:
+            s = self.SCOPES.get(scope)
+            if not s:
+                continue
+            fts, table = self._quote(s["fts"]), self._quote(s["table"])
+            selects.append(f'''SELECT '{scope}' AS scope, t.{self._quote(s["ref"])} AS ref, t.{s["rowid"]} AS rowid,
+                       t.{self._quote(s["title"])} AS title,
+                       snippet({fts}, -1, '[', ']', '...', 12) AS snippet, bm25({fts}) AS rank
+                FROM {fts} JOIN {table} t ON t.{s["rowid"]} = {fts}.rowid
+                WHERE {fts} MATCH ?''')
+            params.append(match)
+        if not selects:
+            return []
+        query = ' UNION ALL '.join(selects) + ' ORDER BY rank LIMIT ?'
+        return self.db.fetch_all(query, tuple(params) + (limit,))
@@ -0,0 +1,88 @@
+import sqlite3
+from .DB_manager import DB_Manager
+
+
+class Sequence_Manager:
+    """
+    Reference numbers (BQ001, VO012, SC003, ...) handed out from the "ID Sequence"
+    table, one row per prefix holding the last number given out.
+
+    reserve() bumps the row inside a BEGIN IMMEDIATE transaction, so two sessions on
+    the same file never get the same number, and a block of n refs costs the same
+    two statements as one. A prefix's row is seeded the first time it is used from
+    the highest number already in its table (SEQUENCES); numbers reserved and not
+    saved are skipped, never handed out twice.
+    """
+    TABLE_SQL = '''CREATE TABLE IF NOT EXISTS "ID Sequence" (Prefix TEXT PRIMARY KEY, "Last No" INTEGER NOT NULL DEFAULT (0))'''
+    # Prefix -> (table, column) holding refs "<prefix><number>"
+    SEQUENCES = {
+        "BQ": ("Main Contract BQ", "BQ ID"),
+        "VO": ("Main Contract VO", "VO ref"),
+        "SC": ("Sub Contract", "Sub Contract No"),
+        "SCVO": ("Sub Contract VO", "VO ref"),
+        "AW": ("Abortive Work Record", "Abortive Ref"),
+        "DOC": ("Document Manager", "File"),
+    }
+    WIDTH = 3  # BQ001
+
+    def __init__(self, db_manager: DB_Manager):
+        self.db = db_manager
+        self._table_ready = False
+
+    @classmethod
+    def format_ref(cls, prefix, number):
+        return f"{prefix}{number:0{cls.WIDTH}d}"
+
+    @classmethod
+    def _max_query(cls, prefix):
+        """Highest number used in the prefix's table (0 if none); GLOB keeps SC from matching SCVO refs."""
+        table, column = cls.SEQUENCES[prefix]
+        return f'''SELECT COALESCE(MAX(CAST(substr("{column}", {len(prefix) + 1}) AS INTEGER)), 0)
+                   FROM "{table}" WHERE "{column}" GLOB '{prefix}[0-9]*' '''
+
+    def ensure_table(self):
+        if not self._table_ready:
+            self.db.conn.execute(self.TABLE_SQL)
+            self._table_ready = True
+
+    def _seed(self, prefix):
+        """Insert the prefix's row at its table's highest number if it has none yet."""
+        seed = self._max_query(prefix) if prefix in self.SEQUENCES else "SELECT 0"
+        self.db.conn.execute(f'''INSERT OR IGNORE INTO "ID Sequence" (Prefix, "Last No") SELECT ?, ({seed})''', (prefix,))
+
+    def reserve(self, prefix, n=1):
+        """
+        Reserve the next n refs for prefix and return them in order. Runs in its own
+        transaction (or joins the caller's db.transaction()); raises sqlite3.Error.
+        """
+        if n < 1:
+            return []
+        with self.db.transaction():
+            self.ensure_table()
+            update = '''UPDATE "ID Sequence" SET "Last No" = "Last No" + ? WHERE Prefix = ? RETURNING "Last No"'''
+            row = self.db.conn.execute(update, (n, prefix)).fetchone()
+            if row is None:
+                self._seed(prefix)
+                row = self.db.conn.execute(update, (n, prefix)).fetchone()
+        last = row[0]
+        return [self.format_ref(prefix, number) for number in range(last - n + 1, last + 1)]
+
+    def next_ref(self, prefix):
+        """One reserved ref, or None if the database refused it (the error is printed)."""
+        try:
+            return self.reserve(prefix)[0]
+        except sqlite3.Error as e:
+            print(f"Error reserving {prefix} reference: {e}")
+            return None
+
+    def sync(self, prefix):
+        """
+        Move the prefix's sequence past the highest number in its table, after rows were
+        written with explicit refs (e.g. a BQ import). Returns the last number.
+        """
+        with self.db.transaction():
+            self.ensure_table()
+            self._seed(prefix)
+            self.db.conn.execute(f'''UPDATE "ID Sequence" SET "Last No" = MAX("Last No", ({self._max_query(prefix)}))
+                                     WHERE Prefix = ?''', (prefix,))
+            return self.db.conn.execute('''SELECT "Last No" FROM "ID Sequence" WHERE Prefix = ?''', (prefix,)).fetchone()[0]
@@ -1,8 +1,13 @@
+import sqlite3
+from contextlib import contextmanager
 from .DB_manager import DB_Manager
 
 class Subcontract_Payment_Manager:
     def __init__(self, db_manager: DB_Manager):
         self.db = db_manager
+        # Item grid reference maps per subcontract, see get_ip_lookups
+        self._lookups = {}
+        self._lookup_stamp = None
 
     # Sub Contract IP Application (Header)
     def create_payment_application(self, sub_contract_no, ip_no, draft_date=None, issue_date=None, approved_date=None, payment_date=None, remark=""):
@@ -20,7 +25,10 @@ class Subcontract_Payment_Manager:
             "Paid Amount": 0.0,
             "Remark": remark
         }
-        return self.db.insert("Sub Contract IP Application", data)
+        rowid = self.db.insert("Sub Contract IP Application", data)
+        # Carry the running total into the new header (and any later ones)
+        self.recalculate_ip_totals(sub_contract_no, ip_no)
+        return rowid
 
     def get_payment_application(self, sub_contract_no, ip_no):
         return self.db.fetch_one("SELECT * FROM \"Sub Contract IP Application\" WHERE \"Sub Contract No\" = ? AND IP = ?", (sub_contract_no, ip_no))
@@ -29,12 +37,14 @@ class Subcontract_Payment_Manager:
         return self.db.fetch_all("SELECT * FROM \"Sub Contract IP Application\" WHERE \"Sub Contract No\" = ? ORDER BY IP ASC", (sub_contract_no,))
 
     def update_payment_application(self, sub_contract_no, ip_no, data):
-        self.db.update("Sub Contract IP Application", data, "\"Sub Contract No\" = ? AND IP = ?", (sub_contract_no, ip_no))
+        with self._keep_lookups():
+            self.db.update("Sub Contract IP Application", data, "\"Sub Contract No\" = ? AND IP = ?", (sub_contract_no, ip_no))
 
     def delete_payment_application(self, sub_contract_no, ip_no):
         # Items should be deleted by CASCADE, but let's be safe
         self.db.delete("Sub Contract IP Item", "\"Sub Contract No\" = ? AND IP = ?", (sub_contract_no, ip_no))
         self.db.delete("Sub Contract IP Application", "\"Sub Contract No\" = ? AND IP = ?", (sub_contract_no, ip_no))
+        self.recalculate_ip_totals(sub_contract_no, ip_no)
 
     def get_next_ip_no(self, sub_contract_no):
         result = self.db.fetch_one("SELECT IP FROM \"Sub Contract IP Application\" WHERE \"Sub Contract No\" = ? ORDER BY IP DESC LIMIT 1", (sub_contract_no,))
@@ -60,16 +70,19 @@ class Subcontract_Payment_Manager:
             "Paid Amount": paid_amt,
             "Remark": remark
         }
-        return self.db.insert("Sub Contract IP Item", data)
+        with self._keep_lookups():
+            return self.db.insert("Sub Contract IP Item", data)
 
     def get_ip_items(self, sub_contract_no, ip_no):
         return self.db.fetch_all("SELECT * FROM \"Sub Contract IP Item\" WHERE \"Sub Contract No\" = ? AND IP = ? ORDER BY Item ASC", (sub_contract_no, ip_no))
 
     def update_ip_item(self, sub_contract_no, ip_no, item_no, data):
-        self.db.update("Sub Contract IP Item", data, "\"Sub Contract No\" = ? AND IP = ? AND Item = ?", (sub_contract_no, ip_no, item_no))
+        with self._keep_lookups():
+            self.db.update("Sub Contract IP Item", data, "\"Sub Contract No\" = ? AND IP = ? AND Item = ?", (sub_contract_no, ip_no, item_no))
 
     def delete_ip_item(self, sub_contract_no, ip_no, item_no):
-        self.db.delete("Sub Contract IP Item", "\"Sub Contract No\" = ? AND IP = ? AND Item = ?", (sub_contract_no, ip_no, item_no))
+        with self._keep_lookups():
+            self.db.delete("Sub Contract IP Item", "\"Sub Contract No\" = ? AND IP = ? AND Item = ?", (sub_contract_no, ip_no, item_no))
 
     def get_next_item_no(self, sub_contract_no, ip_no):
         result = self.db.fetch_one("SELECT Item FROM \"Sub Contract IP Item\" WHERE \"Sub Contract No\" = ? AND IP = ? ORDER BY Item DESC LIMIT 1", (sub_contract_no, ip_no))
@@ -78,29 +91,247 @@ class Subcontract_Payment_Manager:
         else:
             return 1
 
+    # Item grid reference maps: (name, query giving ref, label text, amount[, agree amount])
+    LOOKUP_QUERIES = (
+        ("works", '''SELECT Works, NULL, COALESCE(Qty, 0) * COALESCE(Rate, 0) * (1 - COALESCE(Discount, 0))
+                     FROM "Sub Con Works" WHERE Subcontract = ? AND Works IS NOT NULL AND Works != '' ORDER BY Works'''),
+        ("vo", '''SELECT "VO ref", substr(Description, 1, 60), COALESCE("Application Amount", 0), COALESCE("Agree Amount", 0)
+                  FROM "Sub Contract VO" WHERE Subcontract = ? AND "VO ref" IS NOT NULL AND "VO ref" != '' ORDER BY "VO ref"'''),
+        ("cc", '''SELECT "CC No", Title, COALESCE("Agree Amount", 0)
+                  FROM "Contra Charge" WHERE "Deduct To" = ? AND "CC No" IS NOT NULL AND "CC No" != '' ORDER BY "CC No"'''),
+    )
+    # Grid columns filled from each map: (map, item ref column, display key, amount key[, agree key])
+    GRID_REFS = (
+        ("works", "Contract Work ref", "Works Display", "Works Amount"),
+        ("vo", "VO ref", "VO Display", "VO Amount", "VO Agree Amount"),
+        ("cc", "Contra Charge ref", "CC Display", "Contra Charge Amount"),
+    )
+
+    @staticmethod
+    def ref_label(ref, text):
+        """Dropdown label for a reference: 'REF - text', or just REF when text is blank."""
+        text = (text or '').strip()
+        return f"{ref} - {text}" if text else ref
+
+    @staticmethod
+    def ref_key(ref):
+        """The reference in a stored ref or dropdown label ('REF - text' -> 'REF')."""
+        ref = ref or ""
+        return ref.split(' - ')[0] if ' - ' in ref else ref
+
+    def get_ip_lookups(self, sub_contract_no):
+        """
+        Reference maps of one subcontract for its IP item grid, loaded with one query each:
+        {"works": {ref: (label, amount)}, "vo": {ref: (label, application amount, agree amount)},
+         "cc": {ref: (label, agree amount)}}, in dropdown order.
+        They are kept until the database is written to by another manager or connection;
+        IP item and header writes through this manager leave them as they are.
+        """
+        stamp = self.db.data_stamp()
+        if stamp != self._lookup_stamp:
+            self._lookups = {}
+            self._lookup_stamp = stamp
+        if sub_contract_no not in self._lookups:
+            lookups = {}
+            for name, query in self.LOOKUP_QUERIES:
+                cursor = self.db.read_query(query, (sub_contract_no,))
+                rows = cursor.fetchall() if cursor else []
+                lookups[name] = {r[0]: (self.ref_label(r[0], r[1]),) + tuple(r[2:]) for r in rows}
+            self._lookups[sub_contract_no] = lookups
+        return self._lookups[sub_contract_no]
+
+    def get_ref_labels(self, sub_contract_no):
+        """{"works"|"vo"|"cc": [dropdown labels]} of a subcontract."""
+        return {name: [entry[0] for entry in refs.values()] for name, refs in self.get_ip_lookups(sub_contract_no).items()}
+
+    def lookup_ref(self, sub_contract_no, name, ref):
+        """
+        Grid values for one reference of map `name` ("works", "vo" or "cc"):
+        (label, amount[, agree amount]). A ref that matches nothing keeps its text with zero amounts.
+        """
+        return self._lookup(self.get_ip_lookups(sub_contract_no), name, ref)
+
+    def _lookup(self, lookups, name, ref):
+        entry = lookups[name].get(self.ref_key(ref))
+        if entry is None:
+            return (ref or "",) + (0.0,) * (2 if name == "vo" else 1)
+        return entry
+
+    def get_ip_item_grid(self, sub_contract_no, ip_no):
+        """
+        Items of one IP ready for the item grid: each item dict also has "Works Amount",
+        "VO Amount" (application), "VO Agree Amount", "Contra Charge Amount" and the dropdown
+        labels "Works Display", "VO Display" and "CC Display", from the subcontract's
+        lookup maps instead of a query per row.
+        """
+        items = self.get_ip_items(sub_contract_no, ip_no)
+        lookups = self.get_ip_lookups(sub_contract_no)
+        for item in items:
+            for name, column, *keys in self.GRID_REFS:
+                item.update(zip(keys, self._lookup(lookups, name, item.get(column))))
+        return items
+
+    @contextmanager
+    def _keep_lookups(self):
+        """IP item and header writes do not touch the lookup tables: keep the cached maps current."""
+        before = self.db.data_stamp()
+        yield
+        after = self.db.data_stamp()
+        # Same data_version: no other connection committed in between
+        if self._lookup_stamp == before and after and after[0] == before[0]:
+            self._lookup_stamp = after
+
+    # The items of IP ? of a subcontract copied into IP ?, in one statement
+    COPY_ITEMS_QUERY = '''
+        INSERT INTO "Sub Contract IP Item" ("Sub Contract No", "IP", "Item", "Type", "Contract Work ref", "VO ref",
+            "Contra Charge ref", "Description", "Applied Amount", "Certified Amount", "Paid Amount", "Remark")
+        SELECT "Sub Contract No", ?, "Item", "Type", "Contract Work ref", "VO ref",
+            "Contra Charge ref", "Description", "Applied Amount", "Certified Amount", "Paid Amount", "Remark"
+        FROM "Sub Contract IP Item" WHERE "Sub Contract No" = ? AND IP = ?
+    '''
+    # Month end: a new header after every subcontract's latest IP...
+    ROLL_FORWARD_HEADERS_QUERY = '''
+        INSERT INTO "Sub Contract IP Application" ("Sub Contract No", "IP", "Draft Date",
+            "Accumulated Applied Amount", "Previous Applied Amount", "This Applied Amount",
+            "Certified Amount", "Paid Amount", "Remark")
+        SELECT "Sub Contract No", MAX(IP) + 1, ?, 0.0, 0.0, 0.0, 0.0, 0.0, ''
+        FROM "Sub Contract IP Application" GROUP BY "Sub Contract No"
+    '''
+    # ...then the items of the IP before each new one copied into it
+    ROLL_FORWARD_ITEMS_QUERY = '''
+        INSERT INTO "Sub Contract IP Item" ("Sub Contract No", "IP", "Item", "Type", "Contract Work ref", "VO ref",
+            "Contra Charge ref", "Description", "Applied Amount", "Certified Amount", "Paid Amount", "Remark")
+        SELECT i."Sub Contract No", i.IP + 1, i."Item", i."Type", i."Contract Work ref", i."VO ref",
+            i."Contra Charge ref", i."Description", i."Applied Amount", i."Certified Amount", i."Paid Amount", i."Remark"
+        FROM "Sub Contract IP Item" i
+        JOIN (SELECT "Sub Contract No" AS sc, MAX(IP) AS ip FROM "Sub Contract IP Application" GROUP BY "Sub Contract No") n
+          ON n.sc = i."Sub Contract No" AND i.IP = n.ip - 1
+    '''
+
     def copy_previous_ip_items(self, sub_contract_no, current_ip):
+        """
+        Copy the items of the subcontract's previous IP into current_ip with one
+        INSERT ... SELECT and update the header totals in the same transaction.
+        Returns True if any item was copied.
+        """
         if current_ip <= 1:
             return False
-        
-        prev_ip = current_ip - 1
-        prev_items = self.get_ip_items(sub_contract_no, prev_ip)
-        
-        if not prev_items:
+        try:
+            with self.db.transaction():
+                copied = self.db.execute_query(self.COPY_ITEMS_QUERY, (current_ip, sub_contract_no, current_ip - 1)).rowcount
+                if copied:
+                    self.db.execute_query(self.IP_TOTALS_QUERY, (sub_contract_no, sub_contract_no, current_ip))
+            return copied > 0
+        except sqlite3.Error as e:
+            print(f"Error copying items into IP {current_ip} of {sub_contract_no}: {e}")
             return False
-            
-        for item in prev_items:
-            self.add_ip_item(
-                sub_contract_no,
-                current_ip,
-                item['Item'],
-                item['Type'],
-                item['Contract Work Ref'],
-                item['VO Ref'],
-                item['Contra Charge Ref'],
-                item['Description'],
-                item['Applied Amount'], 
-                item['Certified Amount'], 
-                item['Paid Amount'], 
-                item['Remark']
+
+    def roll_forward_all(self, draft_date=None):
+        """
+        Open the next IP of every subcontract that has one, each with a copy of its
+        latest IP's items, and update the header totals, all in one transaction.
+        Returns the number of IPs opened, or None on error (nothing is written).
+        """
+        try:
+            with self.db.transaction():
+                opened = self.db.execute_query(self.ROLL_FORWARD_HEADERS_QUERY, (draft_date,)).rowcount
+                if opened:
+                    self.db.execute_query(self.ROLL_FORWARD_ITEMS_QUERY)
+                    self.db.execute_query(self.IP_TOTALS_QUERY, (None, None, 0))
+            return opened
+        except sqlite3.Error as e:
+            print(f"Error rolling subcontract IPs forward: {e}")
+            return None
+
+    # Sub contract IP items hold this IP's work only: Accumulated Applied Amount is the
+    # running total of This Applied Amount over the subcontract's IPs
+    IP_TOTALS_QUERY = '''
+        UPDATE "Sub Contract IP Application"
+        SET "This Applied Amount" = r.this_applied,
+            "Previous Applied Amount" = r.previous,
+            "Accumulated Applied Amount" = r.accumulated
+        FROM (
+            SELECT *,
+                   SUM(this_applied) OVER w AS accumulated,
+                   COALESCE(SUM(this_applied) OVER (w ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS previous
+            FROM (
+                SELECT a."Sub Contract No" AS sc, a.IP, COALESCE(SUM(i."Applied Amount"), 0) AS this_applied
+                FROM "Sub Contract IP Application" a
+                LEFT JOIN "Sub Contract IP Item" i ON i."Sub Contract No" = a."Sub Contract No" AND i.IP = a.IP
+                WHERE ? IS NULL OR a."Sub Contract No" = ?
+                GROUP BY a."Sub Contract No", a.IP
             )
-        return True
+            WINDOW w AS (PARTITION BY sc ORDER BY IP)
+        ) AS r
+        WHERE r.sc = "Sub Contract IP Application"."Sub Contract No"
+          AND r.IP = "Sub Contract IP Application".IP AND r.IP >= ?
+    '''
+
+    def recalculate_ip_totals(self, sub_contract_no=None, from_ip=None):
+        """
+        Recompute This/Previous/Accumulated Applied Amount of the IP headers of one
+        subcontract (default: every subcontract), from from_ip onwards, in one statement.
+        Returns the number of headers updated, or None on error.
+        """
+        params = (sub_contract_no, sub_contract_no, from_ip if from_ip is not None else 0)
+        cursor = self.db.execute_query(self.IP_TOTALS_QUERY, params)
+        return cursor.rowcount if cursor else None
+
+    def calculate_ip_totals(self, sub_contract_no, ip_no):
+        # Later IPs of the subcontract carry this IP's total forward, so they are recomputed too
+        return self.recalculate_ip_totals(sub_contract_no, ip_no)
+
+    # Item triggers keep the header rollups current: each item write adds its Applied
+    # Amount change to its IP's This/Accumulated Applied Amount and to the Previous/
+    # Accumulated Applied Amount of every later IP of the subcontract. Items hold one IP's
+    # work only, so unlike the main contract (whose items are cumulative) the change
+    # reaches all of them: an item write costs one header row per later IP, found by the
+    # header primary key range. Header Certified/Paid are entered by hand and left alone.
+    ROLLUP_TRIGGERS = ("SC IP Item Applied Rollup AI", "SC IP Item Applied Rollup AD", "SC IP Item Applied Rollup AU")
+    # Earlier triggers that also moved header Certified/Paid by the item amounts
+    OLD_ROLLUP_TRIGGERS = ("SC IP Item Rollup AI", "SC IP Item Rollup AD", "SC IP Item Rollup AU")
+
+    def _rollup_sql(self, row, sign):
+        """Trigger statements adding (sign '+') or removing ('-') item `row` (new/old) from the headers."""
+        applied = f'COALESCE({row}."Applied Amount", 0)'
+        return f'''
+            UPDATE "Sub Contract IP Application" SET
+                "This Applied Amount" = COALESCE("This Applied Amount", 0) {sign} {applied},
+                "Accumulated Applied Amount" = COALESCE("Accumulated Applied Amount", 0) {sign} {applied}
+            WHERE "Sub Contract No" = {row}."Sub Contract No" AND IP = {row}.IP;
+            UPDATE "Sub Contract IP Application" SET
+                "Previous Applied Amount" = COALESCE("Previous Applied Amount", 0) {sign} {applied},
+                "Accumulated Applied Amount" = COALESCE("Accumulated Applied Amount", 0) {sign} {applied}
+            WHERE "Sub Contract No" = {row}."Sub Contract No" AND IP > {row}.IP;'''
+
+    def _rollup_statements(self):
+        ai, ad, au = (f'"{name}"' for name in self.ROLLUP_TRIGGERS)
+        return [
+            f'CREATE TRIGGER IF NOT EXISTS {ai} AFTER INSERT ON "Sub Contract IP Item" BEGIN {self._rollup_sql("new", "+")} END',
+            f'CREATE TRIGGER IF NOT EXISTS {ad} AFTER DELETE ON "Sub Contract IP Item" BEGIN {self._rollup_sql("old", "-")} END',
+            f'''CREATE TRIGGER IF NOT EXISTS {au} AFTER UPDATE OF "Sub Contract No", IP, "Applied Amount"
+                ON "Sub Contract IP Item"
+                WHEN old."Sub Contract No" IS NOT new."Sub Contract No" OR old.IP IS NOT new.IP
+                  OR old."Applied Amount" IS NOT new."Applied Amount"
+                BEGIN {self._rollup_sql("old", "-")} {self._rollup_sql("new", "+")} END''',
+        ]
+
+    def ensure_rollup_triggers(self):
+        """
+        Create the header rollup triggers if missing, recomputing the Applied Amount
+        columns once so the triggers start from correct totals. Returns True on success.
+        """
+        existing = {r['name'] for r in self.db.fetch_all("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        if all(name in existing for name in self.ROLLUP_TRIGGERS):
+            return True
+        try:
+            with self.db.transaction():
+                for name in self.OLD_ROLLUP_TRIGGERS:
+                    self.db.conn.execute(f'DROP TRIGGER IF EXISTS "{name}"')
+                for stmt in self._rollup_statements():
+                    self.db.conn.execute(stmt)
+                self.db.conn.execute(self.IP_TOTALS_QUERY, (None, None, 0))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error creating IP rollup triggers: {e}")
+            return False
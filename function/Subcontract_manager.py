@@ -1,8 +1,13 @@
 from .DB_manager import DB_Manager
+from .Sequence_manager import Sequence_Manager
 
 class Subcontract_Manager:
     def __init__(self, db_manager: DB_Manager):
         self.db = db_manager
+        self.ids = Sequence_Manager(db_manager)
+        # Dossiers by subcontract, see get_dossier
+        self._dossiers = {}
+        self._dossier_stamp = None
 
     # Basic Information
     def add_subcontract(self, sc_no, sc_name, company_name, contract_type, contract_sum, final_acc_amt):
@@ -50,13 +55,7 @@ class Subcontract_Manager:
         self.db.delete("Sub Contract", "\"Sub Contract No\" = ?", (sc_no,))
 
     def get_next_sc_no(self):
-        result = self.db.fetch_one("SELECT \"Sub Contract No\" FROM \"Sub Contract\" ORDER BY rowid DESC LIMIT 1")
-        if result:
-            last_no = result['Sub Contract No']
-            num = int(last_no[2:]) + 1
-        else:
-            num = 1
-        return f"SC{num:03d}"
+        return self.ids.next_ref("SC")
 
     # Payment Application
     def create_sc_payment_application(self, ip_no, item_no, date, ip_type, work_ref, vo_ref, cc_ref, applied_amt, certified_amt, remark):
@@ -251,3 +250,75 @@ class Subcontract_Manager:
 
     def delete_sc_vo_link(self, sc_no, vo_ref):
         self.db.delete("SC VO Links", "\"Sub Contract\" = ? AND \"VO ref\" = ?", (sc_no, vo_ref))
+
+    # Subcontract dossier: everything the Subcontract tab shows for one subcontract
+    DOSSIER_QUERIES = {
+        "persons": 'SELECT * FROM "Sub Contract Person" WHERE "Sub Contract" = ? ORDER BY ID',
+        "payments": 'SELECT * FROM "Sub Contract IP Application" WHERE "Sub Contract No" = ? ORDER BY IP',
+        "works": '''SELECT Subcontract, Works, Qty, Unit, Rate, Discount,
+                            COALESCE(Amount, COALESCE(Qty, 0) * COALESCE(Rate, 0) * (1 - COALESCE(Discount, 0))) AS Amount,
+                            "Budget Amount", Trade
+                     FROM "Sub Con Works" WHERE Subcontract = ?''',
+        "contra_charges": '''SELECT c.*, COALESCE(t.amount, 0) AS "Items Amount", COALESCE(t.items, 0) AS "Item Count"
+                              FROM "Contra Charge" c
+                              LEFT JOIN (SELECT "CC No", SUM("Total Amount") AS amount, COUNT(*) AS items
+                                         FROM "Contra Charge Item"
+                                         WHERE "CC No" IN (SELECT "CC No" FROM "Contra Charge" WHERE "Deduct To" = ?1)
+                                         GROUP BY "CC No") t ON t."CC No" = c."CC No"
+                              WHERE c."Deduct To" = ?1 ORDER BY c."CC No"''',
+    }
+    # Link tables added by migration; a database without them gets empty lists
+    DOSSIER_LINK_QUERIES = {
+        "payment_links": ("SC Payment Links", 'SELECT * FROM "SC Payment Links" WHERE "Sub Contract" = ? ORDER BY IP'),
+        "works_links": ("SC Works Links", 'SELECT * FROM "SC Works Links" WHERE "Sub Contract" = ?'),
+    }
+    # VOs linked to the subcontract (link order, with the link remark) then its own VOs not linked
+    DOSSIER_VO_QUERY = '''
+        WITH refs AS (
+            SELECT "VO ref" AS ref, Remark AS link_remark, 1 AS linked, 0 AS src, rowid AS ord
+            FROM "SC VO Links" WHERE "Sub Contract" = ?1 AND "VO ref" IS NOT NULL AND "VO ref" != ''
+            UNION ALL
+            SELECT "VO ref", NULL, 0, 1, rowid FROM "Sub Contract VO"
+            WHERE Subcontract = ?1 AND "VO ref" IS NOT NULL AND "VO ref" != ''
+              AND "VO ref" NOT IN (SELECT "VO ref" FROM "SC VO Links" WHERE "Sub Contract" = ?1 AND "VO ref" IS NOT NULL)
+        )
+        SELECT refs.ref AS "VO ref", refs.linked AS Linked, COALESCE(refs.link_remark, '') AS "Link Remark",
+               v.Subcontract, v.Date, v."Receive Date", v.Description, v."Application Amount", v."Agree Amount",
+               v."Issue Assessment", v.Dispute, v.Agree, v.Reject, v.Remark
+        FROM refs LEFT JOIN "Sub Contract VO" v ON v."VO ref" = refs.ref
+        ORDER BY refs.src, refs.ord
+    '''
+    DOSSIER_DIRECT_VO_QUERY = '''
+        SELECT "VO ref", 0 AS Linked, '' AS "Link Remark", Subcontract, Date, "Receive Date", Description,
+               "Application Amount", "Agree Amount", "Issue Assessment", Dispute, Agree, Reject, Remark
+        FROM "Sub Contract VO" WHERE Subcontract = ? AND "VO ref" IS NOT NULL AND "VO ref" != '' ORDER BY rowid
+    '''
+
+    def get_dossier(self, sc_no, use_cache=True):
+        """
+        Everything about one subcontract in a fixed number of queries, whatever its size:
+        {"subcontract": row or None, "persons", "payments" (IP headers), "payment_links",
+         "works" (with Amount), "works_links", "vos" (linked and direct, with "Linked" and
+         "Link Remark"), "contra_charges" (deducted from it, with "Items Amount")}.
+        With use_cache the dossier is kept until the database is written to (DB_Manager.data_stamp);
+        treat it as read-only.
+        """
+        stamp = self.db.data_stamp()
+        if stamp != self._dossier_stamp:
+            self._dossiers = {}
+            self._dossier_stamp = stamp
+        if use_cache and sc_no in self._dossiers:
+            return self._dossiers[sc_no]
+
+        tables = {r['name'] for r in self.db.fetch_all(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('SC Payment Links', 'SC Works Links', 'SC VO Links')")}
+        dossier = {"subcontract": self.get_subcontract(sc_no)}
+        for key, query in self.DOSSIER_QUERIES.items():
+            dossier[key] = self.db.fetch_all(query, (sc_no,))
+        for key, (table, query) in self.DOSSIER_LINK_QUERIES.items():
+            dossier[key] = self.db.fetch_all(query, (sc_no,)) if table in tables else []
+        vo_query = self.DOSSIER_VO_QUERY if "SC VO Links" in tables else self.DOSSIER_DIRECT_VO_QUERY
+        dossier["vos"] = self.db.fetch_all(vo_query, (sc_no,))
+        if use_cache:
+            self._dossiers[sc_no] = dossier
+        return dossier
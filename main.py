@@ -1,6 +1,7 @@
 import sys
 import os
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget, QMessageBox
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget, QMessageBox, QWidget, QInputDialog, QFileDialog
+from PyQt5.QtCore import QTimer, QDate
 from PyQt5 import uic
 
 # Set root path
@@ -17,6 +18,9 @@ from function.MC_VO_manager import MC_VO_Manager
 from function.SC_VO_manager import SC_VO_Manager
 from function.Subcontract_Payment_manager import Subcontract_Payment_Manager
 from function.Contra_Charge_manager import Contra_Charge_Manager
+from function.Search_manager import Search_Manager
+from function.Certificate_manager import Certificate_Manager
+from function.Query_profiler import Query_Profiler
 from ui.Ui_SC_ContraChargeManager import Ui_SC_ContraChargeManager
 
 # Import UI classes
@@ -29,9 +33,36 @@ from ui.Ui_BQManager import Ui_BQManager
 from ui.Ui_MC_VOManager import Ui_MC_VOManager
 from ui.Ui_SC_VOManager import Ui_SC_VOManager
 from ui.Ui_SubcontractPaymentManager import Ui_SubcontractPaymentManager
+from ui.Task_runner import Task_Runner
+from ui.Autosave_queue import Autosave_Queue
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # Tab order in tabWidget: (tab text, attribute holding the Ui_* widget)
+    TABS = [
+        ("Document", "ui_doc"),
+        ("Abortive Work", "ui_abortive"),
+        ("Payment Application", "ui_payment"),
+        ("Variation Order", "ui_mc_vo"),
+        ("Subcontract", "ui_subcontract"),
+        ("SC Payment", "ui_sc_payment"),
+        ("SC VO", "ui_sc_vo"),
+        ("SC Contra Charge", "ui_sc_contra"),
+        ("Budget", "ui_budget"),
+        ("Bill of Quantities", "ui_bq"),
+    ]
+    TAB_INDEX = {attr: i for i, (_, attr) in enumerate(TABS)}
+    # Built while the window is idle after it is first shown, most used first
+    PREFETCH_TABS = ["ui_payment", "ui_subcontract", "ui_sc_payment", "ui_budget"]
+    PREFETCH_DELAY_MS = 300
+    # Method each tab reloads its data with (Refresh Data)
+    TAB_REFRESH = {
+        "ui_doc": "refresh_list", "ui_abortive": "refresh_list", "ui_payment": "refresh_ips",
+        "ui_subcontract": "refresh_list", "ui_budget": "refresh_list", "ui_bq": "refresh_table",
+        "ui_mc_vo": "refresh_list", "ui_sc_vo": "refresh_list", "ui_sc_contra": "refresh_list",
+        "ui_sc_payment": "load_subcontracts",
+    }
+
+    def __init__(self, db_path=None):
         super().__init__()
         
         # Load the Main Window UI
@@ -39,8 +70,12 @@ class MainWindow(QMainWindow):
         uic.loadUi(ui_path, self)
 
         # Initialize Database
-        db_path = os.path.join(ROOT_PATH, "database", "QS_Project.db")
-        self.db_manager = DB_Manager(db_path)
+        self.db_path = db_path or os.path.join(ROOT_PATH, "database", "QS_Project.db")
+        # Query profiler shown in Tool > Diagnostics; QS_PROFILE_SQL=1 records from startup
+        self.query_profiler = Query_Profiler(slow_log_path=os.path.splitext(self.db_path)[0] + "_slow_queries.log")
+        if os.environ.get("QS_PROFILE_SQL"):
+            self.query_profiler.enable()
+        self.db_manager = DB_Manager(self.db_path)
         # Create tables if they don't exist (using the schema file)
         # self.db_manager.create_tables_from_schema(os.path.join(root_path, "database", "Project_db_Schema.txt")) 
 
@@ -64,6 +99,12 @@ class MainWindow(QMainWindow):
         except Exception as e:
             # Log migration failure but continue
             print(f"Failed to ensure Contra Charge Document table exists: {e}")
+        # Full-text search index (FTS5 tables + sync triggers), created on first run
+        self.search_manager = Search_Manager(self.db_manager)
+        self.search_manager.ensure_index()
+        # IP header totals maintained by item triggers, created on first run
+        self.payment_manager.ensure_rollup_triggers()
+        self.sc_payment_manager.ensure_rollup_triggers()
         
 
         # Setup UI Tabs
@@ -71,40 +112,16 @@ class MainWindow(QMainWindow):
         
         # Set tab position (options: North, South, West, East)
         self.tabWidget.setTabPosition(QTabWidget.North)  # Change to desired position
-        
-        self.ui_doc = Ui_DocManager(self.doc_manager)
-        self.ui_abortive = Ui_AbortiveManager(self.abortive_manager)
-        self.ui_payment = Ui_PaymentManager(self.payment_manager)
-        self.ui_subcontract = Ui_SubcontractManager(self.subcontract_manager)
-        self.ui_budget = Ui_BudgetManager(self.budget_manager)
-        self.ui_bq = Ui_BQManager(self.bq_manager)
-        self.ui_mc_vo = Ui_MC_VOManager(self.mc_vo_manager)
-        self.ui_sc_vo = Ui_SC_VOManager(self.sc_vo_manager)
-        self.ui_sc_payment = Ui_SubcontractPaymentManager(self.sc_payment_manager, self.subcontract_manager)
-        self.ui_sc_contra = Ui_SC_ContraChargeManager(self.contra_charge_manager, self.subcontract_manager)
-        
-        # Wire Subcontract UI to Subcontract Payment UI so Apply New button can navigate & prefill
-        try:
-            self.ui_subcontract.set_sc_payment_ui(self.ui_sc_payment, self.tabWidget)
-        except Exception:
-            pass
 
-        # Wire Subcontract UI to Subcontract VO UI so Add New VO button can navigate & prefill
-        try:
-            self.ui_subcontract.set_sc_vo_ui(self.ui_sc_vo, self.tabWidget)
-        except Exception:
-            pass
-
-        self.tabWidget.addTab(self.ui_doc, "Document")
-        self.tabWidget.addTab(self.ui_abortive, "Abortive Work")
-        self.tabWidget.addTab(self.ui_payment, "Payment Application")
-        self.tabWidget.addTab(self.ui_mc_vo, "Variation Order")
-        self.tabWidget.addTab(self.ui_subcontract, "Subcontract")
-        self.tabWidget.addTab(self.ui_sc_payment, "SC Payment")
-        self.tabWidget.addTab(self.ui_sc_vo, "SC VO")
-        self.tabWidget.addTab(self.ui_sc_contra, "SC Contra Charge")
-        self.tabWidget.addTab(self.ui_budget, "Budget")
-        self.tabWidget.addTab(self.ui_bq, "Bill of Quantities")
+        # Each tab starts as an empty placeholder; its Ui_* widget is built the first time
+        # the tab is selected (ensure_tab), see TABS
+        for label, _ in self.TABS:
+            self.tabWidget.addTab(QWidget(), label)
+        self.tabWidget.currentChanged.connect(self.ensure_tab)
+        # Leaving a tab writes its unsaved edits without waiting for the autosave interval
+        self.tabWidget.currentChanged.connect(lambda _: Autosave_Queue.instance().flush())
+        self.ensure_tab(self.tabWidget.currentIndex())
+        self._prefetch_started = False
 
         # Hide native tab bar; navigation will be via left tree
         try:
@@ -171,6 +188,93 @@ class MainWindow(QMainWindow):
         # Add refresh action to menu bar
         self.setup_menu_bar()
 
+    def __getattr__(self, name):
+        # ui_* widgets of tabs that have not been opened yet are built on first access,
+        # so tabs can keep reaching each other through main_window.ui_doc etc.
+        index = MainWindow.TAB_INDEX.get(name)
+        if index is None:
+            raise AttributeError(name)
+        return self.ensure_tab(index)
+
+    def create_tab(self, attr):
+        """Build the Ui_* widget for a tab."""
+        if attr == "ui_doc":
+            return Ui_DocManager(self.doc_manager)
+        if attr == "ui_abortive":
+            return Ui_AbortiveManager(self.abortive_manager)
+        if attr == "ui_payment":
+            return Ui_PaymentManager(self.payment_manager)
+        if attr == "ui_mc_vo":
+            return Ui_MC_VOManager(self.mc_vo_manager)
+        if attr == "ui_subcontract":
+            widget = Ui_SubcontractManager(self.subcontract_manager)
+            # Wire Subcontract UI to Subcontract Payment UI so Apply New button can navigate & prefill
+            try:
+                widget.set_sc_payment_ui(self.ui_sc_payment, self.tabWidget)
+            except Exception:
+                pass
+            # Wire Subcontract UI to Subcontract VO UI so Add New VO button can navigate & prefill
+            try:
+                widget.set_sc_vo_ui(self.ui_sc_vo, self.tabWidget)
+            except Exception:
+                pass
+            return widget
+        if attr == "ui_sc_payment":
+            return Ui_SubcontractPaymentManager(self.sc_payment_manager, self.subcontract_manager)
+        if attr == "ui_sc_vo":
+            return Ui_SC_VOManager(self.sc_vo_manager)
+        if attr == "ui_sc_contra":
+            return Ui_SC_ContraChargeManager(self.contra_charge_manager, self.subcontract_manager)
+        if attr == "ui_budget":
+            return Ui_BudgetManager(self.budget_manager)
+        if attr == "ui_bq":
+            return Ui_BQManager(self.bq_manager)
+        raise AttributeError(attr)
+
+    def ensure_tab(self, index):
+        """Return the widget of tab `index`, building it in place of its placeholder on first use."""
+        if index < 0 or index >= len(self.TABS):
+            return None
+        label, attr = self.TABS[index]
+        widget = self.__dict__.get(attr)
+        if widget is not None:
+            return widget
+        widget = self.create_tab(attr)
+        setattr(self, attr, widget)
+        # Swap the placeholder for the real widget without re-entering currentChanged
+        current = self.tabWidget.currentIndex()
+        placeholder = self.tabWidget.widget(index)
+        self.tabWidget.blockSignals(True)
+        self.tabWidget.removeTab(index)
+        self.tabWidget.insertTab(index, widget, label)
+        self.tabWidget.setCurrentIndex(current)
+        self.tabWidget.blockSignals(False)
+        placeholder.deleteLater()
+        return widget
+
+    def built_tabs(self):
+        """(attr, widget) for the tabs built so far."""
+        return [(attr, self.__dict__[attr]) for _, attr in self.TABS if attr in self.__dict__]
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._prefetch_started:
+            self._prefetch_started = True
+            QTimer.singleShot(self.PREFETCH_DELAY_MS, self.prefetch_tabs)
+
+    def prefetch_tabs(self):
+        """Build the next not-yet-opened tab of PREFETCH_TABS, one per event loop pass."""
+        pending = [attr for attr in self.PREFETCH_TABS if attr not in self.__dict__]
+        if not pending:
+            return
+        try:
+            self.ensure_tab(self.TAB_INDEX[pending[0]])
+        except Exception as e:
+            print(f"Failed to prefetch tab {pending[0]}: {e}")
+            self.PREFETCH_TABS = [attr for attr in self.PREFETCH_TABS if attr != pending[0]]
+        if len(pending) > 1:
+            QTimer.singleShot(0, self.prefetch_tabs)
+
     def setup_menu_bar(self):
         """Setup menu bar with refresh functionality"""
         # Get or create View menu
@@ -187,38 +291,26 @@ class MainWindow(QMainWindow):
         create_db_action.setStatusTip("Create a new database from schema file")
         create_db_action.triggered.connect(self.create_new_database)
 
+        certificates_action = view_menu.addAction("Generate Payment Certificates...")
+        certificates_action.setStatusTip("Render a payment certificate for every subcontract with an IP in a month")
+        certificates_action.triggered.connect(self.generate_certificates)
+
+        roll_forward_action = view_menu.addAction("Roll Forward Subcontract IPs")
+        roll_forward_action.setStatusTip("Open the next IP of every subcontract with its latest IP's items")
+        roll_forward_action.triggered.connect(self.roll_forward_subcontract_ips)
+
+        diagnostics_action = view_menu.addAction("Diagnostics...")
+        diagnostics_action.setStatusTip("Query timings per screen and the slow query log")
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+
     def refresh_all_data(self):
         """Refresh all data across all tabs"""
         try:
-            # Refresh each tab's data
-            if hasattr(self.ui_doc, 'refresh_list'):
-                self.ui_doc.refresh_list()
-            
-            if hasattr(self.ui_abortive, 'refresh_list'):
-                self.ui_abortive.refresh_list()
-            
-            if hasattr(self.ui_payment, 'refresh_ips'):
-                self.ui_payment.refresh_ips()
-            
-            if hasattr(self.ui_subcontract, 'refresh_list'):
-                self.ui_subcontract.refresh_list()
-            
-            if hasattr(self.ui_budget, 'refresh_list'):
-                self.ui_budget.refresh_list()
-            
-            if hasattr(self.ui_bq, 'refresh_table'):
-                self.ui_bq.refresh_table()
-            
-            if hasattr(self.ui_mc_vo, 'refresh_list'):
-                self.ui_mc_vo.refresh_list()
-            
-            if hasattr(self.ui_sc_vo, 'refresh_list'):
-                self.ui_sc_vo.refresh_list()
-            if hasattr(self, 'ui_sc_contra') and hasattr(self.ui_sc_contra, 'refresh_list'):
-                self.ui_sc_contra.refresh_list()
-            
-            if hasattr(self.ui_sc_payment, 'load_subcontracts'):
-                self.ui_sc_payment.load_subcontracts()
+            # Refresh each tab's data (tabs not opened yet load fresh data when they are built)
+            for attr, widget in self.built_tabs():
+                method = getattr(widget, self.TAB_REFRESH.get(attr, ''), None)
+                if method:
+                    method()
             
             # Show status message
             self.statusBar().showMessage("All data refreshed from database", 3000)
@@ -226,6 +318,65 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Refresh Error", f"Error refreshing data: {str(e)}")
 
+    def show_diagnostics(self):
+        """Open the query profiler dialog (not modal, so the screens being measured stay usable)"""
+        from ui.Ui_Diagnostics import Ui_DiagnosticsDialog
+        dialog = getattr(self, "diagnostics_dialog", None)
+        if dialog is None:
+            dialog = self.diagnostics_dialog = Ui_DiagnosticsDialog(self.query_profiler, self)
+        dialog.refresh()
+        dialog.show()
+        dialog.raise_()
+
+    def roll_forward_subcontract_ips(self):
+        """Month end: open the next IP of every subcontract in one transaction"""
+        reply = QMessageBox.question(
+            self,
+            "Roll Forward Subcontract IPs",
+            "Open the next IP of every subcontract, copying the items of its latest IP?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        opened = self.sc_payment_manager.roll_forward_all(QDate.currentDate().toString("yyyy-MM-dd"))
+        if opened is None:
+            QMessageBox.warning(self, "Roll Forward Subcontract IPs", "Could not roll the IPs forward; nothing was changed.")
+            return
+        self.refresh_all_data()
+        self.statusBar().showMessage(f"Opened {opened} subcontract IPs", 5000)
+
+    def generate_certificates(self):
+        """Ask for a period, output folder and template, then render the certificates in the background"""
+        period, ok = QInputDialog.getText(self, "Payment Certificates", "Period (YYYY-MM):",
+                                          text=QDate.currentDate().toString("yyyy-MM"))
+        if not ok:
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "Save Certificates To")
+        if not out_dir:
+            return
+        template, _ = QFileDialog.getOpenFileName(self, "Certificate Template (Cancel for the default layout)",
+                                                  "", "Excel Files (*.xlsx)")
+        try:
+            if not template:
+                template = Certificate_Manager.create_default_template(os.path.join(out_dir, "certificate_template.xlsx"))
+            manager = Certificate_Manager(self.db_manager)
+            manager.get_period_certificates(period.strip())
+        except Exception as e:
+            QMessageBox.warning(self, "Payment Certificates", str(e))
+            return
+
+        def done(manifest):
+            message = f"{manifest['count']} certificates written to {out_dir} in {manifest['seconds']:.1f}s"
+            if manifest['failed']:
+                message += f"\n{manifest['failed']} failed, see manifest.json"
+            QMessageBox.information(self, "Payment Certificates", message)
+
+        Task_Runner.instance().run_with_progress(
+            self, "certificates", "Generating payment certificates...", manager, "generate_certificates",
+            period.strip(), template, out_dir, on_result=done,
+            on_error=lambda message: QMessageBox.warning(self, "Payment Certificates", message))
+
     def create_new_database(self):
         """Create a new database from the schema file"""
         reply = QMessageBox.question(
@@ -238,19 +389,25 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.Yes:
             try:
-                # Close current connection
-                if hasattr(self, 'db_manager'):
-                    self.db_manager.close()
+                # Write pending edits, stop background loads and close every connection on the
+                # file, so no WAL or shared-memory file outlives it
+                Autosave_Queue.instance().shutdown()
+                Task_Runner.instance().shutdown()
+                self.db_manager.close()
                 
-                # Delete existing database file
-                db_path = os.path.join(ROOT_PATH, "database", "QS_Project.db")
-                if os.path.exists(db_path):
-                    os.remove(db_path)
+                # Delete existing database file with its -wal and -shm files
+                db_path = self.db_path
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(db_path + suffix):
+                        os.remove(db_path + suffix)
                 
-                # Create new database manager and schema
-                self.db_manager = DB_Manager(db_path)
+                # Reopen the same DB_Manager (every manager holds it) on a new file and create the schema
+                self.db_manager.connect()
                 schema_path = os.path.join(ROOT_PATH, "database", "Project_db_Schema.txt")
                 self.db_manager.create_tables_from_schema(schema_path)
+                self.search_manager.ensure_index()
+                self.payment_manager.ensure_rollup_triggers()
+                self.sc_payment_manager.ensure_rollup_triggers()
                 
                 # Refresh all data after creating new database
                 self.refresh_all_data()
@@ -259,6 +416,9 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "Error", f"Failed to create database: {str(e)}")
 
     def closeEvent(self, event):
+        # Write pending edits and stop background loads/exports before the connection goes away
+        Autosave_Queue.instance().shutdown()
+        Task_Runner.instance().shutdown()
         self.db_manager.close()
         event.accept()
 
@@ -0,0 +1,34 @@
+-- Migration: 2026-10-18
+-- Purpose: Add the "ID Sequence" table the managers reserve new references from
+-- (BQ001, VO001, SC001, SCVO001, AW001, DOC001; see function/Sequence_manager.py)
+-- instead of reading the last row by rowid, which broke after out-of-order inserts
+-- and let two users get the same reference.
+-- Each prefix is seeded from the highest number already used in its table. The
+-- application seeds a missing prefix the same way on first use, so running this
+-- script is optional. Safe to re-run: existing sequence rows are left untouched.
+-- IMPORTANT: Backup your database before running this script.
+
+BEGIN TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS "ID Sequence" (Prefix TEXT PRIMARY KEY, "Last No" INTEGER NOT NULL DEFAULT (0));
+
+INSERT OR IGNORE INTO "ID Sequence" (Prefix, "Last No")
+SELECT 'BQ', COALESCE(MAX(CAST(substr("BQ ID", 3) AS INTEGER)), 0) FROM "Main Contract BQ" WHERE "BQ ID" GLOB 'BQ[0-9]*';
+
+INSERT OR IGNORE INTO "ID Sequence" (Prefix, "Last No")
+SELECT 'VO', COALESCE(MAX(CAST(substr("VO ref", 3) AS INTEGER)), 0) FROM "Main Contract VO" WHERE "VO ref" GLOB 'VO[0-9]*';
+
+-- GLOB 'SC[0-9]*' does not match SCVO refs
+INSERT OR IGNORE INTO "ID Sequence" (Prefix, "Last No")
+SELECT 'SC', COALESCE(MAX(CAST(substr("Sub Contract No", 3) AS INTEGER)), 0) FROM "Sub Contract" WHERE "Sub Contract No" GLOB 'SC[0-9]*';
+
+INSERT OR IGNORE INTO "ID Sequence" (Prefix, "Last No")
+SELECT 'SCVO', COALESCE(MAX(CAST(substr("VO ref", 5) AS INTEGER)), 0) FROM "Sub Contract VO" WHERE "VO ref" GLOB 'SCVO[0-9]*';
+
+INSERT OR IGNORE INTO "ID Sequence" (Prefix, "Last No")
+SELECT 'AW', COALESCE(MAX(CAST(substr("Abortive Ref", 3) AS INTEGER)), 0) FROM "Abortive Work Record" WHERE "Abortive Ref" GLOB 'AW[0-9]*';
+
+INSERT OR IGNORE INTO "ID Sequence" (Prefix, "Last No")
+SELECT 'DOC', COALESCE(MAX(CAST(substr(File, 4) AS INTEGER)), 0) FROM "Document Manager" WHERE File GLOB 'DOC[0-9]*';
+
+COMMIT;
@@ -0,0 +1,42 @@
+-- Migration: 2026-10-18
+-- Purpose: Add secondary indexes for the filters and joins the managers use
+-- (tools/explain_queries.py lists the queries that still scan a full table).
+-- Safe to re-run: every index is created only if missing. No table data changes.
+-- Primary keys already cover "Sub Contract IP Application"/"Sub Contract IP Item"
+-- lookups by "Sub Contract No" (leading PK column), so no extra index is added there.
+-- IMPORTANT: Backup your database before running this script.
+
+BEGIN TRANSACTION;
+
+-- Budget analysis: SUM(Amount) by Trade. Amount is a generated column and SQLite
+-- always reads it from the table row, so an index cannot cover these sums; indexing
+-- Trade still turns per-trade sums into index searches and lets GROUP BY Trade walk
+-- the index in order instead of sorting in a temp b-tree.
+CREATE INDEX IF NOT EXISTS "idx_main_contract_bq_trade" ON "Main Contract BQ" (Trade);
+CREATE INDEX IF NOT EXISTS "idx_vo_item_trade" ON "VO Item" (Trade);
+CREATE INDEX IF NOT EXISTS "idx_sub_con_works_trade" ON "Sub Con Works" (Trade);
+CREATE INDEX IF NOT EXISTS "idx_sc_vo_item_trade" ON "SC VO Item" (Trade);
+
+-- Contra charge items are joined to works by "Give to" = Works
+CREATE INDEX IF NOT EXISTS "idx_sub_con_works_works" ON "Sub Con Works" (Works);
+CREATE INDEX IF NOT EXISTS "idx_contra_charge_item_give_to" ON "Contra Charge Item" ("Give to");
+
+-- Child rows by parent reference
+CREATE INDEX IF NOT EXISTS "idx_vo_item_vo_ref" ON "VO Item" ("VO ref");
+CREATE INDEX IF NOT EXISTS "idx_sc_vo_item_vo_ref" ON "SC VO Item" ("VO ref");
+CREATE INDEX IF NOT EXISTS "idx_sub_contract_vo_subcontract" ON "Sub Contract VO" (Subcontract);
+CREATE INDEX IF NOT EXISTS "idx_contra_charge_deduct_to" ON "Contra Charge" ("Deduct To");
+CREATE INDEX IF NOT EXISTS "idx_contra_charge_item_cc_no" ON "Contra Charge Item" ("CC No");
+CREATE INDEX IF NOT EXISTS "idx_mc_ip_item_vo_ref" ON "Main Contract IP Item" ("VO Ref");
+CREATE INDEX IF NOT EXISTS "idx_sub_contract_person_sc" ON "Sub Contract Person" ("Sub Contract");
+CREATE INDEX IF NOT EXISTS "idx_sub_contract_contract_type" ON "Sub Contract" ("Contract Type");
+
+-- Documents: lookups by type and reverse lookups from the link tables
+CREATE INDEX IF NOT EXISTS "idx_document_manager_type" ON "Document Manager" (Type);
+CREATE INDEX IF NOT EXISTS "idx_document_cover_child" ON "Document Cover" ("Child Document");
+CREATE INDEX IF NOT EXISTS "idx_vo_abortive_record_abortive" ON "VO Abortive Record" ("Abortive Work ref");
+CREATE INDEX IF NOT EXISTS "idx_abortive_work_document_doc" ON "Abortive Work_Document" ("Doc Ref");
+CREATE INDEX IF NOT EXISTS "idx_vo_document_doc" ON "VO Document" ("Doc Ref");
+CREATE INDEX IF NOT EXISTS "idx_sc_vo_document_doc" ON "SC VO Document" ("Doc Ref");
+
+COMMIT;
@@ -0,0 +1,83 @@
+import sys, os
+import time
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+from function.DB_manager import DB_Manager
+from function.BQ_manager import BQ_Manager
+from ui.Autosave_queue import Autosave_Queue
+
+
+@pytest.fixture
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def bq(tmp_path):
+    db = DB_Manager(str(tmp_path / 'autosave.db'))
+    db.execute_query('CREATE TABLE "Main Contract BQ" ("BQ ID" TEXT PRIMARY KEY, description TEXT, Qty REAL, Rate REAL, Remark TEXT)')
+    db.execute_query('CREATE TABLE "Update Log" ("BQ ID" TEXT)')
+    db.execute_query('''CREATE TRIGGER bq_update_log AFTER UPDATE ON "Main Contract BQ"
+                        BEGIN INSERT INTO "Update Log" VALUES (new."BQ ID"); END''')
+    db.insert_many("Main Contract BQ", ({"BQ ID": f"BQ{i:03d}", "Qty": 1, "Rate": i} for i in range(1, 4)))
+    yield BQ_Manager(db)
+    db.close()
+
+
+def updates(bq):
+    return [r["BQ ID"] for r in bq.db.fetch_all('SELECT "BQ ID" FROM "Update Log" ORDER BY rowid')]
+
+
+def test_keystrokes_coalesce_into_one_update_per_record(app, bq):
+    autosave = Autosave_Queue(interval_ms=60000)
+    saved = []
+    text = "Concrete grade 40"
+    for i in range(1, len(text) + 1):
+        autosave.stage(bq, "update_bq_item", "BQ001", {"description": text[:i]}, on_saved=lambda ref, changes: saved.append((ref, changes)))
+    autosave.stage(bq, "update_bq_item", "BQ001", {"Qty": 5})
+    autosave.stage(bq, "update_bq_item", "BQ002", {"Remark": "checked"})
+    assert updates(bq) == [] and autosave.is_dirty()
+
+    autosave.flush(wait=True)
+    app.processEvents()
+    assert sorted(updates(bq)) == ["BQ001", "BQ002"]
+    assert saved == [("BQ001", {"description": text, "Qty": 5})]
+    assert not autosave.is_dirty()
+    autosave.shutdown()
+
+
+def test_flush_writes_only_changed_columns(app, bq):
+    autosave = Autosave_Queue(interval_ms=60000)
+    autosave.stage(bq, "update_bq_item", "BQ003", {"Remark": "mine"})
+    # Another user changes a column this editor did not touch
+    bq.update_bq_item("BQ003", {"Rate": 99})
+    autosave.shutdown()
+    row = bq.get_bq_item("BQ003")
+    assert (row["Remark"], row["Rate"]) == ("mine", 99)
+
+
+def test_interval_flushes_in_the_background_and_reports_errors(app, bq):
+    autosave = Autosave_Queue(interval_ms=20)
+    saved, errors = [], []
+    autosave.stage(bq, "update_bq_item", "BQ001", {"Remark": "later"}, on_saved=lambda ref, changes: saved.append(ref))
+    deadline = time.monotonic() + 5
+    while not saved and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    assert saved == ["BQ001"] and bq.get_bq_item("BQ001")["Remark"] == "later"
+
+    # A failing record is rolled back alone and reported to the editor
+    autosave.stage(bq, "update_bq_item", "BQ002", {"Remark": "kept"}, on_saved=lambda ref, changes: saved.append(ref))
+    autosave.stage(bq, "update_bq_item", "BQ003", {"No Such Column": 1}, on_error=lambda ref, message: errors.append((ref, message)))
+    autosave.flush(wait=True)
+    app.processEvents()
+    assert errors and errors[0][0] == "BQ003" and "No Such Column" in errors[0][1]
+    assert len(errors) == 1 and saved == ["BQ001", "BQ002"]
+    assert bq.get_bq_item("BQ002")["Remark"] == "kept"
+    assert updates(bq) == ["BQ001", "BQ002"]
+    autosave.shutdown()
@@ -0,0 +1,60 @@
+import sys, os
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.BQ_manager import BQ_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+
+@pytest.fixture
+def bq(tmp_path):
+    db = DB_Manager(str(tmp_path / 'qs_test.db'))
+    db.create_tables_from_schema(SCHEMA_PATH)
+    rows = [{"BQ ID": f"BQ{i:03d}", "Bill": f"Bill {i % 3}", "description": f"Item {i}{' 50%_off' if i == 7 else ''}",
+             "Qty": i, "Rate": 10, "Discount": 0, "Trade": "Concrete" if i % 2 else "Steel"} for i in range(1, 21)]
+    db.insert_many("Main Contract BQ", rows)
+    yield BQ_Manager(db)
+    db.close()
+
+
+def test_query_bq_items_filters_and_totals_in_sql(bq):
+    items, count, total = bq.query_bq_items("Trade", "conc")
+    assert count == 10
+    assert total == pytest.approx(sum(i * 10 for i in range(1, 21, 2)))
+    assert all(item["Trade"] == "Concrete" for item in items)
+
+
+def test_query_bq_items_sorts_and_pages(bq):
+    page, count, _ = bq.query_bq_items(sort_field="Amount", ascending=False, offset=5, limit=5)
+    assert count == 20
+    assert [item["BQ ID"] for item in page] == ["BQ015", "BQ014", "BQ013", "BQ012", "BQ011"]
+    # limit=0 only returns the count and total
+    assert bq.query_bq_items("Bill", "Bill 1", limit=0)[:2] == ([], 7)
+
+
+def test_query_bq_items_treats_wildcards_literally(bq):
+    items, count, _ = bq.query_bq_items("Description", "50%_")
+    assert count == 1 and items[0]["BQ ID"] == "BQ007"
+
+
+def test_import_from_excel_streams_in_chunks(bq, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / 'bq.xlsx')
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["BQ ID", "Bill", "Description", "Qty", "Rate", "Trade"])
+    ws.append(["BQ001", "Bill 9", "Updated item", 2, 10, "Steel"])
+    for i in range(21, 28):
+        ws.append([f"BQ{i:03d}", "Bill 9", f"New item {i}", 1, 5, "Steel"])
+    ws.append([None, "Bill 9", "No ID, skipped", 1, 1, "Steel"])
+    wb.save(path)
+
+    calls = []
+    assert bq.import_from_excel(path, progress=lambda done, total: calls.append((done, total)), chunk_size=3) == 8
+    assert [done for done, _ in calls] == [3, 6, 8]
+    assert bq.get_bq_item("BQ001")["description"] == "Updated item"
+    assert bq.query_bq_items("Bill", "Bill 9", limit=0)[1] == 8
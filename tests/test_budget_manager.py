@@ -49,3 +49,76 @@ def test_export_analysis_creates_file(bm, tmp_path):
             assert 'Budget Analysis' in x
     except Exception:
         pytest.skip('openpyxl/pandas not available or too old; skip detailed read')
+
+
+def _per_trade_totals(db, trade):
+    """The per-trade queries Budget_Manager ran before the grouped pass, kept as the reference."""
+    def total(sql):
+        row = db.fetch_one(sql, (trade,))
+        return row['Total'] if row and row['Total'] else 0
+    return {
+        'main_bq': total('SELECT SUM(Amount) as Total FROM "Main Contract BQ" WHERE Trade = ?'),
+        'vo_agreed': total('SELECT SUM(Amount) as Total FROM "VO Item" WHERE Trade = ? AND Agree = 1'),
+        'vo_potential': total('SELECT SUM(Amount) as Total FROM "VO Item" WHERE Trade = ? AND (Agree IS NULL OR Agree = 0)'),
+        'sc_works': total('SELECT SUM(Amount) as Total FROM "Sub Con Works" WHERE Trade = ?'),
+        'sc_vo_agreed': total('SELECT SUM(Amount) as Total FROM "SC VO Item" WHERE Trade = ? AND Agree = 1'),
+        'sc_vo_potential': total('SELECT SUM(Amount) as Total FROM "SC VO Item" WHERE Trade = ? AND (Agree IS NULL OR Agree = 0)'),
+        'contra_charge': total('''SELECT SUM(c.Qty * (c.Rate + COALESCE(c."Admin Rate",0))) as Total
+                                  FROM "Contra Charge Item" c JOIN "Sub Con Works" s ON c."Give to" = s.Works
+                                  WHERE s.Trade = ?'''),
+    }
+
+
+def test_all_budget_analysis_matches_per_trade(bm):
+    rows = bm.get_all_budget_analysis()
+    assert len(rows) == len(bm.get_all_trade_budgets())
+    for row in rows:
+        t = _per_trade_totals(bm.db, row['Trade'])
+        assert pytest.approx(t['main_bq']) == row['Main Contract Works']
+        assert pytest.approx(t['vo_potential']) == row['VO Potential']
+        assert pytest.approx(t['sc_vo_potential']) == row['SC VO Potential']
+        assert pytest.approx(t['contra_charge']) == row['Contra Charge']
+        net = t['main_bq'] + t['vo_agreed'] - (t['sc_works'] + t['sc_vo_agreed'] - t['contra_charge'])
+        assert pytest.approx(net) == row['Net Profit/Loss']
+
+
+def test_all_budget_analysis_hand_computed(tmp_path):
+    db = DB_Manager(str(tmp_path / 'budget.db'))
+    db.create_tables_from_schema(os.path.join(module_root, 'database', 'Project_db_Schema.txt'))
+    bm = Budget_Manager(db)
+    for trade in ("Steel", "Concrete", "Empty"):
+        bm.add_trade_budget(trade, "")
+    db.insert_many("Main Contract BQ", [
+        {"BQ ID": "BQ001", "Qty": 10, "Rate": 100, "Discount": 0, "Trade": "Steel"},     # 1000
+        {"BQ ID": "BQ002", "Qty": 5, "Rate": 20, "Discount": 0.1, "Trade": "Steel"},     # 90
+        {"BQ ID": "BQ003", "Qty": 2, "Rate": 50, "Discount": 0, "Trade": "Concrete"},    # 100
+    ])
+    db.insert_many("VO Item", [
+        {"Qty": 3, "Rate": 10, "Trade": "Steel", "Agree": 1},        # agreed 30
+        {"Qty": 1, "Rate": 7, "Trade": "Steel", "Agree": 0},         # potential 7
+        {"Qty": 2, "Rate": 5, "Trade": "Concrete", "Agree": None},   # potential 10
+    ])
+    db.insert_many("Sub Con Works", [
+        {"Subcontract": "SC001", "Works": "W1", "Qty": 4, "Rate": 100, "Discount": 0, "Trade": "Steel"},    # 400
+        {"Subcontract": "SC001", "Works": "W2", "Qty": 1, "Rate": 60, "Discount": 0, "Trade": "Concrete"},  # 60
+    ])
+    db.insert_many("SC VO Item", [
+        {"Qty": 1, "Rate": 50, "Trade": "Steel", "Agree": 1},        # agreed 50
+        {"Qty": 2, "Rate": 5, "Trade": "Steel", "Agree": 0},         # potential 10
+    ])
+    # Contra charge = Qty * (Rate + Admin Rate) = 2 * 10.5, against W1's trade
+    db.insert("Contra Charge Item", {"CC No": 1, "Qty": 2, "Rate": 10, "Admin Rate": 0.5, "Give to": "W1"})
+
+    fields = ['Main Contract Works', 'VO Agreed', 'Subtotal Income', 'SC Works', 'SC VO Agreed', 'Contra Charge',
+              'Subtotal Expense', 'Net Profit/Loss', 'VO Potential', 'SC VO Potential', 'Expected Total Profit/Loss']
+    expected = {
+        "Steel": [1090, 30, 1120, 400, 50, 21, 429, 691, 7, 10, 688],
+        "Concrete": [100, 0, 100, 60, 0, 0, 60, 40, 10, 0, 50],
+        "Empty": [0] * 11,
+    }
+    rows = bm.get_all_budget_analysis()
+    assert [row['Trade'] for row in rows] == list(expected)
+    for row in rows:
+        assert [row[f] for f in fields] == pytest.approx(expected[row['Trade']])
+    assert bm.get_budget_analysis("Steel")['net_profit'] == pytest.approx(691)
+    db.close()
@@ -47,3 +47,29 @@ def test_export_cashflow_creates_file(bm, tmp_path):
             assert 'Client Cash Flow' in x and 'Subcontract Cash Flow' in x
     except Exception:
         pytest.skip('openpyxl/pandas not available or too old; skip detailed read')
+
+
+def test_cashflow_pivot_accumulates_and_nets_client_payments(tmp_path):
+    db = DB_Manager(str(tmp_path / 'qs_test.db'))
+    db.create_tables_from_schema(os.path.join(module_root, 'database', 'Project_db_Schema.txt'))
+    db.insert_many("Sub Contract", [{"Sub Contract No": "SC001"}, {"Sub Contract No": "SC002"}])
+    db.insert_many("Sub Contract IP Application", [
+        {"Sub Contract No": "SC001", "IP": 1, "Payment Date": "2024-12-20", "Paid Amount": 100},
+        {"Sub Contract No": "SC001", "IP": 2, "Payment Date": "2025-02-03", "Paid Amount": 50},
+        {"Sub Contract No": "SC001", "IP": 3, "Payment Date": "2025-02-27", "Paid Amount": None},
+        {"Sub Contract No": "SC002", "IP": 1, "Payment Date": "2025-02-10", "Paid Amount": 300},
+        {"Sub Contract No": "SC002", "IP": 2, "Payment Date": "not a date", "Paid Amount": 999},
+        {"Sub Contract No": "SC999", "IP": 1, "Payment Date": "2025-03-01", "Paid Amount": 999},  # no such subcontract
+    ])
+    db.insert_many("Main Contract IP Application", [
+        {"IP": 1, "Payment Date": "2025-01-15", "Paid Amount": 1000},
+        {"IP": 2, "Payment Date": "2025-02-15", "Paid Amount": 200},
+    ])
+    months, sc_list, rows, total_paid_sc = Budget_Manager(db).get_cashflow_subcontracts()
+    db.close()
+
+    assert months == ['12/24', '01/25', '02/25']
+    assert sc_list == [("SC001", ""), ("SC002", "")]
+    assert [(r['SC001'], r['SC002'], r['Total'], r['Client Paid'], r['Net Cash']) for r in rows] == [
+        (100, 0, 100, 0, -100), (100, 0, 100, 1000, 900), (150, 300, 450, 1200, 750)]
+    assert total_paid_sc == 450
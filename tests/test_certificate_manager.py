@@ -0,0 +1,80 @@
+import sys, os
+import json
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+openpyxl = pytest.importorskip("openpyxl")
+from function.DB_manager import DB_Manager
+from function.Certificate_manager import Certificate_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+
+@pytest.fixture
+def certificates(tmp_path):
+    db = DB_Manager(str(tmp_path / 'certs.db'))
+    db.create_tables_from_schema(SCHEMA_PATH)
+    db.insert_many("Sub Contract", ({"Sub Contract No": f"SC{i:03d}", "Sub Contract Name": f"Package {i}",
+                                      "Company Name": f"Company {i}", "Contract Sum": 1000.0 * i} for i in range(1, 5)))
+    apps = [("SC001", 1, "2026-08-25"), ("SC001", 2, "2026-09-25"), ("SC002", 1, "2026-09-20"),
+            ("SC003", 1, "2026-09-02"), ("SC003", 2, "2026-09-28"), ("SC004", 1, "2026-10-01")]
+    db.insert_many("Sub Contract IP Application", ({"Sub Contract No": sc, "IP": ip, "Draft Date": date,
+                                                    "Certified Amount": 10.0 * ip} for sc, ip, date in apps))
+    db.insert_many("Sub Contract IP Item", ({"Sub Contract No": sc, "IP": ip, "Item": n, "Type": "Works",
+                                             "Description": f"Item {n}", "Applied Amount": 100.0 * n, "Certified Amount": 90.0 * n}
+                                            for sc, ip, _ in apps for n in range(1, 4)))
+    yield Certificate_Manager(db)
+    db.close()
+
+
+def test_period_picks_each_subcontracts_latest_ip(certificates):
+    assert certificates.get_period_certificates("2026-09") == [("SC001", 2), ("SC002", 1), ("SC003", 2)]
+    with pytest.raises(ValueError):
+        certificates.get_period_certificates("09/2026")
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_generates_one_workbook_per_subcontract_and_a_manifest(certificates, tmp_path, workers):
+    template = Certificate_Manager.create_default_template(str(tmp_path / 'template.xlsx'))
+    out_dir = str(tmp_path / f'out{workers}')
+    seen = []
+    manifest = certificates.generate_certificates("2026-09", template, out_dir, workers=workers,
+                                                  progress=lambda done, total: seen.append((done, total)))
+
+    assert (manifest["count"], manifest["failed"]) == (3, 0) and seen[-1] == (3, 3)
+    assert [c["file"] for c in manifest["certificates"]] == ["SC001_IP02.xlsx", "SC002_IP01.xlsx", "SC003_IP02.xlsx"]
+    assert all(c["status"] == "ok" and c["items"] == 3 and c["seconds"] >= 0 for c in manifest["certificates"])
+    with open(os.path.join(out_dir, 'manifest.json')) as f:
+        assert json.load(f)["certificates"] == manifest["certificates"]
+
+    wb = openpyxl.load_workbook(os.path.join(out_dir, "SC003_IP02.xlsx"))
+    names = wb.defined_names
+    cell = lambda name: wb["Certificate"][next(iter(names[name].destinations))[1].replace('$', '')]
+    assert (cell("SubContractNo").value, cell("CompanyName").value, cell("IP").value) == ("SC003", "Company 3", 2)
+    # The Items name grows with the block: $A$<first>:$H$<last>
+    first, last = (int(ref.split('$')[-1]) for ref in next(iter(names["Items"].destinations))[1].split(':'))
+    assert last - first == 2
+    assert [wb["Certificate"].cell(first + n, 4).value for n in range(3)] == ["Item 1", "Item 2", "Item 3"]
+    assert wb["Certificate"].cell(first + 4, 5).value == f"=SUM(E{first}:E{first + 2})"
+
+
+def test_blank_refs_and_dates_fall_through_to_the_filled_one(certificates, tmp_path):
+    db = certificates.db
+    # The SC payment screen writes '' into the unused ref columns and dates
+    db.insert("Sub Contract IP Application", {"Sub Contract No": "SC004", "IP": 2, "Draft Date": "",
+                                              "Issue Date": "2026-11-03"})
+    db.insert_many("Sub Contract IP Item", [
+        {"Sub Contract No": "SC004", "IP": 2, "Item": 1, "Type": "Works", "Contract Work ref": "W1", "VO ref": "", "Contra Charge ref": ""},
+        {"Sub Contract No": "SC004", "IP": 2, "Item": 2, "Type": "VO", "Contract Work ref": "", "VO ref": "VO-001", "Contra Charge ref": ""},
+        {"Sub Contract No": "SC004", "IP": 2, "Item": 3, "Type": "Contra Charge", "Contract Work ref": "", "VO ref": "", "Contra Charge ref": "CC-001"},
+    ])
+    assert certificates.get_period_certificates("2026-11") == [("SC004", 2)]
+    assert [row[2] for row in certificates.get_certificate_data("SC004", 2)["Items"]] == ["W1", "VO-001", "CC-001"]
+
+    template = Certificate_Manager.create_default_template(str(tmp_path / 'template.xlsx'))
+    certificates.generate_certificates("2026-11", template, str(tmp_path / 'out'), workers=0)
+    wb = openpyxl.load_workbook(str(tmp_path / 'out' / 'SC004_IP02.xlsx'))
+    first = int(next(iter(wb.defined_names["Items"].destinations))[1].split(':')[0].split('$')[-1])
+    assert [wb["Certificate"].cell(first + n, 3).value for n in range(3)] == ["W1", "VO-001", "CC-001"]
@@ -0,0 +1,92 @@
+import sys, os
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+@pytest.fixture
+def db(tmp_path):
+    db = DB_Manager(str(tmp_path / 'qs_test.db'))
+    db.create_tables_from_schema(SCHEMA_PATH)
+    yield db
+    db.close()
+
+
+def test_reads_do_not_commit_open_transaction(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.insert("Trade Budget", {"Trade": "Concrete", "Description": "", "Qty": 1, "Rate": 1, "Discount Factor": 0})
+            # The read sees the pending row but must not commit it
+            assert db.fetch_one('SELECT Trade FROM "Trade Budget"')['Trade'] == "Concrete"
+            raise RuntimeError("abort")
+    assert db.fetch_all('SELECT * FROM "Trade Budget"') == []
+
+
+def test_transaction_commits_on_success(db):
+    with db.transaction():
+        db.insert("Trade Budget", {"Trade": "Steel", "Description": "", "Qty": 1, "Rate": 1, "Discount Factor": 0})
+        db.update("Trade Budget", {"Description": "Rebar"}, "Trade = ?", ("Steel",))
+    other = DB_Manager(db.db_path)
+    assert other.fetch_one('SELECT Description FROM "Trade Budget" WHERE Trade = ?', ("Steel",))['Description'] == "Rebar"
+    other.close()
+
+
+def test_query_only_connection_rejects_writes(db):
+    ro = DB_Manager(db.db_path, query_only=True)
+    assert ro.insert("Unit Table", {"Order": 1, "Unit": "m2", "Description": ""}) is None
+    assert ro.fetch_all('SELECT * FROM "Unit Table"') == []
+    ro.close()
+
+
+def test_insert_many_and_upsert_many(db):
+    rows = [{"Order": i, "Unit": f"u{i}", "Description": ""} for i in range(100)]
+    assert db.insert_many("Unit Table", rows) == 100
+    changed = [{"Order": 1, "Unit": "u1", "Description": "changed"}, {"Order": 200, "Unit": "new", "Description": "added"}]
+    assert db.upsert_many("Unit Table", changed, ["Unit"]) == 2
+    assert db.fetch_one('SELECT COUNT(*) AS n FROM "Unit Table"')['n'] == 101
+    assert db.fetch_one('SELECT Description FROM "Unit Table" WHERE Unit = ?', ("u1",))['Description'] == "changed"
+
+
+def test_insert_many_rolls_back_on_failure(db):
+    rows = [{"Order": 1, "Unit": "m"}, {"Order": 2, "Unit": "m"}]  # duplicate primary key
+    assert db.insert_many("Unit Table", rows) is None
+    assert db.fetch_all('SELECT * FROM "Unit Table"') == []
+
+
+def test_default_profile_applies_wal_pragmas(db):
+    assert db.get_pragma("journal_mode") == "wal"
+    assert db.get_pragma("synchronous") == 1  # NORMAL
+    assert db.get_pragma("temp_store") == 2  # MEMORY
+    assert db.get_pragma("foreign_keys") == 0
+
+
+def test_strict_profile_enforces_cascades(tmp_path):
+    strict = DB_Manager(str(tmp_path / 'fk.db'), profile=DB_Manager.STRICT_PROFILE)
+    strict.execute_query('CREATE TABLE Parent (Code TEXT PRIMARY KEY)')
+    strict.execute_query('CREATE TABLE Child (ID INTEGER PRIMARY KEY, Code TEXT REFERENCES Parent (Code) ON DELETE CASCADE)')
+    strict.insert("Parent", {"Code": "A"})
+    strict.insert("Child", {"Code": "A"})
+    assert strict.insert("Child", {"Code": "missing"}) is None
+    strict.delete("Parent", "Code = ?", ("A",))
+    assert strict.fetch_all('SELECT * FROM Child') == []
+    strict.close()
+
+
+def test_foreign_key_problems_reports_schema_mismatches(db):
+    problems = db.foreign_key_problems()
+    assert any('foreign key mismatch' in p and 'Sub Con Works' in p for p in problems)
+
+
+def test_schema_indexes_serve_trade_and_parent_lookups(db):
+    def plan(query):
+        return ' '.join(r[3] for r in db.conn.execute(f'EXPLAIN QUERY PLAN {query}', ('x',)))
+
+    assert 'idx_main_contract_bq_trade' in plan('SELECT SUM(Amount) FROM "Main Contract BQ" WHERE Trade = ?')
+    assert 'idx_sub_contract_vo_subcontract' in plan('SELECT * FROM "Sub Contract VO" WHERE Subcontract = ?')
+    # The migration is idempotent on a database that already has the indexes
+    with open(os.path.join(module_root, 'migrations', '20261018_add_indexes.sql')) as f:
+        db.conn.executescript(f.read())
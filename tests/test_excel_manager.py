@@ -0,0 +1,76 @@
+import sys, os
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+openpyxl = pytest.importorskip("openpyxl")
+from openpyxl.styles import Font
+from openpyxl.workbook.defined_name import DefinedName
+from function.Excel_manager import Excel_Manager
+
+
+@pytest.fixture
+def template(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Certificate"
+    ws["A1"] = "Interim Payment Certificate"
+    ws["A1"].font = Font(bold=True, size=14)
+    ws.merge_cells("A1:F1")
+    ws["A3"], ws["A4"] = "Subcontract", "IP"
+    wb.defined_names["ContractNo"] = DefinedName("ContractNo", attr_text="Certificate!$B$3")
+    # Item block (row 6): description merged over B:C, amount = qty x rate
+    ws["A5"], ws["D5"], ws["E5"], ws["F5"] = "Item", "Qty", "Rate", "Amount"
+    ws.merge_cells("B6:C6")
+    ws["B6"].font = Font(italic=True)
+    ws["F6"] = "=D6*E6"
+    ws.row_dimensions[6].height = 30
+    wb.defined_names["Items"] = DefinedName("Items", attr_text="Certificate!$A$6:$F$6")
+    # Total under the block and a footer
+    ws["E8"], ws["F8"] = "Total", "=SUM(F6:F6)"
+    wb.defined_names["Total"] = DefinedName("Total", attr_text="Certificate!$F$8")
+    ws["A10"] = "Certified by"
+    ws.merge_cells("A10:F10")
+    ws.row_dimensions[10].height = 40
+    path = tmp_path / "template.xlsx"
+    wb.save(path)
+    return str(path)
+
+
+def test_fills_addresses_names_and_repeating_blocks_keeping_styles(template, tmp_path):
+    out = str(tmp_path / "out" / "SC001.xlsx")
+    items = [(1, "Formwork", None, 10, 2.5), (2, "Rebar", None, 4, 100), (3, "Concrete", None, 2, 50)]
+    assert Excel_Manager().write_excel_template(template, out, {"ContractNo": "SC001", "B4": 7, "Items": items}) == out
+
+    wb = openpyxl.load_workbook(out)
+    ws = wb["Certificate"]
+    assert (ws["B3"].value, ws["B4"].value) == ("SC001", 7)
+    assert [ws.cell(r, 2).value for r in (6, 7, 8)] == ["Formwork", "Rebar", "Concrete"]
+    assert [ws.cell(r, 6).value for r in (6, 7, 8)] == ["=D6*E6", "=D7*E7", "=D8*E8"]
+    assert all(ws.cell(r, 2).font.i and ws.row_dimensions[r].height == 30 for r in (6, 7, 8))
+    assert {"B7:C7", "B8:C8", "A12:F12", "A1:F1"} <= {str(m) for m in ws.merged_cells.ranges}
+    # Rows under the block moved down; the total grows to cover every item
+    assert (ws["E10"].value, ws["F10"].value) == ("Total", "=SUM(F6:F8)")
+    assert wb.defined_names["Total"].attr_text == "Certificate!$F$10"
+    assert ws["A12"].value == "Certified by" and ws.row_dimensions[12].height == 40
+    assert ws["A1"].font.b and ws["A1"].font.sz == 14
+
+
+def test_template_is_read_once_and_reused(template, tmp_path, monkeypatch):
+    manager = Excel_Manager()
+    outputs = [(str(tmp_path / f"SC{i:03d}.xlsx"), {"ContractNo": f"SC{i:03d}", "Items": [(i, "Works")]}) for i in range(1, 6)]
+    first = manager.load_template(template)
+    written = manager.write_excel_templates(template, outputs)
+    assert written == [path for path, _ in outputs]
+    assert manager.load_template(template) is first
+    assert [openpyxl.load_workbook(p).active["B3"].value for p in written] == [f"SC{i:03d}" for i in range(1, 6)]
+    # Rendering a copy never touches the template itself
+    assert openpyxl.load_workbook(template).active["B3"].value is None
+
+
+def test_empty_block_and_unknown_keys(template, tmp_path):
+    wb = Excel_Manager().load_template(template).render({"Items": []})
+    assert wb.active["F6"].value == "=D6*E6" and wb.active["F8"].value == "=SUM(F6:F6)"
+    assert Excel_Manager().write_excel_template(template, str(tmp_path / "bad.xlsx"), {"NoSuchName": 1}) is None
+    assert Excel_Manager().write_excel_template(str(tmp_path / "missing.xlsx"), str(tmp_path / "x.xlsx"), {}) is None
@@ -0,0 +1,37 @@
+import sys, os
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+openpyxl = pytest.importorskip("openpyxl")
+from function.Export_manager import Export_Manager
+
+
+def test_write_streams_rows_with_money_format_and_red_negative_totals(tmp_path):
+    path = str(tmp_path / 'out' / 'export.xlsx')
+    rows = ((f"T{i:03d}", i * 10.0, -i) for i in range(1, 1001))
+    sheet = Export_Manager.sheet('Data', ['Trade', 'Amount', 'Count'], rows, money_columns=[1],
+                                 footer=[('Total', 5.0), None, ('Net', -12.5)])
+    assert Export_Manager().write(path, [sheet]) == 1000
+
+    ws = openpyxl.load_workbook(path)['Data']
+    assert [c.value for c in ws[1]] == ['Trade', 'Amount', 'Count']
+    assert ws['B2'].number_format == Export_Manager.MONEY_FORMAT
+    assert ws['C2'].number_format == 'General'
+    assert ws['A1002'].value == 'Total' and not str(getattr(ws['B1002'].font.color, 'rgb', '')).endswith('FF0000')
+    assert ws['A1004'].value == 'Net' and ws['B1004'].font.color.rgb.endswith('FF0000')
+
+
+def test_write_reports_progress_and_stops_without_saving_when_it_raises(tmp_path):
+    seen = []
+    sheet = Export_Manager.sheet('Data', ['N'], ((i,) for i in range(1200)), total=1200)
+    Export_Manager().write(str(tmp_path / 'ok.xlsx'), [sheet], progress=lambda done, total: seen.append((done, total)))
+    assert seen == [(500, 1200), (1000, 1200), (1200, 1200)]
+
+    def cancel(done, total):
+        raise KeyboardInterrupt()
+    path = tmp_path / 'cancelled.xlsx'
+    with pytest.raises(KeyboardInterrupt):
+        Export_Manager().write(str(path), [Export_Manager.sheet('Data', ['N'], [(i,) for i in range(600)])], progress=cancel)
+    assert not path.exists()
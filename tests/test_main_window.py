@@ -0,0 +1,83 @@
+import sys, os
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+from function.DB_manager import DB_Manager
+from ui.Task_runner import Task_Runner
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+# One QApplication for the module; the shared Task_Runner lives as long as it does
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def window(tmp_path):
+    db_path = str(tmp_path / 'main.db')
+    db = DB_Manager(db_path)
+    db.create_tables_from_schema(SCHEMA_PATH)
+    db.close()
+    import main
+    w = main.MainWindow(db_path)
+    yield w
+    w.close()
+    app.processEvents()
+
+
+def test_tabs_are_built_when_first_selected(window):
+    assert [attr for attr, _ in window.built_tabs()] == ["ui_doc"]
+    assert window.tabWidget.count() == len(window.TABS)
+
+    index = window.TAB_INDEX["ui_bq"]
+    window.tabWidget.setCurrentIndex(index)
+    assert window.tabWidget.currentIndex() == index
+    assert window.tabWidget.currentWidget() is window.ui_bq
+    assert type(window.ui_bq).__name__ == "Ui_BQManager"
+
+
+def test_tabs_reach_unopened_tabs_through_the_window(window):
+    # Other tabs navigate with main_window.ui_*; that builds the tab on demand
+    payment = window.ui_payment
+    assert window.tabWidget.widget(window.TAB_INDEX["ui_payment"]) is payment
+    assert window.tabWidget.currentIndex() == 0
+    # Subcontract is wired to the SC Payment and SC VO tabs when it is built
+    window.ensure_tab(window.TAB_INDEX["ui_subcontract"])
+    assert {"ui_sc_payment", "ui_sc_vo"} <= {attr for attr, _ in window.built_tabs()}
+    with pytest.raises(AttributeError):
+        window.ui_missing
+
+
+def test_prefetch_builds_the_most_used_tabs(window):
+    window.prefetch_tabs()
+    assert window.PREFETCH_TABS[0] in dict(window.built_tabs())
+
+
+def test_create_new_database_removes_the_wal_files(window, monkeypatch):
+    db_path = window.db_path
+    window.db_manager.execute_query('CREATE TABLE "Old Data" (x)')
+    # A background load leaves a worker connection open on the file
+    Task_Runner.instance().submit("test.load", window.bq_manager, "get_all_bq_items")
+    Task_Runner.instance().wait()
+    assert os.path.exists(db_path + "-wal")
+    monkeypatch.setattr(QtWidgets.QMessageBox, "question", lambda *args: QtWidgets.QMessageBox.Yes)
+    monkeypatch.setattr(QtWidgets.QMessageBox, "information", lambda *args: None)
+    monkeypatch.setattr(QtWidgets.QMessageBox, "critical", lambda *args: pytest.fail(args[2]))
+    left = []
+    remove = os.remove
+
+    def spy(path):
+        remove(path)
+        if path == db_path:
+            left.extend(p for p in (db_path + "-wal", db_path + "-shm") if os.path.exists(p))
+    monkeypatch.setattr(os, "remove", spy)
+
+    window.create_new_database()
+    # Every connection was closed first, so SQLite checkpointed and dropped the WAL
+    assert left == []
+    # Managers keep working on the new file
+    assert window.bq_manager.db is window.db_manager and window.bq_manager.get_all_bq_items() == []
+    tables = {row["name"] for row in window.db_manager.fetch_all("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "Main Contract BQ" in tables and "Old Data" not in tables
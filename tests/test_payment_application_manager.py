@@ -0,0 +1,109 @@
+import sys, os
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.Payment_Application_manager import Payment_Application_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+
+@pytest.fixture
+def pm(tmp_path):
+    db = DB_Manager(str(tmp_path / 'qs_test.db'))
+    db.create_tables_from_schema(SCHEMA_PATH)
+    pm = Payment_Application_Manager(db)
+    pm.add_bq_item("BQ001", "1", "A", "1", "a", "Concrete", 10, "m3", 100.0, "Concrete", "")
+    pm.add_bq_item("BQ002", "1", "A", "1", "b", "  ", 2, "m3", 50.0, "Concrete", "", discount=0.5)
+    pm.create_vo("VO001", "2025-01-01", None, "Extra slab", 1500.0, 0, 0, 0, 0, 0, "")
+    db.insert("Document Manager", {"File": "DOC001", "Title": "Site memo"})
+    pm.create_payment_application(1)
+    pm.add_ip_item(1, 1, "BQ", "BQ001", "", "DOC001", "Slab", 500, 0, 0, "")
+    pm.add_ip_item(1, 2, "VO", "", "VO001 - Extra slab", "", "Extra", 200, 0, 0, "")
+    pm.add_ip_item(1, 3, "BQ", "BQ002", "VO999", None, "Missing VO", 0, 0, 0, "")
+    yield pm
+    db.close()
+
+
+def test_ip_item_grid_matches_per_row_lookups(pm):
+    grid = pm.get_ip_item_grid(1)
+    assert [i['Item'] for i in grid] == [1, 2, 3]
+    for item in grid:
+        assert item['BQ Amount'] == pm.get_bq_amount(item['BQ Ref'])
+        assert item['VO Amount'] == pm.get_vo_application_amount(item['VO Ref'])
+    assert [(i['BQ Display'], i['VO Display'], i['DOC Display']) for i in grid] == [
+        ("BQ001 - Concrete", "", "DOC001 - Site memo"),
+        ("", "VO001 - Extra slab", ""),
+        ("BQ002", "VO999", ""),  # blank description; stored ref kept when it matches nothing
+    ]
+    assert set(pm.get_existing_bq_refs()) >= {i['BQ Display'] for i in grid if i['BQ Display']}
+
+
+def test_ref_lists_are_cached_until_a_write(pm):
+    queries = []
+    pm.db.conn.set_trace_callback(queries.append)
+    assert pm.get_existing_bq_refs() == ["BQ001 - Concrete", "BQ002"]
+    assert pm.get_existing_bq_refs() == ["BQ001 - Concrete", "BQ002"]
+    assert sum('FROM "Main Contract BQ"' in q for q in queries) == 1
+
+    # A write through any manager sharing the connection invalidates the lists
+    pm.db.insert("Main Contract BQ", {"BQ ID": "BQ000", "description": "Prelims"})
+    assert pm.get_existing_bq_refs() == ["BQ000 - Prelims", "BQ001 - Concrete", "BQ002"]
+
+    # ...and so does a commit from another connection
+    other = DB_Manager(pm.db.db_path)
+    other.insert("Main Contract VO", {"VO ref": "VO002", "Description": "Drainage"})
+    other.close()
+    assert pm.get_existing_vo_refs() == ["VO001 - Extra slab", "VO002 - Drainage"]
+
+
+def test_editing_an_early_ip_cascades_to_later_headers(pm):
+    for ip in (2, 3):
+        pm.create_payment_application(ip)
+        pm.copy_previous_ip_items(ip)
+    pm.update_ip_item(3, 1, {"Applied Amount": 800})
+    assert pm.recalculate_ip_totals() == 3
+    headers = {a['IP']: a for a in pm.get_all_payment_applications()}
+    assert headers[3]['Accumulated Applied Amount'] == 1000
+    assert headers[3]['Previous Applied Amount'] == 700
+
+    # IP 1 edited: IPs 2 and 3 pick up the new Previous/This amounts
+    pm.update_ip_item(1, 2, {"Applied Amount": 300})
+    pm.calculate_ip_totals(1)
+    headers = {a['IP']: a for a in pm.get_all_payment_applications()}
+    assert [(headers[ip]['Accumulated Applied Amount'], headers[ip]['Previous Applied Amount'],
+             headers[ip]['This Applied Amount']) for ip in (1, 2, 3)] == [(800, 0, 800), (700, 800, -100), (1000, 700, 300)]
+
+
+def test_rollup_triggers_keep_headers_equal_to_a_full_recompute(pm):
+    assert pm.ensure_rollup_triggers()
+    for ip in (2, 3):
+        pm.create_payment_application(ip)
+        pm.copy_previous_ip_items(ip)
+    pm.update_ip_item(2, 1, {"Applied Amount": 650, "Certified Amount": 600, "Paid Amount": None})
+    pm.update_ip_item(1, 2, {"Applied Amount": 260.5})
+    pm.delete_ip_item(3, 3)
+    pm.add_ip_item(2, 4, "BQ", "", "", "", "New", 75, 70, 70, "")
+    pm.update_ip_item(2, 4, {"IP": 3, "Item": 5})  # moved to another IP
+    maintained = pm.get_all_payment_applications()
+
+    pm.recalculate_ip_totals()
+    recomputed = pm.get_all_payment_applications()
+    assert [a['IP'] for a in maintained] == [1, 2, 3]
+    for got, want in zip(maintained, recomputed):
+        for col in ("Accumulated Applied Amount", "Previous Applied Amount", "This Applied Amount", "Certified Amount", "Paid Amount"):
+            assert got[col] == pytest.approx(want[col]), (got['IP'], col)
+
+
+def test_copy_previous_ip_items_updates_the_header_in_the_same_transaction(pm):
+    pm.recalculate_ip_totals()
+    pm.create_payment_application(2)
+    assert pm.copy_previous_ip_items(2)
+    assert [(i['Item'], i['BQ Ref'], i['Applied Amount']) for i in pm.get_ip_items(2)] == [
+        (1, "BQ001", 500), (2, "", 200), (3, "BQ002", 0)]
+    ip2 = pm.get_payment_application(2)
+    assert (ip2['Accumulated Applied Amount'], ip2['Previous Applied Amount'], ip2['This Applied Amount']) == (700, 700, 0)
+    assert not pm.copy_previous_ip_items(2)  # items already there: rolled back
+    assert len(pm.get_ip_items(2)) == 3
@@ -0,0 +1,75 @@
+import sys, os
+import json
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.BQ_manager import BQ_Manager
+from function.Query_profiler import Query_Profiler, normalize_sql, action
+
+
+@pytest.fixture
+def bq(tmp_path):
+    db = DB_Manager(str(tmp_path / 'profile.db'))
+    db.execute_query('CREATE TABLE "Main Contract BQ" ("BQ ID" TEXT PRIMARY KEY, Bill TEXT, Section TEXT, Page TEXT, Item TEXT, '
+                     'description TEXT, Qty REAL, Unit TEXT, Rate REAL, Discount REAL, Amount REAL, Trade TEXT, Remark TEXT)')
+    db.insert_many("Main Contract BQ", ({"BQ ID": f"BQ{i:03d}", "Trade": "Steel" if i % 2 else "Concrete", "Amount": i}
+                                        for i in range(1, 201)))
+    yield BQ_Manager(db)
+    db.close()
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = Query_Profiler(slow_ms=1000, slow_log_path=str(tmp_path / 'slow.log')).enable()
+    yield profiler
+    profiler.disable()
+
+
+def test_normalize_sql_groups_statements_by_shape():
+    assert normalize_sql("SELECT *\n  FROM t WHERE a = 'x''y' AND b = 12 AND c IN (?, ?, ?)") == \
+        "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (?...)"
+    # Numbers inside identifiers are kept
+    assert normalize_sql('SELECT "Col 2", fts5_x FROM t2 LIMIT 10') == 'SELECT "Col 2", fts5_x FROM t2 LIMIT ?'
+
+
+def test_statements_are_grouped_with_caller_and_action(bq, profiler):
+    for bq_id in ("BQ001", "BQ002", "BQ003"):
+        bq.get_bq_item(bq_id)
+    with action("bq.export"):
+        assert len(bq.get_all_bq_items()) == 200
+    assert sum(1 for _ in bq.db.iter_query('SELECT "BQ ID" FROM "Main Contract BQ"', batch_size=64)) == 200
+
+    stats = {(row["caller"], row["action"]): row for row in profiler.report()}
+    one = stats[("BQ_manager.BQ_Manager.get_bq_item", "-")]
+    # fetch_one -> read_query is one statement, not two
+    assert one["count"] == 3 and one["rows"] == 3
+    assert one["sql"] == 'SELECT * FROM "Main Contract BQ" WHERE "BQ ID" = ?'
+    assert 0 <= one["p50_ms"] <= one["p95_ms"] <= one["max_ms"]
+    assert stats[("BQ_manager.BQ_Manager.get_all_bq_items", "bq.export")]["rows"] == 200
+    # Only manager methods (function/) count as callers; iter_query counts every batch's rows
+    assert stats[("-", "-")]["rows"] == 200
+
+    profiler.disable()
+    bq.get_bq_item("BQ004")
+    assert sum(row["count"] for row in profiler.report()) == 5
+
+
+def test_slow_log_explains_each_statement_shape_once(bq, profiler, tmp_path):
+    profiler.slow_ms = 0
+    bq.get_bq_item("BQ001")
+    bq.get_bq_item("BQ002")
+    assert len(profiler.slow) == 2
+    entry = profiler.slow[-1]
+    assert entry["caller"] == "BQ_manager.BQ_Manager.get_bq_item"
+    assert any("USING INDEX" in line for line in entry["plan"])
+    with open(profiler.slow_log_path, encoding="utf-8") as f:
+        assert f.read().count('SELECT * FROM "Main Contract BQ"') == 2
+
+    path = profiler.dump(str(tmp_path / 'profile.json'))
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["slow_ms"] == 0 and len(data["slow"]) == 2
+    assert data["statements"][0]["count"] == 2
@@ -0,0 +1,50 @@
+import sys, os
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.Search_manager import Search_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DB_Manager(str(tmp_path / 'qs_test.db'))
+    db.create_tables_from_schema(SCHEMA_PATH)
+    # Existing rows are indexed when the search tables are first created
+    db.insert("Document Manager", {"File": "DOC001", "Title": "Site memo", "Remark": "Rebar spacing at grid C"})
+    yield db
+    db.close()
+
+
+def test_existing_rows_are_indexed_on_creation(db):
+    sm = Search_Manager(db)
+    assert sm.ensure_index()
+    results = sm.search("rebar")
+    assert [(r['scope'], r['ref']) for r in results] == [("document", "DOC001")]
+    assert "[Rebar]" in results[0]['snippet']
+
+
+def test_triggers_keep_index_in_sync(db):
+    sm = Search_Manager(db)
+    sm.ensure_index()
+    db.insert("Document Manager", {"File": "DOC002", "Title": "RFI 12", "Remark": "", "From": "Rebar Supplier Ltd"})
+    db.insert("Main Contract BQ", {"BQ ID": "BQ001", "description": "High yield rebar to slabs"})
+    assert {r['ref'] for r in sm.search("rebar")} == {"DOC001", "DOC002", "BQ001"}
+
+    db.update("Document Manager", {"Remark": "Formwork"}, "File = ?", ("DOC001",))
+    db.delete("Main Contract BQ", '"BQ ID" = ?', ("BQ001",))
+    assert [r['ref'] for r in sm.search("rebar")] == ["DOC002"]
+    assert [r['ref'] for r in sm.search("formw")] == ["DOC001"]  # prefix match
+
+
+def test_search_scopes_and_limit(db):
+    sm = Search_Manager(db)
+    sm.ensure_index()
+    db.insert("VO Item", {"VO ref": "VO001", "Description": "Extra rebar"})
+    assert [r['scope'] for r in sm.search("rebar", scopes=["vo_item"])] == ["vo_item"]
+    assert len(sm.search("rebar", limit=1)) == 1
+    assert sm.search('"') == []
@@ -0,0 +1,84 @@
+import sys, os
+import threading
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.Sequence_manager import Sequence_Manager
+from function.BQ_manager import BQ_Manager
+from function.SC_VO_manager import SC_VO_Manager
+from function.Subcontract_manager import Subcontract_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'qs_test.db')
+    db = DB_Manager(path)
+    db.create_tables_from_schema(SCHEMA_PATH)
+    db.close()
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    db = DB_Manager(db_path)
+    yield db
+    db.close()
+
+
+def test_reserve_seeds_from_highest_ref_not_last_row(db):
+    # Inserted out of order: the last row by rowid is BQ002
+    db.insert_many("Main Contract BQ", [{"BQ ID": ref} for ref in ("BQ001", "BQ010", "BQ002", "X-99")])
+    ids = Sequence_Manager(db)
+    assert ids.reserve("BQ") == ["BQ011"]
+    assert ids.reserve("BQ", 3) == ["BQ012", "BQ013", "BQ014"]
+    assert BQ_Manager(db).get_next_bq_id() == "BQ015"
+    # SC refs are not confused with SCVO refs, and an empty table starts at 001
+    db.insert("Sub Contract VO", {"VO ref": "SCVO007"})
+    assert Subcontract_Manager(db).get_next_sc_no() == "SC001"
+    assert SC_VO_Manager(db).get_next_sc_vo_ref() == "SCVO008"
+
+
+def test_reserve_joins_caller_transaction(db):
+    ids = Sequence_Manager(db)
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            assert ids.reserve("DOC", 2) == ["DOC001", "DOC002"]
+            raise RuntimeError("rolled back")
+    assert ids.reserve("DOC") == ["DOC001"]
+
+
+def test_sync_moves_past_imported_refs(db):
+    ids = Sequence_Manager(db)
+    assert ids.reserve("BQ") == ["BQ001"]
+    db.insert_many("Main Contract BQ", [{"BQ ID": f"BQ{i:03d}"} for i in range(1, 41)])
+    assert ids.sync("BQ") == 40
+    assert ids.reserve("BQ") == ["BQ041"]
+
+
+def test_concurrent_sessions_never_share_a_ref(db_path):
+    refs, errors = [], []
+
+    def session():
+        db = DB_Manager(db_path)
+        try:
+            ids = Sequence_Manager(db)
+            for _ in range(25):
+                refs.extend(ids.reserve("VO", 4))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=session) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(refs) == len(set(refs)) == 400
+    assert sorted(refs) == [f"VO{i:03d}" for i in range(1, 401)]
@@ -0,0 +1,67 @@
+import sys, os
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.Subcontract_manager import Subcontract_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+
+@pytest.fixture
+def sm(tmp_path):
+    db = DB_Manager(str(tmp_path / 'qs_test.db'))
+    db.create_tables_from_schema(SCHEMA_PATH)
+    sm = Subcontract_Manager(db)
+    sm.add_subcontract("SC001", "Piling", "Deep Co", None, 1000.0, 0.0)
+    sm.add_subcontract("SC002", "Facade", "Glass Co", None, 500.0, 0.0)
+    sm.add_subcontract_person("SC001", "Ann", "PM", "", "", "")
+    sm.add_sc_work("SC001", "W1", 10, "m", 20, 0.1, None)
+    for ref, sc in (("SCVO1", "SC001"), ("SCVO2", "SC001"), ("SCVO3", "SC002")):
+        sm.create_sc_vo(ref, sc, None, None, f"Variation {ref}", 100.0, 80.0, False, False, False, False, "")
+    sm.add_sc_vo_link("SC001", "SCVO3", "shared with facade")
+    sm.add_sc_vo_link("SC001", "SCVO2", "")
+    db.insert("Sub Contract IP Application", {"Sub Contract No": "SC001", "IP": 1, "This Applied Amount": 50.0})
+    db.insert("Contra Charge", {"CC No": "CC1", "Title": "Cleaning", "Agree Amount": 40.0, "Deduct To": "SC001"})
+    db.insert("Contra Charge Item", {"CC No": "CC1", "Description": "Labour", "Qty": 2, "Rate": 10, "Admin Rate": 0.5})
+    yield sm
+    db.close()
+
+
+def test_dossier_collects_the_subcontract_in_a_fixed_number_of_queries(sm):
+    queries = []
+    sm.db.conn.set_trace_callback(queries.append)
+    dossier = sm.get_dossier("SC001")
+    first = len(queries)
+    # More VOs do not mean more queries
+    for i in range(4, 30):
+        sm.create_sc_vo(f"SCVO{i}", "SC001", None, None, "", 0, 0, False, False, False, False, "")
+        sm.add_sc_vo_link("SC001", f"SCVO{i}", "")
+    queries.clear()
+    assert len(sm.get_dossier("SC001")["vos"]) == 29
+    assert len(queries) == first
+    sm.db.conn.set_trace_callback(None)
+
+    assert dossier["subcontract"]["Sub Contract Name"] == "Piling"
+    assert [p["Name"] for p in dossier["persons"]] == ["Ann"]
+    assert [(p["IP"], p["This Applied Amount"]) for p in dossier["payments"]] == [(1, 50.0)]
+    assert [(w["Works"], w["Amount"]) for w in dossier["works"]] == [("W1", 180.0)]
+    # Linked VOs first in link order (even from another subcontract), then the subcontract's own
+    assert [(v["VO ref"], v["Linked"], v["Link Remark"], v["Agree Amount"]) for v in dossier["vos"]] == [
+        ("SCVO3", 1, "shared with facade", 80.0), ("SCVO2", 1, "", 80.0), ("SCVO1", 0, "", 80.0)]
+    assert [(c["CC No"], c["Items Amount"], c["Item Count"]) for c in dossier["contra_charges"]] == [("CC1", 30.0, 1)]
+
+
+def test_dossier_cache_is_dropped_on_any_write(sm):
+    dossier = sm.get_dossier("SC001")
+    assert sm.get_dossier("SC001") is dossier
+    assert sm.get_dossier("SC001", use_cache=False) is not dossier
+    sm.update_subcontract("SC001", {"Sub Contract Name": "Piling works"})
+    assert sm.get_dossier("SC001")["subcontract"]["Sub Contract Name"] == "Piling works"
+    # ...including a commit from another connection
+    other = DB_Manager(sm.db.db_path)
+    other.insert("Sub Contract Person", {"Sub Contract": "SC001", "Name": "Ben"})
+    other.close()
+    assert [p["Name"] for p in sm.get_dossier("SC001")["persons"]] == ["Ann", "Ben"]
@@ -0,0 +1,154 @@
+import sys, os
+import shutil
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.Subcontract_Payment_manager import Subcontract_Payment_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+
+@pytest.fixture
+def spm(tmp_path):
+    db = DB_Manager(str(tmp_path / 'qs_test.db'))
+    db.create_tables_from_schema(SCHEMA_PATH)
+    spm = Subcontract_Payment_Manager(db)
+    # Each IP's items hold that IP's work only
+    for sc, amounts in (("SC001", [100, 250, 50]), ("SC002", [1000, 500])):
+        for ip, amount in enumerate(amounts, start=1):
+            spm.create_payment_application(sc, ip)
+            spm.add_ip_item(sc, ip, 1, "Work", "", "", "", "", amount, 0, 0, "")
+            spm.add_ip_item(sc, ip, 2, "Work", "", "", "", "", None, 0, 0, "")
+    yield spm
+    db.close()
+
+
+def headers(spm, sc):
+    return [(a['IP'], a['This Applied Amount'], a['Previous Applied Amount'], a['Accumulated Applied Amount'])
+            for a in spm.get_all_payment_applications(sc)]
+
+
+def test_running_totals_are_partitioned_by_subcontract(spm):
+    assert spm.recalculate_ip_totals() == 5
+    assert headers(spm, "SC001") == [(1, 100, 0, 100), (2, 250, 100, 350), (3, 50, 350, 400)]
+    assert headers(spm, "SC002") == [(1, 1000, 0, 1000), (2, 500, 1000, 1500)]
+
+
+def test_calculate_ip_totals_cascades_within_one_subcontract(spm):
+    spm.recalculate_ip_totals()
+    spm.update_ip_item("SC001", 1, 1, {"Applied Amount": 150})
+    spm.update_ip_item("SC002", 1, 1, {"Applied Amount": 0})
+    assert spm.calculate_ip_totals("SC001", 1) == 3
+    assert headers(spm, "SC001") == [(1, 150, 0, 150), (2, 250, 150, 400), (3, 50, 400, 450)]
+    # Other subcontracts are left alone
+    assert headers(spm, "SC002") == [(1, 1000, 0, 1000), (2, 500, 1000, 1500)]
+
+
+def test_rollup_triggers_keep_headers_equal_to_a_full_recompute(spm):
+    assert spm.ensure_rollup_triggers()
+    assert headers(spm, "SC001") == [(1, 100, 0, 100), (2, 250, 100, 350), (3, 50, 350, 400)]
+    spm.update_ip_item("SC001", 1, 1, {"Applied Amount": 120, "Certified Amount": 110, "Paid Amount": 100})
+    spm.delete_ip_item("SC001", 2, 1)
+    spm.add_ip_item("SC001", 3, 3, "Work", "", "", "", "", 30, 25, 20, "")
+    spm.update_ip_item("SC002", 2, 1, {"Sub Contract No": "SC001", "IP": 2, "Item": 9})  # moved across subcontracts
+    spm.create_payment_application("SC001", 4)
+    maintained = {sc: headers(spm, sc) for sc in ("SC001", "SC002")}
+    assert maintained["SC001"][-1] == (4, 0, 700, 700)
+
+    spm.recalculate_ip_totals()
+    assert {sc: headers(spm, sc) for sc in ("SC001", "SC002")} == maintained
+
+
+def test_item_edits_leave_the_hand_entered_certified_and_paid(spm):
+    # An older version of the triggers also moved header Certified/Paid: it is replaced
+    for stmt in spm._rollup_statements():
+        spm.db.execute_query(stmt.replace("Applied Rollup", "Rollup"))
+    assert spm.ensure_rollup_triggers()
+    triggers = {r["name"] for r in spm.db.fetch_all("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert set(spm.ROLLUP_TRIGGERS) <= triggers and not set(spm.OLD_ROLLUP_TRIGGERS) & triggers
+
+    spm.update_payment_application("SC001", 1, {"Certified Amount": 95, "Paid Amount": 80, "Payment Date": "2026-09-30"})
+    spm.update_ip_item("SC001", 1, 1, {"Applied Amount": 120, "Certified Amount": 110, "Paid Amount": 100})
+    spm.add_ip_item("SC001", 1, 3, "Work", "", "", "", "", 30, 25, 20, "")
+    spm.delete_ip_item("SC001", 1, 2)
+    spm.recalculate_ip_totals()
+    sc001 = spm.get_payment_application("SC001", 1)
+    assert (sc001["This Applied Amount"], sc001["Certified Amount"], sc001["Paid Amount"]) == (150, 95, 80)
+
+
+def test_copy_previous_ip_items_copies_in_one_statement(spm):
+    spm.create_payment_application("SC002", 3)
+    assert spm.copy_previous_ip_items("SC002", 3)
+    assert [(i['Item'], i['Applied Amount']) for i in spm.get_ip_items("SC002", 3)] == [(1, 500), (2, None)]
+    assert headers(spm, "SC002")[-1] == (3, 500, 1500, 2000)
+    # Copying again collides with the copied items: nothing is written
+    assert not spm.copy_previous_ip_items("SC002", 3)
+    assert len(spm.get_ip_items("SC002", 3)) == 2
+    assert not spm.copy_previous_ip_items("SC002", 1)
+
+
+@pytest.mark.parametrize("triggers", [False, True])
+def test_roll_forward_all_opens_the_next_ip_of_every_subcontract(spm, triggers):
+    if triggers:
+        assert spm.ensure_rollup_triggers()
+    spm.update_ip_item("SC001", 3, 1, {"Certified Amount": 45})
+    assert spm.roll_forward_all("2026-10-31") == 2
+    assert headers(spm, "SC001")[-1] == (4, 50, 400, 450)
+    assert headers(spm, "SC002")[-1] == (3, 500, 1500, 2000)
+    new_ip = spm.get_payment_application("SC001", 4)
+    assert new_ip["Draft Date"] == "2026-10-31"
+    assert [(i['Item'], i['Applied Amount']) for i in spm.get_ip_items("SC001", 4)] == [(1, 50), (2, None)]
+    # A new IP starts unpaid: the copied items do not fill in its Certified/Paid
+    assert (new_ip["Certified Amount"], new_ip["Paid Amount"]) == (0, 0)
+
+
+def test_copy_and_roll_forward_on_a_shipped_database(tmp_path):
+    # Shipped databases have no "DOC Ref" column on "Sub Contract IP Item"
+    path = str(tmp_path / 'backup.db')
+    shutil.copy(os.path.join(module_root, 'fake_data', 'QS_Project_Backup.db'), path)
+    db = DB_Manager(path)
+    try:
+        assert "DOC Ref" not in {row["name"] for row in db.fetch_all('PRAGMA table_info("Sub Contract IP Item")')}
+        spm = Subcontract_Payment_Manager(db)
+        latest = {}
+        for a in db.fetch_all('SELECT "Sub Contract No", MAX(IP) AS ip FROM "Sub Contract IP Application" GROUP BY 1'):
+            latest[a["Sub Contract No"]] = a["ip"]
+        items = {sc: len(spm.get_ip_items(sc, ip)) for sc, ip in latest.items()}
+
+        assert spm.roll_forward_all("2026-10-31") == len(latest)
+        for sc, ip in latest.items():
+            assert len(spm.get_ip_items(sc, ip + 1)) == items[sc]
+        sc, ip = next(iter(latest.items()))
+        spm.create_payment_application(sc, ip + 2)
+        assert spm.copy_previous_ip_items(sc, ip + 2) == (items[sc] > 0)
+    finally:
+        db.close()
+
+
+def test_ip_item_grid_joins_amounts_from_the_lookup_maps(spm):
+    db = spm.db
+    db.insert("Sub Con Works", {"Subcontract": "SC001", "Works": "W1", "Qty": 10, "Rate": 20, "Discount": 0.1})
+    db.insert("Sub Contract VO", {"VO ref": "SCVO1", "Subcontract": "SC001", "Description": "Extra",
+                                  "Application Amount": 300, "Agree Amount": 250})
+    db.insert("Contra Charge", {"CC No": "CC1", "Title": "Cleaning", "Agree Amount": 40, "Deduct To": "SC001"})
+    spm.update_ip_item("SC001", 1, 1, {"Contract Work ref": "W1", "VO ref": "SCVO1 - Extra", "Contra Charge ref": "CC1"})
+    spm.update_ip_item("SC001", 1, 2, {"VO ref": "SCVO9"})
+
+    grid = spm.get_ip_item_grid("SC001", 1)
+    assert [(i['Works Display'], i['Works Amount'], i['VO Display'], i['VO Amount'], i['VO Agree Amount'],
+             i['CC Display'], i['Contra Charge Amount']) for i in grid] == [
+        ("W1", 180, "SCVO1 - Extra", 300, 250, "CC1 - Cleaning", 40),
+        ("", 0, "SCVO9", 0, 0, "", 0),  # unknown ref keeps its text
+    ]
+    assert spm.get_ref_labels("SC001") == {"works": ["W1"], "vo": ["SCVO1 - Extra"], "cc": ["CC1 - Cleaning"]}
+    assert spm.get_ref_labels("SC002") == {"works": [], "vo": [], "cc": []}
+
+    # Item edits keep the maps; a write to a lookup table reloads them
+    maps = spm.get_ip_lookups("SC001")
+    spm.update_ip_item("SC001", 1, 1, {"Applied Amount": 120})
+    assert spm.get_ip_lookups("SC001") is maps
+    db.update("Sub Con Works", {"Rate": 30}, "Subcontract = ? AND Works = ?", ("SC001", "W1"))
+    assert spm.lookup_ref("SC001", "works", "W1") == ("W1", 270)
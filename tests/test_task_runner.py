@@ -0,0 +1,105 @@
+import sys, os
+import threading
+from contextlib import contextmanager
+import pytest
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+from function.DB_manager import DB_Manager
+from function.BQ_manager import BQ_Manager
+from ui.Task_runner import Task_Runner
+
+
+@pytest.fixture
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def bq(tmp_path):
+    db = DB_Manager(str(tmp_path / 'runner.db'))
+    db.execute_query('CREATE TABLE "Main Contract BQ" ("BQ ID" TEXT PRIMARY KEY, Bill TEXT, Section TEXT, Page TEXT, Item TEXT, '
+                     'description TEXT, Qty REAL, Unit TEXT, Rate REAL, Discount REAL, Amount REAL, Trade TEXT, Remark TEXT)')
+    db.insert_many("Main Contract BQ", ({"BQ ID": f"BQ{i:04d}", "Qty": 1, "Rate": i, "Amount": i} for i in range(1, 1201)))
+    yield BQ_Manager(db)
+    db.close()
+
+
+def test_loads_run_on_a_read_only_worker_connection(app, bq):
+    runner = Task_Runner()
+    results = []
+
+    def load(manager):
+        return threading.current_thread() is not threading.main_thread(), manager.db is not bq.db, \
+            manager.db.query_only, len(manager.get_all_bq_items())
+    runner.submit("load", bq, load, on_result=results.append)
+    runner.wait()
+    assert results == [(True, True, True, 1200)]
+
+
+def test_new_task_for_a_key_drops_the_stale_result(app, bq):
+    runner = Task_Runner(max_threads=1)
+    gate = threading.Event()
+    results = []
+    runner.submit("items", bq, lambda manager: gate.wait(5) and "stale", on_result=results.append)
+    runner.submit("items", bq, "get_bq_item", "BQ0002", on_result=lambda row: results.append(row["BQ ID"]))
+    gate.set()
+    runner.wait()
+    assert results == ["BQ0002"] and not runner.is_busy("items")
+
+
+def test_export_reports_progress_and_cancel_skips_the_file(app, bq, tmp_path):
+    runner = Task_Runner()
+    progress, done = [], []
+    runner.submit("export", bq, "export_to_excel", str(tmp_path / 'bq.xlsx'),
+                  on_result=done.append, on_progress=lambda d, t: progress.append((d, t)))
+    runner.wait()
+    assert done == [1200] and progress[-1] == (1200, 1200) and (500, 1200) in progress
+
+    path = tmp_path / 'cancelled.xlsx'
+    task = runner.submit("export", bq, "export_to_excel", str(path), on_result=done.append, on_progress=lambda d, t: None)
+    runner.cancel("export")
+    runner.wait()
+    assert task.cancelled and done == [1200] and not path.exists()
+
+
+def test_errors_are_delivered_to_the_gui_thread(app, bq):
+    runner = Task_Runner()
+    errors = []
+    runner.submit("bad", bq, lambda manager: 1 / 0, on_error=errors.append)
+    runner.wait()
+    assert errors == ["division by zero"]
+
+
+def test_tasks_reuse_the_worker_connection_until_shutdown(app, bq):
+    runner = Task_Runner()
+    dbs = []
+    for _ in range(2):
+        runner.submit("load", bq, lambda manager: manager.db, on_result=dbs.append)
+        runner.wait()
+    assert len(dbs) == 2 and dbs[0] is dbs[1] and dbs[0] is not bq.db
+    runner.shutdown()
+    with pytest.raises(Exception):
+        dbs[0].conn.execute("SELECT 1")
+
+
+def test_worker_is_detached_from_the_task_before_it_returns_to_the_pool(app, bq):
+    seen = []
+
+    class Runner(Task_Runner):
+        @contextmanager
+        def worker_manager(self, manager):
+            with super().worker_manager(manager) as worker:
+                yield worker
+                # What a cancel() arriving now would interrupt
+                seen.append(tasks[0]._db)
+
+    runner = Runner()
+    gate = threading.Event()
+    tasks = [runner.submit("load", bq, lambda manager: gate.wait(5) and manager.db.query_only)]
+    gate.set()
+    runner.wait()
+    assert seen == [None]
@@ -0,0 +1,97 @@
+"""
+Benchmark: BQ Excel import, per-row commits vs batched upsert.
+
+Writes a synthetic BQ workbook, imports it into a fresh database with
+BQ_Manager.import_from_excel, then times the previous row-by-row
+get/insert/update loop on a sample of the rows for comparison.
+
+Usage:
+    python tools/bench_bq_import.py [--rows 50000] [--legacy-rows 2000] [--workdir /tmp]
+"""
+import sys
+import os
+import argparse
+import tempfile
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+import openpyxl
+from function.DB_manager import DB_Manager
+from function.BQ_manager import BQ_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+HEADERS = ["BQ ID", "Bill", "Section", "Page", "Item", "Description", "Qty", "Unit", "Rate", "Discount", "Trade", "Remark"]
+
+
+def write_workbook(path, rows):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADERS)
+    for i in range(1, rows + 1):
+        ws.append([f"BQ{i:06d}", f"Bill {i % 20 + 1}", f"Section {i % 7 + 1}", f"Page {i // 25 + 1}", f"Item {i}",
+                   f"Description for item {i}", float(i % 500 + 1), "m2", float(i % 97 + 10), 0.0, f"T{i % 50:03d}", ""])
+    wb.save(path)
+
+
+def fresh_db(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = DB_Manager(path)
+    db.create_tables_from_schema(SCHEMA_PATH)
+    return db
+
+
+def legacy_import(bq, file_path, limit):
+    """Row-by-row import as it was before upsert_many (one commit per row)."""
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    sheet = wb.active
+    rows = sheet.iter_rows(values_only=True)
+    headers = list(next(rows))
+    count = 0
+    for row in rows:
+        if count >= limit:
+            break
+        data = dict(zip(headers, row))
+        if bq.get_bq_item(data["BQ ID"]):
+            bq.update_bq_item(data["BQ ID"], {"description": data["Description"]})
+        else:
+            bq.add_bq_item(data["BQ ID"], data["Bill"], data["Section"], data["Page"], data["Item"], data["Description"],
+                           data["Qty"], data["Unit"], data["Rate"], data["Discount"], data["Trade"], data["Remark"])
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--legacy-rows', type=int, default=2000, help='Rows to time on the per-row path (extrapolated)')
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    xlsx = os.path.join(args.workdir, 'bench_bq_import.xlsx')
+    print(f"Writing {args.rows} BQ rows to {xlsx}...")
+    write_workbook(xlsx, args.rows)
+
+    db = fresh_db(os.path.join(args.workdir, 'bench_bq_import_batched.db'))
+    start = time.perf_counter()
+    count = BQ_Manager(db).import_from_excel(xlsx)
+    batched = time.perf_counter() - start
+    db.close()
+
+    db = fresh_db(os.path.join(args.workdir, 'bench_bq_import_legacy.db'))
+    start = time.perf_counter()
+    legacy_count = legacy_import(BQ_Manager(db), xlsx, args.legacy_rows)
+    legacy = time.perf_counter() - start
+    db.close()
+    legacy_estimate = legacy / max(legacy_count, 1) * args.rows
+
+    print(f"Batched import   : {count} rows in {batched:8.2f} s")
+    print(f"Per-row import   : {legacy_count} rows in {legacy:8.2f} s (~{legacy_estimate:,.0f} s for {args.rows} rows)")
+    print(f"Speed-up         : ~{legacy_estimate / batched:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: open the Bill of Quantities tab on a large BQ (offscreen).
+
+Times Ui_BQManager construction, then scrolls the table from top to
+bottom and reports the Python memory held by the model's row cache,
+which is bounded by BQTableModel.MAX_PAGES * PAGE_SIZE rows.
+
+Usage:
+    python tools/bench_bq_view.py [--db database/QS_Project_Large.db] [--lines 200000]
+"""
+import sys
+import os
+import argparse
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication
+from function.DB_manager import DB_Manager
+from function.BQ_manager import BQ_Manager
+from ui.Ui_BQManager import Ui_BQManager
+from fake_data.generate_large_db import generate_large_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.path.join(module_root, 'database', 'QS_Project_Large.db'))
+    parser.add_argument('--lines', type=int, default=200000, help='Lines when generating the database (60%% go to the BQ)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Generating {args.db}...")
+        generate_large_db(args.db, lines=args.lines)
+    # Work on a copy so edits made by the benchmark never touch the source
+    copy = os.path.join(tempfile.gettempdir(), 'bench_bq_view.db')
+    shutil.copyfile(args.db, copy)
+
+    app = QApplication.instance() or QApplication([])
+    db = DB_Manager(copy)
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    widget = Ui_BQManager(BQ_Manager(db))
+    widget.show()
+    app.processEvents()
+    opened = time.perf_counter() - start
+
+    model = widget.model
+    bar = widget.table.verticalScrollBar()
+    start = time.perf_counter()
+    while model.canFetchMore(widget.table.rootIndex()) or bar.value() < bar.maximum():
+        bar.setValue(bar.maximum())
+        app.processEvents()
+    scrolled = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+
+    print(f"BQ rows           : {model.rowCount():,}")
+    print(f"Open tab          : {opened * 1000:8.1f} ms")
+    print(f"Scroll to bottom  : {scrolled * 1000:8.1f} ms")
+    print(f"Cached pages      : {len(model._pages)} (max {model.MAX_PAGES} x {model.PAGE_SIZE} rows)")
+    print(f"Python memory     : {current / 1e6:8.1f} MB now, {peak / 1e6:8.1f} MB peak")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
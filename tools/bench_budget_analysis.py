@@ -0,0 +1,92 @@
+"""
+Benchmark: per-trade query fan-out vs grouped budget analysis.
+
+Generates (or reuses) a large synthetic database and times
+Budget_Manager.get_all_budget_analysis against the previous
+implementation that ran seven SUM queries for every trade.
+
+Usage:
+    python tools/bench_budget_analysis.py [--db path] [--trades 500] [--lines 200000] [--regenerate]
+"""
+import sys
+import os
+import argparse
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.Budget_manager import Budget_Manager
+from fake_data.generate_large_db import generate_large_db
+
+
+def legacy_budget_analysis(db, trade):
+    """The per-trade implementation this benchmark compares against."""
+    def total(query):
+        row = db.fetch_one(query, (trade,))
+        return row['Total'] if row and row['Total'] else 0
+
+    main_bq = total('SELECT SUM(Amount) as Total FROM "Main Contract BQ" WHERE Trade = ?')
+    vo_agreed = total('SELECT SUM(Amount) as Total FROM "VO Item" WHERE Trade = ? AND Agree = 1')
+    vo_potential = total('SELECT SUM(Amount) as Total FROM "VO Item" WHERE Trade = ? AND (Agree IS NULL OR Agree = 0)')
+    sc_works = total('SELECT SUM(Amount) as Total FROM "Sub Con Works" WHERE Trade = ?')
+    sc_vo_agreed = total('SELECT SUM(Amount) as Total FROM "SC VO Item" WHERE Trade = ? AND Agree = 1')
+    sc_vo_potential = total('SELECT SUM(Amount) as Total FROM "SC VO Item" WHERE Trade = ? AND (Agree IS NULL OR Agree = 0)')
+    contra_charge = total('''SELECT SUM(c.Qty * (c.Rate + COALESCE(c."Admin Rate",0))) as Total
+                             FROM "Contra Charge Item" c
+                             JOIN "Sub Con Works" s ON c."Give to" = s.Works
+                             WHERE s.Trade = ?''')
+    return {
+        "main_bq": main_bq, "vo_agreed": vo_agreed, "vo_potential": vo_potential,
+        "sc_works": sc_works, "sc_vo_agreed": sc_vo_agreed, "sc_vo_potential": sc_vo_potential,
+        "contra_charge": contra_charge
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.path.join(module_root, 'database', 'QS_Project_Large.db'))
+    parser.add_argument('--trades', type=int, default=500)
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--regenerate', action='store_true', help='Rebuild the database even if it exists')
+    args = parser.parse_args()
+
+    if args.regenerate or not os.path.exists(args.db):
+        print(f"Generating {args.db} ({args.trades} trades, {args.lines} lines)...")
+        generate_large_db(args.db, trades=args.trades, lines=args.lines)
+
+    db = DB_Manager(args.db)
+    bm = Budget_Manager(db)
+    trades = [t['Trade'] for t in bm.get_all_trade_budgets()]
+
+    start = time.perf_counter()
+    legacy = {trade: legacy_budget_analysis(db, trade) for trade in trades}
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = bm.get_all_budget_analysis()
+    grouped_time = time.perf_counter() - start
+
+    # Results must match the per-trade figures
+    keys = {'Main Contract Works': 'main_bq', 'VO Agreed': 'vo_agreed', 'VO Potential': 'vo_potential',
+            'SC Works': 'sc_works', 'SC VO Agreed': 'sc_vo_agreed', 'SC VO Potential': 'sc_vo_potential',
+            'Contra Charge': 'contra_charge'}
+    mismatches = 0
+    for row in rows:
+        old = legacy[row['Trade']]
+        for col, key in keys.items():
+            if abs((row[col] or 0) - (old[key] or 0)) > 1e-6 * max(1.0, abs(old[key] or 0)):
+                mismatches += 1
+
+    print(f"Trades: {len(trades)}")
+    print(f"Per-trade fan-out : {legacy_time * 1000:10.1f} ms ({len(trades) * 7} queries)")
+    print(f"Grouped analysis  : {grouped_time * 1000:10.1f} ms (1 query)")
+    if grouped_time > 0:
+        print(f"Speed-up          : {legacy_time / grouped_time:10.1f}x")
+    print("Results match" if mismatches == 0 else f"MISMATCHES: {mismatches}")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
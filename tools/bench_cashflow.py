@@ -0,0 +1,109 @@
+"""
+Benchmark: build the cash flow tab for a large project.
+
+Fills a fresh database with --scs subcontracts paid monthly over --years
+years, then times the previous dict-based monthly pivot against
+Budget_Manager.get_cashflow_subcontracts (NumPy cumsum) and the Budget
+tab's refresh_cashflow (offscreen).
+
+Usage:
+    python tools/bench_cashflow.py [--scs 300] [--years 5] [--workdir /tmp]
+"""
+import sys
+import os
+import argparse
+import datetime
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication
+from function.DB_manager import DB_Manager
+from function.Budget_manager import Budget_Manager
+from ui.Ui_BudgetManager import Ui_BudgetManager
+from ui.Task_runner import Task_Runner
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+
+def legacy_cashflow_subcontracts(db):
+    """The month x subcontract dict walk get_cashflow_subcontracts used before."""
+    scs = db.fetch_all('SELECT "Sub Contract No" as sc_no FROM "Sub Contract" ORDER BY "Sub Contract No"')
+    subcontract_list = [s['sc_no'] for s in scs]
+    payments = db.fetch_all('SELECT "Sub Contract No" as sc_no, "Payment Date" as PaymentDate, "Paid Amount" as Paid FROM "Sub Contract IP Application" WHERE "Payment Date" IS NOT NULL')
+    monthly = defaultdict(lambda: defaultdict(float))
+    for p in payments:
+        key = datetime.datetime.fromisoformat(p['PaymentDate']).strftime('%m/%y')
+        monthly[key][p['sc_no']] += p['Paid'] or 0
+    months = sorted(monthly.keys(), key=lambda x: (int(x.split('/')[1]), int(x.split('/')[0])))
+    cum = {sc: 0.0 for sc in subcontract_list}
+    rows = []
+    for m in months:
+        row = {'Month': m}
+        total = 0.0
+        for sc in subcontract_list:
+            cum[sc] += monthly[m].get(sc, 0.0)
+            row[sc] = cum[sc]
+            total += row[sc]
+        row['Total'] = total
+        rows.append(row)
+    return months, rows
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scs', type=int, default=300)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    path = os.path.join(args.workdir, 'bench_cashflow.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = DB_Manager(path)
+    db.create_tables_from_schema(SCHEMA_PATH)
+    rnd = random.Random(1)
+    months = args.years * 12
+    db.insert_many("Sub Contract", ({"Sub Contract No": f"SC{i:03d}"} for i in range(1, args.scs + 1)))
+    db.insert_many("Sub Contract IP Application", (
+        {"Sub Contract No": f"SC{i:03d}", "IP": ip, "Payment Date": f"{2021 + (ip - 1) // 12}-{(ip - 1) % 12 + 1:02d}-{rnd.randint(1, 28):02d}",
+         "Paid Amount": rnd.uniform(0, 100000)}
+        for i in range(1, args.scs + 1) for ip in range(1, months + 1)))
+    db.insert_many("Main Contract IP Application", (
+        {"IP": ip, "Payment Date": f"{2021 + (ip - 1) // 12}-{(ip - 1) % 12 + 1:02d}-25", "Paid Amount": rnd.uniform(0, 1e7)}
+        for ip in range(1, months + 1)))
+    bm = Budget_Manager(db)
+
+    legacy = timed(lambda: legacy_cashflow_subcontracts(db))
+    pivot = timed(bm.get_cashflow_subcontracts)
+
+    app = QApplication.instance() or QApplication([])
+    widget = Ui_BudgetManager(bm)
+    runner = Task_Runner.instance()
+    # The tables are loaded on a worker thread; time until they are shown
+    refresh = timed(lambda: (widget.refresh_cashflow(), runner.wait()), repeat=3)
+
+    print(f"Payments          : {args.scs * months:,} ({args.scs} subcontracts x {months} months)")
+    print(f"Dict pivot        : {legacy * 1000:8.1f} ms")
+    print(f"NumPy pivot       : {pivot * 1000:8.1f} ms")
+    print(f"Cash flow tab     : {refresh * 1000:8.1f} ms (refresh_cashflow, offscreen)")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
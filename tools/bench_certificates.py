@@ -0,0 +1,85 @@
+"""
+Benchmark: payment certificates for a whole period.
+
+Builds a database with --subcontracts subcontracts, each with one IP drafted
+in the period and --items IP items, writes the default certificate template,
+then times
+  single : one certificate, the way one is produced today
+  serial : every certificate rendered in this process (workers=0)
+  pool   : every certificate on a process pool (--workers, default CPU count)
+The pool only beats serial with more than one CPU; each worker pays a
+one-off start-up (interpreter, openpyxl import, template parse).
+
+Usage:
+    python tools/bench_certificates.py [--subcontracts 300] [--items 40] [--workers N] [--workdir /tmp]
+"""
+import sys
+import os
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.Certificate_manager import Certificate_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+PERIOD = "2025-06"
+
+
+def build_db(db_path, subcontracts, items, seed=1):
+    rnd = random.Random(seed)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    db = DB_Manager(db_path)
+    db.create_tables_from_schema(SCHEMA_PATH)
+    sc_nos = [f"SC{i:03d}" for i in range(1, subcontracts + 1)]
+    db.cursor.executemany('INSERT INTO "Sub Contract" ("Sub Contract No", "Sub Contract Name", "Company Name", "Contract Sum") VALUES (?, ?, ?, ?)',
+                          [(sc, f"Package {sc}", f"Company {sc}", rnd.randint(1, 50) * 100000.0) for sc in sc_nos])
+    db.cursor.executemany('INSERT INTO "Sub Contract IP Application" ("Sub Contract No", IP, "Draft Date") VALUES (?, ?, ?)',
+                          [(sc, ip, f"2025-{ip + 1:02d}-25") for sc in sc_nos for ip in (4, 5)])
+    db.cursor.executemany('INSERT INTO "Sub Contract IP Item" ("Sub Contract No", IP, Item, Type, Description, "Applied Amount", "Certified Amount") VALUES (?, ?, ?, ?, ?, ?, ?)',
+                          [(sc, 5, n, "Works", f"Item {n} of {sc}", round(rnd.uniform(100, 9000), 2), round(rnd.uniform(100, 9000), 2))
+                           for sc in sc_nos for n in range(1, items + 1)])
+    db.conn.commit()
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subcontracts', type=int, default=300)
+    parser.add_argument('--items', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    workdir = os.path.join(args.workdir, 'bench_certificates')
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    db = build_db(os.path.join(workdir, 'certificates.db'), args.subcontracts, args.items)
+    manager = Certificate_Manager(db)
+    template = Certificate_Manager.create_default_template(os.path.join(workdir, 'template.xlsx'))
+
+    # single: open the template, query and render one certificate
+    from function.Excel_manager import Excel_Template
+    start = time.perf_counter()
+    Excel_Template(template).save(os.path.join(workdir, 'single.xlsx'), manager.get_certificate_data("SC001", 5))
+    single = time.perf_counter() - start
+
+    serial = manager.generate_certificates(PERIOD, template, os.path.join(workdir, 'serial'), workers=0)
+    pool = manager.generate_certificates(PERIOD, template, os.path.join(workdir, 'pool'), workers=args.workers)
+    db.close()
+
+    print(f"Certificates : {serial['count']} ({args.items} items each), {os.cpu_count()} CPUs")
+    print(f"single       : {single * 1000:8.1f} ms")
+    print(f"serial       : {serial['seconds'] * 1000:8.1f} ms ({serial['seconds'] / serial['count'] * 1000:.1f} ms each)")
+    print(f"pool x{pool['workers']:<6}: {pool['seconds'] * 1000:8.1f} ms ({pool['failed']} failed)")
+
+
+if __name__ == '__main__':
+    main()
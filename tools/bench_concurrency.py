@@ -0,0 +1,110 @@
+"""
+Benchmark: concurrent readers and one writer on the same database file.
+
+Simulates several QS staff refreshing screens while one of them saves.
+Each reader process loops over typical screen reads; the writer process
+updates BQ rows in small transactions. The run is repeated with the
+legacy rollback-journal profile and with the WAL connection profile on
+separate copies of the database.
+
+Usage:
+    python tools/bench_concurrency.py [--db database/QS_Project_Large.db] [--readers 4] [--seconds 5]
+"""
+import sys
+import os
+import argparse
+import multiprocessing
+import shutil
+import tempfile
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from fake_data.generate_large_db import generate_large_db
+
+READS = [
+    ('SELECT * FROM "Trade Budget"', ()),
+    ('SELECT * FROM "Sub Contract"', ()),
+    ('SELECT Trade, SUM(Amount) AS Total FROM "Main Contract BQ" GROUP BY Trade', ()),
+    ('SELECT * FROM "Main Contract BQ" WHERE "BQ ID" = ?', ('BQ000100',)),
+]
+
+
+def reader(db_path, profile, seconds, results):
+    db = DB_Manager(db_path, query_only=True, profile=profile)
+    reads = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for query, params in READS:
+            if db.read_query(query, params) is None:
+                errors += 1
+            else:
+                reads += 1
+    db.close()
+    results.put(('reader', reads, errors, 0.0))
+
+
+def writer(db_path, profile, seconds, results):
+    db = DB_Manager(db_path, profile=profile)
+    writes = errors = 0
+    worst = 0.0
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        rows = [{"BQ ID": f"BQ{(i * 10 + k) % 100000 + 1:06d}", "Remark": f"rev {i}"} for k in range(10)]
+        start = time.perf_counter()
+        if db.upsert_many("Main Contract BQ", rows, ["BQ ID"]) is None:
+            errors += 1
+        else:
+            writes += 1
+        worst = max(worst, time.perf_counter() - start)
+        i += 1
+    db.close()
+    results.put(('writer', writes, errors, worst))
+
+
+def run(label, db_path, profile, readers, seconds):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=reader, args=(db_path, profile, seconds, results)) for _ in range(readers)]
+    procs.append(multiprocessing.Process(target=writer, args=(db_path, profile, seconds, results)))
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    reads = sum(r[1] for r in collected if r[0] == 'reader')
+    read_errors = sum(r[2] for r in collected if r[0] == 'reader')
+    _, writes, write_errors, worst = next(r for r in collected if r[0] == 'writer')
+    print(f"{label:<18}{reads / seconds:12,.0f} reads/s{writes / seconds:10,.1f} commits/s"
+          f"   worst commit {worst * 1000:8.1f} ms   errors r/w: {read_errors}/{write_errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.path.join(module_root, 'database', 'QS_Project_Large.db'))
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Generating {args.db}...")
+        generate_large_db(args.db)
+
+    print(f"{args.readers} reader processes + 1 writer, {args.seconds:.0f} s each")
+    for label, profile in (('rollback journal', DB_Manager.LEGACY_PROFILE), ('WAL profile', DB_Manager.DEFAULT_PROFILE)):
+        copy = os.path.join(args.workdir, 'bench_concurrency.db')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(copy + suffix):
+                os.remove(copy + suffix)
+        shutil.copyfile(args.db, copy)
+        # journal_mode is stored in the file, so set it once before the workers start
+        DB_Manager(copy, profile=profile).close()
+        run(label, copy, profile, args.readers, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
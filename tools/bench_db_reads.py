@@ -0,0 +1,75 @@
+"""
+Microbenchmark: reads per second through DB_Manager.
+
+Compares the old read path (execute_query, which commits after every
+statement) with the read-only path used by fetch_all/fetch_one, on a
+normal connection and on a query_only connection.
+
+Usage:
+    python tools/bench_db_reads.py [--db database/QS_Project.db] [--seconds 2]
+"""
+import sys
+import os
+import argparse
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+
+# Typical screen-refresh reads issued by the managers
+READS = [
+    ('SELECT * FROM "Trade Budget"', ()),
+    ('SELECT * FROM "Main Contract IP Application" ORDER BY IP ASC', ()),
+    ('SELECT * FROM "Main Contract IP Item" WHERE IP = ? ORDER BY Item ASC', (1,)),
+    ('SELECT * FROM "Sub Contract"', ()),
+    ('SELECT * FROM "Sub Contract" WHERE "Sub Contract No" = ?', ('SC001',)),
+    ('SELECT * FROM "Document Manager" WHERE File = ?', ('DOC001',)),
+    ('SELECT SUM(Amount) as Total FROM "Main Contract BQ" WHERE Trade = ?', ('Concrete',)),
+]
+
+
+def legacy_fetch_all(db, query, params):
+    cursor = db.execute_query(query, params)
+    return [dict(row) for row in cursor.fetchall()] if cursor else []
+
+
+def run(label, fetch, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for query, params in READS:
+            fetch(query, params)
+        count += len(READS)
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed
+    print(f"{label:<32}{rate:12,.0f} reads/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.path.join(module_root, 'database', 'QS_Project.db'))
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}")
+        return
+
+    db = DB_Manager(args.db)
+    before = run('execute_query + commit', lambda q, p: legacy_fetch_all(db, q, p), args.seconds)
+    after = run('fetch_all (read path)', db.fetch_all, args.seconds)
+    db.close()
+
+    ro = DB_Manager(args.db, query_only=True)
+    after_ro = run('fetch_all (query_only conn)', ro.fetch_all, args.seconds)
+    ro.close()
+
+    print(f"Read path speed-up: {after / before:.2f}x (query_only: {after_ro / before:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
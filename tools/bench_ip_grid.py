@@ -0,0 +1,120 @@
+"""
+Benchmark: switch between Main Contract IPs in the Payment tab.
+
+Fills a fresh database with BQ items, VOs, documents and IPs of --items
+items each, then compares loading an IP's items the previous way (three
+reference list queries plus one or two lookups per row) with
+Payment_Application_Manager.get_ip_item_grid and the cached reference
+lists, and times Ui_PaymentManager.load_ip_data switching IPs (offscreen).
+
+Usage:
+    python tools/bench_ip_grid.py [--items 2000] [--bq 5000] [--workdir /tmp]
+"""
+import sys
+import os
+import argparse
+import random
+import tempfile
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication
+from function.DB_manager import DB_Manager
+from function.Payment_Application_manager import Payment_Application_Manager
+from ui.Ui_PaymentManager import Ui_PaymentManager
+from ui.Task_runner import Task_Runner
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+
+
+def legacy_load(pm, ip_no):
+    """The per-row path refresh_item_table used before get_ip_item_grid."""
+    items = pm.get_ip_items(ip_no)
+    refs = [pm.db.fetch_all(q) for q in (
+        'SELECT "BQ ID", description FROM "Main Contract BQ" ORDER BY "BQ ID"',
+        'SELECT "VO ref", Description FROM "Main Contract VO" ORDER BY "VO ref"',
+        'SELECT File, Title FROM "Document Manager" ORDER BY File')]
+    amounts = [(pm.get_bq_amount(i['BQ Ref']) if i['BQ Ref'] else 0.0,
+                pm.get_vo_application_amount(i['VO Ref']) if i['VO Ref'] else 0.0) for i in items]
+    return items, refs, amounts
+
+
+def grid_load(pm, ip_no):
+    return pm.get_ip_item_grid(ip_no), pm.get_existing_bq_refs(), pm.get_existing_vo_refs(), pm.get_existing_doc_refs()
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=2000, help='Items per IP')
+    parser.add_argument('--bq', type=int, default=5000, help='BQ items')
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    path = os.path.join(args.workdir, 'bench_ip_grid.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = DB_Manager(path)
+    db.create_tables_from_schema(SCHEMA_PATH)
+    rnd = random.Random(1)
+    db.insert_many("Main Contract BQ", ({"BQ ID": f"BQ{i:05d}", "description": f"BQ item {i}", "Qty": rnd.randint(1, 100),
+                                         "Rate": rnd.uniform(10, 500), "Discount": 0} for i in range(1, args.bq + 1)))
+    db.insert_many("Main Contract VO", ({"VO ref": f"VO{i:03d}", "Description": f"Variation {i}",
+                                         "Application Amount": rnd.uniform(1000, 50000)} for i in range(1, 301)))
+    db.insert_many("Document Manager", ({"File": f"DOC{i:05d}", "Title": f"Letter {i}"} for i in range(1, 1001)))
+    pm = Payment_Application_Manager(db)
+    for ip in (1, 2):
+        pm.create_payment_application(ip)
+        db.insert_many("Main Contract IP Item", ({
+            "IP": ip, "Item": n, "Type": "BQ" if n % 5 else "VO",
+            "BQ Ref": f"BQ{rnd.randint(1, args.bq):05d}" if n % 5 else "",
+            "VO Ref": "" if n % 5 else f"VO{rnd.randint(1, 300):03d}",
+            "DOC Ref": f"DOC{rnd.randint(1, 1000):05d}" if n % 3 == 0 else "",
+            "Description": f"Item {n}", "Applied Amount": rnd.uniform(0, 10000),
+            "Certified Amount": 0, "Paid Amount": 0, "Remark": ""} for n in range(1, args.items + 1)))
+
+    queries = []
+    db.conn.set_trace_callback(queries.append)
+    legacy = timed(lambda: legacy_load(pm, 1))
+    legacy_queries = len(queries) // 5
+    queries.clear()
+    grid_load(pm, 1)  # fill the reference cache once
+    grid = timed(lambda: grid_load(pm, 1))
+    grid_queries = len(queries) // 6
+    db.conn.set_trace_callback(None)
+
+    app = QApplication.instance() or QApplication([])
+    runner = Task_Runner.instance()
+    widget = Ui_PaymentManager(pm)
+    widget.load_ip_data(2)
+    runner.wait()
+    blocked = shown = 0.0
+    for ip in (1, 2, 1, 2):
+        start = time.perf_counter()
+        widget.load_ip_data(ip)
+        blocked += time.perf_counter() - start
+        runner.wait()  # items are loaded on a worker thread and shown when they arrive
+        app.processEvents()
+        shown += time.perf_counter() - start
+
+    print(f"IP items          : {args.items:,} per IP, {args.bq:,} BQ items")
+    print(f"Per-row lookups   : {legacy * 1000:8.1f} ms, {legacy_queries:,} queries")
+    print(f"get_ip_item_grid  : {grid * 1000:8.1f} ms, {grid_queries:,} queries (reference lists cached)")
+    print(f"Switch IP (UI)    : {shown / 4 * 1000:8.1f} ms until shown, GUI thread busy {blocked / 4 * 1000:.1f} ms before the load")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: open a large Sub Contract IP in the Sub Contract Payment tab.
+
+Fills a fresh database with one nominated subcontract (--works works items,
+VOs and contra charges) and two IPs of --items items each, then compares
+loading an IP's items the previous way (the works list re-read for every
+row, a VO and a contra charge lookup per row) with
+Subcontract_Payment_Manager.get_ip_item_grid on the cached lookup maps, and
+times Ui_SubcontractPaymentManager.load_ip_details switching IPs (offscreen).
+
+Usage:
+    python tools/bench_sc_ip_grid.py [--items 1500] [--works 3000] [--workdir /tmp]
+"""
+import sys
+import os
+import argparse
+import random
+import tempfile
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication
+from function.DB_manager import DB_Manager
+from function.Subcontract_manager import Subcontract_Manager
+from function.Subcontract_Payment_manager import Subcontract_Payment_Manager
+from ui.Ui_SubcontractPaymentManager import Ui_SubcontractPaymentManager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+SC = "SC001"
+
+
+def legacy_load(spm, sm, ip_no):
+    """The per-row path refresh_item_table used before get_ip_item_grid."""
+    items = spm.get_ip_items(SC, ip_no)
+    sm.get_sc_works(SC)
+    sm.get_sc_vos(SC)
+    spm.db.fetch_all('SELECT * FROM "Contra Charge" WHERE "Deduct To" = ?', (SC,))
+    amounts = []
+    for item in items:
+        works = item['Contract Work ref'] and next((w for w in sm.get_sc_works(SC) if w['Works'] == item['Contract Work ref']), None)
+        vo = item['VO ref'] and sm.get_sc_vo(item['VO ref'])
+        cc = item['Contra Charge ref'] and spm.db.fetch_one('SELECT "Agree Amount" as amt FROM "Contra Charge" WHERE "CC No" = ?', (item['Contra Charge ref'],))
+        amounts.append((works, vo, cc))
+    return items, amounts
+
+
+def grid_load(spm, ip_no):
+    return spm.get_ip_item_grid(SC, ip_no), spm.get_ref_labels(SC)
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=1500, help='Items per IP')
+    parser.add_argument('--works', type=int, default=3000, help='Works items of the subcontract')
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    path = os.path.join(args.workdir, 'bench_sc_ip_grid.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = DB_Manager(path)
+    db.create_tables_from_schema(SCHEMA_PATH)
+    rnd = random.Random(1)
+    db.insert("Sub Contract", {"Sub Contract No": SC, "Sub Contract Name": "Nominated MEP"})
+    db.insert_many("Sub Con Works", ({"Subcontract": SC, "Works": f"W{i:05d}", "Qty": rnd.randint(1, 100),
+                                      "Rate": rnd.uniform(10, 500), "Discount": 0} for i in range(1, args.works + 1)))
+    db.insert_many("Sub Contract VO", ({"VO ref": f"SCVO{i:03d}", "Subcontract": SC, "Description": f"Variation {i}",
+                                        "Application Amount": rnd.uniform(1000, 50000)} for i in range(1, 201)))
+    db.insert_many("Contra Charge", ({"CC No": f"CC{i:03d}", "Title": f"Contra {i}", "Agree Amount": rnd.uniform(100, 5000),
+                                      "Deduct To": SC} for i in range(1, 101)))
+    spm = Subcontract_Payment_Manager(db)
+    sm = Subcontract_Manager(db)
+    for ip in (1, 2):
+        spm.create_payment_application(SC, ip)
+        db.insert_many("Sub Contract IP Item", ({
+            "Sub Contract No": SC, "IP": ip, "Item": n, "Type": "Works",
+            "Contract Work ref": f"W{rnd.randint(1, args.works):05d}" if n % 5 else "",
+            "VO ref": "" if n % 5 else f"SCVO{rnd.randint(1, 200):03d}",
+            "Contra Charge ref": f"CC{rnd.randint(1, 100):03d}" if n % 20 == 0 else "",
+            "Description": f"Item {n}", "Applied Amount": rnd.uniform(0, 10000)} for n in range(1, args.items + 1)))
+
+    queries = []
+    db.conn.set_trace_callback(queries.append)
+    legacy = timed(lambda: legacy_load(spm, sm, 1), repeat=1)
+    legacy_queries = len(queries)
+    queries.clear()
+    grid_load(spm, 1)  # fill the lookup maps once
+    queries.clear()
+    grid = timed(lambda: grid_load(spm, 1))
+    grid_queries = len(queries) // 3
+    db.conn.set_trace_callback(None)
+
+    app = QApplication.instance() or QApplication([])
+    widget = Ui_SubcontractPaymentManager(spm, sm)
+    widget.load_ip_details(2)
+    switch = 0.0
+    for ip in (1, 2, 1, 2):
+        start = time.perf_counter()
+        widget.current_ip = ip
+        widget.load_ip_details(ip)
+        app.processEvents()
+        switch += time.perf_counter() - start
+
+    print(f"IP items          : {args.items:,} per IP, {args.works:,} works items")
+    print(f"Per-row lookups   : {legacy * 1000:8.1f} ms, {legacy_queries:,} queries")
+    print(f"get_ip_item_grid  : {grid * 1000:8.1f} ms, {grid_queries:,} queries (lookup maps cached)")
+    print(f"Switch IP (UI)    : {switch / 4 * 1000:8.1f} ms")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: find every document that mentions a word.
+
+Fills a fresh database with synthetic site memos/RFIs and compares a
+LIKE '%word%' scan over Title/Remark/From/To with Search_Manager.search
+on the FTS5 index.
+
+Usage:
+    python tools/bench_search.py [--docs 20000] [--word rebar] [--workdir /tmp]
+"""
+import sys
+import os
+import argparse
+import random
+import tempfile
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+from function.DB_manager import DB_Manager
+from function.Search_manager import Search_Manager
+
+SCHEMA_PATH = os.path.join(module_root, 'database', 'Project_db_Schema.txt')
+WORDS = ("site meeting memo rfi drawing revision concrete formwork slab column beam wall inspection delay "
+         "instruction programme variation access crane scaffold waterproofing please confirm attached the "
+         "of to and for on level grid zone works contractor engineer architect").split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--word', default='rebar')
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    path = os.path.join(args.workdir, 'bench_search.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = DB_Manager(path)
+    db.create_tables_from_schema(SCHEMA_PATH)
+    rnd = random.Random(1)
+    rows = [{"File": f"DOC{i:06d}", "Date": "2025-01-01", "Title": f"{rnd.choice(['Memo', 'RFI'])} {i} " + ' '.join(rnd.sample(WORDS, 4)),
+             "From": f"Party {i % 40}", "To": "Main Contractor",
+             # About 2% of the memos mention the search word
+             "Remark": ' '.join(rnd.choices(WORDS, k=120) + ([args.word] if rnd.random() < 0.02 else []))}
+            for i in range(1, args.docs + 1)]
+    db.insert_many("Document Manager", rows)
+
+    sm = Search_Manager(db)
+    start = time.perf_counter()
+    sm.ensure_index()
+    build = time.perf_counter() - start
+
+    like = f"%{args.word}%"
+    start = time.perf_counter()
+    scanned = db.fetch_all('''SELECT File FROM "Document Manager"
+                              WHERE Title LIKE ? OR Remark LIKE ? OR "From" LIKE ? OR "To" LIKE ?''', (like,) * 4)
+    like_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = sm.search(args.word, scopes=["document"], limit=args.docs)
+    fts_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top = sm.search(args.word, scopes=["document"], limit=50)
+    top_time = time.perf_counter() - start
+
+    print(f"Documents         : {args.docs:,} (index built in {build * 1000:.0f} ms)")
+    print(f"LIKE scan         : {like_time * 1000:8.1f} ms, {len(scanned):,} matches")
+    print(f"FTS5 all matches  : {fts_time * 1000:8.1f} ms, {len(found):,} matches (ranked)")
+    print(f"FTS5 top 50       : {top_time * 1000:8.1f} ms, {len(top)} results")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
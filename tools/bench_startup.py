@@ -0,0 +1,93 @@
+"""
+Benchmark: time to first paint of the main window (offscreen).
+
+Generates a large project database (fake_data/generate_large_db.py) unless
+--db is given, opens MainWindow once to create the search index and
+rollup triggers, then compares
+  lazy  : MainWindow() + show(), only the visible tab is built
+  eager : the same with every tab built before show(), as before tabs
+          were built on first selection
+and reports how long each tab takes to build.
+
+Usage:
+    python tools/bench_startup.py [--db path] [--lines 200000] [--workdir /tmp]
+"""
+import sys
+import os
+import argparse
+import tempfile
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+sys.path.insert(0, os.path.join(module_root, 'fake_data'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+start = time.perf_counter()
+import main
+IMPORT_TIME = time.perf_counter() - start
+
+from PyQt5.QtWidgets import QApplication
+from ui.Task_runner import Task_Runner
+
+
+def first_paint(app, db_path, build_all=False):
+    start = time.perf_counter()
+    window = main.MainWindow(db_path)
+    if build_all:
+        for index in range(len(window.TABS)):
+            window.ensure_tab(index)
+    window.show()
+    window.repaint()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    return window, elapsed
+
+
+def close(app, window):
+    window.close()
+    Task_Runner.instance().wait()
+    app.processEvents()
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db')
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        from generate_large_db import generate_large_db
+        db_path = os.path.join(args.workdir, 'bench_startup.db')
+        generate_large_db(db_path, lines=args.lines)
+
+    app = QApplication.instance() or QApplication([])
+    # Warm up: first open creates the FTS index and triggers, and loads the .ui files once
+    window, setup = first_paint(app, db_path)
+    close(app, window)
+
+    window, lazy = first_paint(app, db_path)
+    tab_times = []
+    for index, (label, _) in enumerate(window.TABS):
+        start = time.perf_counter()
+        window.ensure_tab(index)
+        tab_times.append((label, time.perf_counter() - start))
+    Task_Runner.instance().wait()
+    close(app, window)
+
+    window, eager = first_paint(app, db_path, build_all=True)
+    close(app, window)
+
+    print(f"Database          : {db_path}")
+    print(f"import main       : {IMPORT_TIME * 1000:8.1f} ms")
+    print(f"First open        : {setup * 1000:8.1f} ms (creates search index and triggers)")
+    print(f"First paint, lazy : {lazy * 1000:8.1f} ms")
+    print(f"First paint, eager: {eager * 1000:8.1f} ms (all tabs built up front)")
+    for label, elapsed in sorted(tab_times, key=lambda t: -t[1]):
+        print(f"  {label:<20}: {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main_bench()
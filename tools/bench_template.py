@@ -0,0 +1,88 @@
+"""
+Benchmark: fill an Excel template many times with Excel_Template.
+
+Builds a certificate-like template (title, named header cells, a one-row
+item block with a formula, a total and a footer), then writes --files
+workbooks of --items items each, reading the template once
+(Excel_Manager.write_excel_templates) versus loading it from disk for
+every file.
+
+Usage:
+    python tools/bench_template.py [--files 100] [--items 50] [--workdir /tmp]
+"""
+import sys
+import os
+import argparse
+import tempfile
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+import openpyxl
+from openpyxl.styles import Font, Border, Side
+from openpyxl.workbook.defined_name import DefinedName
+from function.Excel_manager import Excel_Manager, Excel_Template
+
+
+def make_template(path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Certificate"
+    ws["A1"] = "Interim Payment Certificate"
+    ws["A1"].font = Font(bold=True, size=14)
+    ws.merge_cells("A1:F1")
+    for row, label in enumerate(["Subcontract", "Subcontractor", "IP", "Period"], start=3):
+        ws.cell(row, 1, label).font = Font(bold=True)
+    wb.defined_names["ContractNo"] = DefinedName("ContractNo", attr_text="Certificate!$B$3")
+    thin = Border(bottom=Side(style='thin'))
+    for col in range(1, 7):
+        ws.cell(9, col).border = thin
+    ws["F9"] = "=D9*E9"
+    wb.defined_names["Items"] = DefinedName("Items", attr_text="Certificate!$A$9:$F$9")
+    ws["E11"], ws["F11"] = "Total", "=SUM(F9:F9)"
+    ws["A13"] = "Certified by"
+    wb.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--items', type=int, default=50)
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    out_dir = os.path.join(args.workdir, 'bench_template')
+    os.makedirs(out_dir, exist_ok=True)
+    template_path = os.path.join(out_dir, 'template.xlsx')
+    make_template(template_path)
+
+    def data_map(i):
+        return {"ContractNo": f"SC{i:03d}", "B4": f"Company {i}", "B5": 3, "B6": "2026-09",
+                "Items": [(n, f"Works item {n}", None, n % 7 + 1, 125.5) for n in range(1, args.items + 1)]}
+    outputs = [(os.path.join(out_dir, f"SC{i:03d}.xlsx"), data_map(i)) for i in range(1, args.files + 1)]
+
+    Excel_Template(template_path).render(outputs[0][1])  # warm up imports
+    start = time.perf_counter()
+    for path, dm in outputs:
+        Excel_Template(template_path).save(path, dm)
+    per_file = time.perf_counter() - start
+
+    start = time.perf_counter()
+    written = Excel_Manager().write_excel_templates(template_path, outputs)
+    once = time.perf_counter() - start
+
+    template = Excel_Manager().load_template(template_path)
+    start = time.perf_counter()
+    for _, dm in outputs:
+        template.render(dm)
+    render = time.perf_counter() - start
+
+    print(f"Files             : {len(written)} x {args.items} items")
+    print(f"Render in memory  : {render * 1000 / args.files:8.1f} ms/file (copy from the template bytes + fill)")
+    print(f"Template per file : {per_file * 1000 / args.files:8.1f} ms/file")
+    print(f"Template once     : {once * 1000 / args.files:8.1f} ms/file ({once:.2f} s total)")
+
+
+if __name__ == '__main__':
+    main()
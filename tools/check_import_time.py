@@ -0,0 +1,63 @@
+"""
+Check: what `import main` costs at application start.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and
+fails (exit code 1) if a heavy optional dependency is imported at start
+(they are loaded on first use: openpyxl when exporting/importing, numpy
+for the cash flow pivot, win32com for Excel automation) or if the total
+import time exceeds --budget-ms.
+
+Usage:
+    python tools/check_import_time.py [--module main] [--budget-ms 1000] [--top 15]
+"""
+import sys
+import os
+import argparse
+import subprocess
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Top-level packages that must not be imported at start
+DEFERRED = ("pandas", "openpyxl", "xlsxwriter", "numpy", "win32com")
+
+
+def import_profile(module):
+    """{module name: (self us, cumulative us)} for `import module` in a fresh interpreter."""
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=module_root, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    profile = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = (int(own), int(cumulative))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='main')
+    parser.add_argument('--budget-ms', type=float, default=1000)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    profile = import_profile(args.module)
+    total_ms = profile[args.module][1] / 1000
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms), {len(profile)} modules")
+    for name, (_, cumulative) in sorted(profile.items(), key=lambda p: -p[1][1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = sorted({name.split('.')[0] for name in profile} & set(DEFERRED))
+    for package in failures:
+        print(f"FAIL: {package} is imported at start; import it where it is used")
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import {args.module} took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    return 1 if failures or total_ms > args.budget_ms else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
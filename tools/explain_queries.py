@@ -0,0 +1,162 @@
+"""
+Index advisor: run EXPLAIN QUERY PLAN over every SQL string in function/*.py.
+
+Collects string literals that start with SELECT/UPDATE/DELETE/INSERT/WITH
+from the manager modules, explains each one against an in-memory copy of
+the database and flags plans that scan a whole table. Scans of a query
+without WHERE/JOIN (e.g. "SELECT * FROM x") are expected and listed
+separately, as are the scans in ACCEPTED. Scans of subqueries and
+materialized CTEs are not table scans. f-strings are skipped;
+{placeholders} in plain strings (Budget_Manager.TRADE_TOTALS_QUERY) are
+filled with nothing.
+
+Usage:
+    python tools/explain_queries.py [--db database/QS_Project.db] [--migration file.sql ...] [--all]
+
+--migration can be given more than once; apply migrations/20261018_add_indexes.sql
+and migrations/20261018_add_id_sequence.sql to check a database that has
+not been migrated yet.
+
+Exits with status 1 when a filtered query still does a full table scan
+that is not in ACCEPTED.
+"""
+import sys
+import os
+import argparse
+import ast
+import glob
+import re
+import sqlite3
+import string
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+
+SQL_START = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT|WITH)\s')
+FILTERED = re.compile(r'\b(WHERE|JOIN|GROUP BY)\b', re.IGNORECASE)
+# "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX i" walks an index instead
+FULL_SCAN = re.compile(r'^SCAN (?!.*\bUSING\b)', re.IGNORECASE)
+# Numbered parameters (?1) bind once however often they appear
+NUMBERED_PARAM = re.compile(r'\?(\d+)')
+SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+
+# Filtered queries that read the whole table by design, by "<module>.<constant>"
+ACCEPTED = {
+    "Budget_manager.SC_PAYMENTS_QUERY": "cash flow reads every paid IP header (one row per IP)",
+    "Budget_manager.CLIENT_PAYMENTS_QUERY": "cash flow reads every paid IP header (one row per IP)",
+    "Payment_Application_manager.IP_TOTALS_QUERY": "running totals need every earlier IP header",
+}
+
+
+class _Blank(string.Formatter):
+    def get_value(self, key, args, kwargs):
+        return ''
+
+
+def collect_queries(pattern=os.path.join(module_root, 'function', '*.py')):
+    """Return [(file, line, name, sql)] for every literal SQL string in the matching modules;
+    name is "<module>.<constant>" for a string assigned to a name, else None."""
+    found = []
+    for path in sorted(glob.glob(pattern)):
+        module = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                node.value._name = f"{module}.{node.targets[0].id}"
+            # Skip f-string fragments and docstrings
+            if isinstance(node, ast.JoinedStr):
+                for value in node.values:
+                    value._skip = True
+            elif isinstance(node, ast.Expr):
+                node.value._skip = True
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and not getattr(node, '_skip', False):
+                if SQL_START.match(node.value) and 'sqlite_master' not in node.value:
+                    sql = node.value
+                    if '{' in sql:
+                        sql = _Blank().format(sql)
+                    found.append((os.path.relpath(path, module_root), node.lineno, getattr(node, '_name', None), sql.strip()))
+    return found
+
+
+def open_copy(db_path, migrations=()):
+    """In-memory copy of the database with the migrations applied in order."""
+    conn = sqlite3.connect(':memory:')
+    source = sqlite3.connect(db_path)
+    source.backup(conn)
+    source.close()
+    for migration in migrations:
+        with open(migration, encoding='utf-8') as f:
+            conn.executescript(f.read())
+    return conn
+
+
+def param_count(sql):
+    """Parameters to bind: ? outside string literals, with ?N counted up to the highest N."""
+    sql = SQL_STRING.sub('', sql)
+    numbered = [int(n) for n in NUMBERED_PARAM.findall(sql)]
+    plain = sql.count('?') - len(numbered)
+    return max(numbered, default=0) + plain
+
+
+def explain(conn, sql):
+    """Return the plan detail lines for `sql`, binding NULL for every parameter."""
+    params = [None] * param_count(sql)
+    rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    return [row[3] for row in rows]
+
+
+def full_scans(plan):
+    """Plan lines scanning a whole table, not a subquery or a materialized CTE/subquery."""
+    derived = {detail.split(' ', 1)[1] for detail in plan if detail.startswith(('MATERIALIZE ', 'CO-ROUTINE '))}
+    return [detail for detail in plan
+            if FULL_SCAN.match(detail) and not detail.startswith('SCAN (') and detail[5:] not in derived]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.path.join(module_root, 'database', 'QS_Project.db'))
+    parser.add_argument('--migration', action='append', default=[],
+                        help='Apply this .sql file to the in-memory copy first (repeatable)')
+    parser.add_argument('--all', action='store_true', help='Print the plan of every query, not just the scans')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}")
+        return 2
+
+    conn = open_copy(args.db, args.migration)
+    flagged = expected = accepted = errors = 0
+    for path, line, name, sql in collect_queries():
+        try:
+            plan = explain(conn, sql)
+        except sqlite3.Error as e:
+            errors += 1
+            print(f"{path}:{line}: cannot explain ({e})")
+            continue
+        scans = full_scans(plan)
+        if scans and FILTERED.search(sql) and name in ACCEPTED:
+            accepted += 1
+            label = f'scan (accepted: {ACCEPTED[name]})'
+        elif scans and FILTERED.search(sql):
+            flagged += 1
+            label = 'FULL SCAN'
+        elif scans:
+            expected += 1
+            label = 'scan (unfiltered)'
+        else:
+            label = 'ok'
+        if label == 'FULL SCAN' or args.all:
+            print(f"{path}:{line}: {label}")
+            print('    ' + ' '.join(sql.split())[:160])
+            for detail in plan:
+                print(f"      {detail}")
+    conn.close()
+
+    print(f"\n{flagged} filtered full scans, {accepted} accepted scans, {expected} unfiltered scans, "
+          f"{errors} not explainable")
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
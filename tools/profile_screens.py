@@ -0,0 +1,93 @@
+"""
+Profile: which screens cost what in SQL.
+
+Opens MainWindow (offscreen) on a project database with the query profiler
+enabled, builds every tab and runs each tab's refresh, then prints the most
+expensive statements (grouped by SQL, manager method and UI action) and
+writes the full report and slow query log as JSON. Also reports what the
+profiler costs: a fetch_one loop timed with it off and on.
+
+Usage:
+    python tools/profile_screens.py [--db path] [--lines 200000] [--slow-ms 50] [--json query_profile.json] [--top 15]
+"""
+import sys
+import os
+import argparse
+import tempfile
+import time
+
+module_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, module_root)
+sys.path.insert(0, os.path.join(module_root, 'fake_data'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import main
+from PyQt5.QtWidgets import QApplication
+from function.Query_profiler import Query_Profiler, action
+from ui.Task_runner import Task_Runner
+
+
+def profiler_overhead(db, loops=20000):
+    """(seconds per fetch_one without, with the profiler enabled)."""
+    query = "SELECT 1 AS one"
+    timings = []
+    for profiler in (None, Query_Profiler(slow_ms=1e9)):
+        if profiler:
+            profiler.enable()
+        start = time.perf_counter()
+        for _ in range(loops):
+            db.fetch_one(query)
+        timings.append((time.perf_counter() - start) / loops)
+        if profiler:
+            profiler.disable()
+    return timings
+
+
+def main_profile():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db')
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--slow-ms', type=float, default=50)
+    parser.add_argument('--json', default='query_profile.json')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--workdir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        from generate_large_db import generate_large_db
+        db_path = os.path.join(args.workdir, 'profile_screens.db')
+        generate_large_db(db_path, lines=args.lines)
+
+    app = QApplication.instance() or QApplication([])
+    profiler = Query_Profiler(slow_ms=args.slow_ms).enable()
+    window = main.MainWindow(db_path)
+    window.show()
+    app.processEvents()
+    for index, (label, attr) in enumerate(window.TABS):
+        with action(f"open {label}"):
+            window.ensure_tab(index)
+        refresh = getattr(window.__dict__[attr], window.TAB_REFRESH.get(attr, ''), None)
+        if refresh:
+            with action(f"refresh {label}"):
+                refresh()
+    Task_Runner.instance().wait()
+    profiler.disable()
+
+    report = profiler.report()
+    print(f"Database: {db_path}")
+    print(f"{sum(r['count'] for r in report):,} statements, {sum(r['total_ms'] for r in report):,.1f} ms, "
+          f"{len(profiler.slow)} slower than {args.slow_ms:g} ms")
+    print(f"{'total ms':>10} {'count':>7} {'p95 ms':>8}  action / caller / sql")
+    for row in report[:args.top]:
+        print(f"{row['total_ms']:10.1f} {row['count']:7d} {row['p95_ms']:8.2f}  {row['action']} / {row['caller']}")
+        print(f"{'':28}{row['sql'][:100]}")
+    print(f"Report written to {profiler.dump(args.json)}")
+
+    off, on = profiler_overhead(window.db_manager)
+    print(f"fetch_one: {off * 1e6:.1f} us profiler off, {on * 1e6:.1f} us on")
+    window.close()
+
+
+if __name__ == '__main__':
+    main_profile()
@@ -0,0 +1,151 @@
+import queue
+import threading
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from function.DB_manager import DB_Manager
+from function.Query_profiler import action
+
+
+class Autosave_Queue(QObject):
+    """
+    Write-behind autosave shared by the editor tabs.
+
+    Editors stage the fields a user changed (stage(manager, "update_sc_vo", vo_ref,
+    {column: value})) instead of writing them. Changes to the same record coalesce
+    until the queue flushes: INTERVAL_MS after the first unsaved change, when the main
+    window switches tab or closes, or when an editor is about to re-read from the
+    database. A flush hands every dirty record to one writer thread, which calls the
+    manager method once per record with only its changed columns, all in one
+    transaction on the writer's own connection, so typing never waits on the disk.
+    Each record is written under its own savepoint: a record that fails is rolled back
+    alone and the other records of the flush are still committed.
+
+    on_saved(record_id, changes) / on_error(record_id, message) run in the GUI thread
+    once the record's write is committed or rolled back.
+    """
+    INTERVAL_MS = 500
+    _instance = None
+
+    # Emitted from the writer thread with [(record_id, changes, on_saved, on_error)] and
+    # [(record_id, changes, on_saved, on_error, message)]
+    saved = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+    @classmethod
+    def instance(cls):
+        """The queue shared by every tab."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, interval_ms=None):
+        super().__init__()
+        self.interval_ms = self.INTERVAL_MS if interval_ms is None else interval_ms
+        # (manager type, db path, method, record id) -> [manager, {column: value}, on_saved, on_error]
+        self._pending = {}
+        self._batches = queue.Queue()
+        self._thread = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+        self.saved.connect(self._deliver_saved)
+        self.failed.connect(self._deliver_failed)
+
+    def stage(self, manager, method, record_id, changes, on_saved=None, on_error=None):
+        """Queue `changes` for manager.<method>(record_id, changes); later values of a column win."""
+        if not changes:
+            return
+        key = (type(manager), manager.db.db_path, method, record_id)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = [manager, {}, None, None]
+        entry[1].update(changes)
+        entry[2], entry[3] = on_saved or entry[2], on_error or entry[3]
+        # Not restarted by later changes: a user typing non-stop is still saved every interval
+        if not self.timer.isActive():
+            self.timer.start(self.interval_ms)
+
+    def is_dirty(self):
+        return bool(self._pending) or self._batches.unfinished_tasks > 0
+
+    def flush(self, wait=False):
+        """Send every staged change to the writer. wait=True blocks until it is committed
+        (before re-reading records from the database, or on close)."""
+        self.timer.stop()
+        if self._pending:
+            batch = [(key[1], key[2], key[3], *entry) for key, entry in self._pending.items()]
+            self._pending = {}
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._write_loop, name="autosave", daemon=True)
+                self._thread.start()
+            self._batches.put(batch)
+        if wait:
+            self._batches.join()
+
+    def shutdown(self):
+        """Write what is left and stop the writer thread (application close)."""
+        self.flush(wait=True)
+        if self._thread is not None and self._thread.is_alive():
+            self._batches.put(None)
+            self._thread.join()
+        self._thread = None
+
+    def _write_loop(self):
+        # The writer's connections and managers, by database file
+        dbs, managers = {}, {}
+        while True:
+            batch = self._batches.get()
+            try:
+                if batch is None:
+                    return
+                self._write(batch, dbs, managers)
+            finally:
+                self._batches.task_done()
+                if batch is None:
+                    for db in dbs.values():
+                        db.close()
+
+    def _write(self, batch, dbs, managers):
+        by_path = {}
+        for entry in batch:
+            by_path.setdefault(entry[0], []).append(entry)
+        for path, entries in by_path.items():
+            if path not in dbs:
+                dbs[path] = DB_Manager(path, profile=entries[0][3].db.profile)
+            db = dbs[path]
+            errors = {}  # entry index -> message
+            try:
+                with action("autosave"), db.transaction():
+                    for index, (_, method, record_id, manager, changes, _, _) in enumerate(entries):
+                        key = (type(manager), path)
+                        if key not in managers:
+                            managers[key] = type(manager)(db)
+                        try:
+                            with db.savepoint("autosave_record"):
+                                getattr(managers[key], method)(record_id, changes)
+                        except Exception as e:
+                            errors[index] = str(e)
+            except Exception as e:
+                # BEGIN or COMMIT failed: nothing of this flush was written
+                for index in range(len(entries)):
+                    errors.setdefault(index, str(e))
+            results = [(record_id, changes, on_saved, on_error) for _, _, record_id, _, changes, on_saved, on_error in entries]
+            saved = [result for index, result in enumerate(results) if index not in errors]
+            failed = [result + (errors[index],) for index, result in enumerate(results) if index in errors]
+            if saved:
+                self.saved.emit(saved)
+            if failed:
+                self.failed.emit(failed)
+
+    @staticmethod
+    def _deliver_saved(results):
+        for record_id, changes, on_saved, _ in results:
+            if on_saved:
+                on_saved(record_id, changes)
+
+    @staticmethod
+    def _deliver_failed(results):
+        for record_id, changes, _, on_error, message in results:
+            if on_error:
+                on_error(record_id, message)
+            else:
+                print(f"Autosave of {record_id} failed: {message} ({', '.join(changes)})")
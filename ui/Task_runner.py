@@ -0,0 +1,219 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QCoreApplication, pyqtSignal, Qt
+from PyQt5.QtWidgets import QProgressDialog
+from function.DB_manager import DB_Manager
+from function.Query_profiler import action
+
+
+class Task_Cancelled(Exception):
+    """Raised inside a task (from its progress callback) once the task is cancelled."""
+
+
+class Task_Signals(QObject):
+    # Emitted from the worker thread; receivers in the GUI thread get them queued
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+
+
+class Task(QRunnable):
+    """
+    One background call: fn(manager, *args, **kwargs) on the worker thread's copy of
+    `manager`, or the manager method named fn. With progress=True the call also gets
+    progress(done, total), which raises Task_Cancelled once the task is cancelled.
+    """
+    def __init__(self, manager, fn, args, kwargs, progress=False, label=None, runner=None):
+        super().__init__()
+        self.runner = runner
+        self.label = label  # the runner key, naming the task's statements in the query profiler
+        self.manager = manager
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.with_progress = progress
+        self.signals = Task_Signals()
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._db = None  # worker connection while the task runs
+
+    def cancel(self):
+        """Drop the result and stop the running query (sqlite3 interrupt is thread-safe)."""
+        with self._lock:
+            self.cancelled = True
+            if self._db is not None and self._db.conn:
+                self._db.conn.interrupt()
+
+    def report(self, done, total):
+        if self.cancelled:
+            raise Task_Cancelled()
+        self.signals.progress.emit(int(done or 0), int(total or 0))
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            with self.runner.worker_manager(self.manager) as manager:
+                with self._lock:
+                    self._db = manager.db
+                try:
+                    fn = getattr(manager, self.fn) if isinstance(self.fn, str) else (lambda *a, **k: self.fn(manager, *a, **k))
+                    kwargs = dict(self.kwargs, progress=self.report) if self.with_progress else self.kwargs
+                    with action(self.label):
+                        result = fn(*self.args, **kwargs)
+                finally:
+                    # Before the worker goes back to the pool: a late cancel() must not
+                    # interrupt the next task that borrows this connection
+                    with self._lock:
+                        self._db = None
+            if not self.cancelled:
+                self.signals.result.emit(result)
+        except Task_Cancelled:
+            pass
+        except sqlite3.OperationalError as e:
+            if not self.cancelled:
+                self.signals.error.emit(str(e))
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.error.emit(str(e))
+        finally:
+            self.signals.finished.emit()
+
+
+class Task_Runner(QObject):
+    """
+    Runs manager loads and exports on a thread pool and hands the results back to the
+    GUI thread through signals.
+
+    Tasks are submitted under a key (e.g. "payment.items"): submitting a new task for a
+    key cancels the previous one, so when the user clicks through records quickly only
+    the last load reaches the screen.
+
+    Workers borrow managers from the runner's pool: one read-only connection per
+    database file and concurrent task, reused by later tasks (with the manager's
+    caches) and closed by shutdown().
+    """
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """The runner shared by every tab."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, max_threads=4):
+        super().__init__()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._latest = {}   # key -> most recent Task
+        self._running = set()  # keep tasks (and their signal objects) alive until finished
+        # (manager type, db path) -> idle worker managers; a sqlite3 connection is used by
+        # one thread at a time, but pool threads cannot keep thread-local state between tasks
+        self._idle = {}
+        self._workers = []
+        self._pool_lock = threading.Lock()
+
+    def submit(self, key, manager, fn, *args, on_result=None, on_error=None, on_progress=None, **kwargs):
+        """
+        Run fn (a manager method name, or a callable taking the manager first) in the
+        background. on_result(result) / on_error(message) run in the GUI thread, and only
+        if this is still the latest task for `key`. Passing on_progress gives fn a
+        progress(done, total) keyword argument. Returns the Task.
+        """
+        self.cancel(key)
+        task = Task(manager, fn, args, kwargs, progress=on_progress is not None, label=key, runner=self)
+        task.setAutoDelete(False)
+        if on_result:
+            task.signals.result.connect(lambda result: self._deliver(key, task, on_result, result))
+        task.signals.error.connect(lambda message: self._deliver(key, task, on_error or self._print_error, message))
+        if on_progress:
+            task.signals.progress.connect(lambda done, total: self._deliver(key, task, on_progress, done, total))
+        task.signals.finished.connect(lambda: self._finished(key, task))
+        self._latest[key] = task
+        self._running.add(task)
+        self.pool.start(task)
+        return task
+
+    @contextmanager
+    def worker_manager(self, manager):
+        """A read-only copy of `manager` for the running task, returned to the pool afterwards."""
+        key = (type(manager), manager.db.db_path)
+        with self._pool_lock:
+            idle = self._idle.setdefault(key, [])
+            worker = idle.pop() if idle else None
+        if worker is None:
+            db = DB_Manager(manager.db.db_path, query_only=True, profile=manager.db.profile, check_same_thread=False)
+            worker = type(manager)(db)
+            with self._pool_lock:
+                self._workers.append(worker)
+        try:
+            yield worker
+        finally:
+            with self._pool_lock:
+                self._idle[key].append(worker)
+
+    def cancel(self, key):
+        task = self._latest.pop(key, None)
+        if task:
+            task.cancel()
+
+    def is_busy(self, key):
+        return key in self._latest
+
+    def _deliver(self, key, task, callback, *args):
+        if self._latest.get(key) is task and not task.cancelled:
+            callback(*args)
+
+    def _finished(self, key, task):
+        self._running.discard(task)
+        if self._latest.get(key) is task:
+            del self._latest[key]
+
+    @staticmethod
+    def _print_error(message):
+        print(f"Background task failed: {message}")
+
+    def wait(self, msecs=-1):
+        """Block until every task is done and its signals are delivered (tests, benchmarks, shutdown)."""
+        done = self.pool.waitForDone(msecs)
+        QCoreApplication.processEvents()
+        return done
+
+    def shutdown(self):
+        """Cancel every task, wait for the workers and close their connections."""
+        for key in list(self._latest):
+            self.cancel(key)
+        self.pool.waitForDone()
+        with self._pool_lock:
+            workers, self._workers, self._idle = self._workers, [], {}
+        for worker in workers:
+            worker.db.close()
+
+    def run_with_progress(self, parent, key, label, manager, fn, *args, on_result=None, on_error=None, **kwargs):
+        """
+        submit() behind a modal progress dialog with a Cancel button. The dialog is busy
+        (indeterminate) until fn reports a total. Returns the Task.
+        """
+        dialog = QProgressDialog(label, "Cancel", 0, 0, parent)
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(300)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+
+        def progress(done, total):
+            dialog.setMaximum(total if total > 0 else 0)
+            dialog.setValue(min(done, total) if total > 0 else 0)
+
+        def finish(callback, *result):
+            dialog.close()
+            if callback:
+                callback(*result)
+
+        task = self.submit(key, manager, fn, *args, on_progress=progress,
+                           on_result=lambda result: finish(on_result, result),
+                           on_error=lambda message: finish(on_error or self._print_error, message), **kwargs)
+        dialog.canceled.connect(lambda: (self.cancel(key), dialog.close()))
+        return task
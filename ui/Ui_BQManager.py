@@ -1,6 +1,141 @@
-from PyQt5.QtWidgets import QWidget, QTableWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidgetItem, QMessageBox, QFileDialog
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QMessageBox, QFileDialog, QProgressDialog
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from collections import OrderedDict
 import os
+from .Task_runner import Task_Runner
+from .Autosave_queue import Autosave_Queue
+
+
+class BQTableModel(QAbstractTableModel):
+    """
+    Lazy table model over "Main Contract BQ".
+    The view learns about rows page by page (canFetchMore/fetchMore); row data lives in
+    an LRU cache of at most MAX_PAGES pages and evicted pages are re-queried on demand,
+    so memory stays bounded however far the table is scrolled.
+    """
+    COLUMNS = [
+        ("BQ ID", "BQ ID"), ("Bill", "Bill"), ("Section", "Section"), ("Page", "Page"), ("Item", "Item"),
+        ("Description", "description"), ("Qty", "Qty"), ("Unit", "Unit"), ("Rate", "Rate"),
+        ("Discount", "Discount"), ("Amount", "Amount"), ("Trade", "Trade"), ("Remark", "Remark")
+    ]
+    AMOUNT_COLUMN = 10
+    PAGE_SIZE = 500
+    MAX_PAGES = 20
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self._query = (None, "", "BQ ID", True)
+        self._pages = OrderedDict()
+        self._count = 0
+        self._loaded = 0
+        self.total_amount = 0.0
+        # Called as edit_handler(index, value) -> bool when a cell is edited
+        self.edit_handler = None
+
+    def set_query(self, filter_field, text, sort_field, ascending):
+        """Reset the model to a new filter/sort and load the first page."""
+        # Cell edits still on the autosave queue must be in the database the query reads
+        Autosave_Queue.instance().flush(wait=True)
+        self.beginResetModel()
+        self._query = (filter_field, text, sort_field, ascending)
+        self._pages.clear()
+        self._loaded = 0
+        _, self._count, self.total_amount = self.manager.query_bq_items(*self._query, limit=0)
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def refresh_total(self):
+        filter_field, text = self._query[:2]
+        _, _, self.total_amount = self.manager.query_bq_items(filter_field, text, limit=0)
+        return self.total_amount
+
+    def _page(self, page_no):
+        page = self._pages.get(page_no)
+        if page is None:
+            Autosave_Queue.instance().flush(wait=True)
+            page, _, _ = self.manager.query_bq_items(*self._query, page_no * self.PAGE_SIZE, self.PAGE_SIZE)
+            self._pages[page_no] = page
+            if len(self._pages) > self.MAX_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_no)
+        return page
+
+    def row_data(self, row):
+        page = self._page(row // self.PAGE_SIZE)
+        offset = row % self.PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def bq_id(self, row):
+        item = self.row_data(row)
+        return item.get("BQ ID") if item else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._loaded < self._count
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(self.PAGE_SIZE, self._count - self._loaded)
+        if count <= 0:
+            return
+        self._page(self._loaded // self.PAGE_SIZE)
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        item = self.row_data(index.row())
+        if item is None:
+            return None
+        value = item.get(self.COLUMNS[index.column()][1])
+        if index.column() == self.AMOUNT_COLUMN:
+            try:
+                return "{:,.2f}".format(float(value or 0))
+            except Exception:
+                return "0.00"
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() not in (0, self.AMOUNT_COLUMN):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or self.edit_handler is None:
+            return False
+        return bool(self.edit_handler(index, value))
+
+    def update_row(self, row, changes):
+        """Apply changes to the cached row, recompute Amount and the total and repaint the row."""
+        item = self.row_data(row)
+        if item is None:
+            return
+        item.update(changes)
+        previous = item.get("Amount") or 0.0
+        try:
+            item["Amount"] = float(item.get("Qty") or 0) * float(item.get("Rate") or 0) * (1 - float(item.get("Discount") or 0))
+        except (TypeError, ValueError):
+            item["Amount"] = 0.0
+        self.total_amount += item["Amount"] - previous
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+
 
 class Ui_BQManager(QWidget):
     def __init__(self, manager):
@@ -28,15 +163,12 @@ class Ui_BQManager(QWidget):
         except Exception:
             pass
 
-        # Table setup
+        # Table setup: a lazy model instead of one QTableWidgetItem per cell
+        self.model = BQTableModel(self.manager, self)
+        self.model.edit_handler = self.on_table_item_changed
         try:
-            self.table.setColumnCount(13)
-            self.table.setHorizontalHeaderLabels([
-                "BQ ID", "Bill", "Section", "Page", "Item", "Description",
-                "Qty", "Unit", "Rate", "Discount", "Amount", "Trade", "Remark"
-            ])
+            self.table.setModel(self.model)
             self.table.horizontalHeader().sectionClicked.connect(self.on_header_sort)
-            self.table.itemChanged.connect(self.on_table_item_changed)
         except Exception:
             pass
 
@@ -69,94 +201,36 @@ class Ui_BQManager(QWidget):
             return "0.00"
 
     def refresh_table(self):
-        items = self.manager.get_all_bq_items()
-
-        # Disable table sorting, header signals and itemChanged while populating to avoid re-entrancy
-        self.table.setSortingEnabled(False)
-        self.table.horizontalHeader().blockSignals(True)
-        # Block all table signals (including itemChanged) while filling
-        self.table.blockSignals(True)
-
-        try:
-            # Apply filter if any
-            filter_field = self.combo_filter_field.currentText()
-            filter_text = self.edit_filter.text().strip().lower()
-            if filter_text:
-                def matches(it):
-                    mapping = {
-                        'BQ ID': lambda x: str(x.get('BQ ID', '')).lower(),
-                        'Bill': lambda x: str(x.get('Bill', '')).lower(),
-                        'Section': lambda x: str(x.get('Section', '')).lower(),
-                        'Page': lambda x: str(x.get('Page', '')).lower(),
-                        'Item': lambda x: str(x.get('Item', '')).lower(),
-                        'Description': lambda x: str(x.get('description', '')).lower(),
-                        'Trade': lambda x: str(x.get('Trade', '')).lower()
-                    }
-                    getter = mapping.get(filter_field, lambda x: '')
-                    return filter_text in getter(it)
-                items = [it for it in items if matches(it)]
-
-            # Apply sorting
-            sort_field = self.combo_sort_field.currentText()
-            key_map = {
-                'BQ ID': lambda x: x.get('BQ ID', ''),
-                'Bill': lambda x: x.get('Bill', ''),
-                'Section': lambda x: x.get('Section', ''),
-                'Page': lambda x: x.get('Page', ''),
-                'Item': lambda x: x.get('Item', ''),
-                'Qty': lambda x: float(x.get('Qty') or 0),
-                'Rate': lambda x: float(x.get('Rate') or 0),
-                'Amount': lambda x: float((x.get('Qty') or 0) * (x.get('Rate') or 0) * (1 - (x.get('Discount') or 0))),
-                'Trade': lambda x: x.get('Trade', '')
-            }
-            keyfunc = key_map.get(sort_field, lambda x: x.get('BQ ID', ''))
-            items = sorted(items, key=keyfunc, reverse=not self.sort_ascending)
-
-            # Populate table and compute filtered total amount
-            total_amount = 0.0
-            self.table.setRowCount(len(items))
-            for row, item in enumerate(items):
-                self.table.setItem(row, 0, QTableWidgetItem(item.get("BQ ID", "")))
-                self.table.setItem(row, 1, QTableWidgetItem(item.get("Bill", "")))
-                self.table.setItem(row, 2, QTableWidgetItem(item.get("Section", "")))
-                self.table.setItem(row, 3, QTableWidgetItem(item.get("Page", "")))
-                self.table.setItem(row, 4, QTableWidgetItem(item.get("Item", "")))
-                self.table.setItem(row, 5, QTableWidgetItem(item.get("description", "")))
-                self.table.setItem(row, 6, QTableWidgetItem(str(item.get("Qty", ""))))
-                self.table.setItem(row, 7, QTableWidgetItem(item.get("Unit", "")))
-                self.table.setItem(row, 8, QTableWidgetItem(str(item.get("Rate", ""))))
-                self.table.setItem(row, 9, QTableWidgetItem(str(item.get("Discount", ""))))
-
-                # Calculate amount = Qty * Rate * (1 - Discount)
-                try:
-                    qty = float(item.get('Qty') or 0)
-                    rate = float(item.get('Rate') or 0)
-                    discount = float(item.get('Discount') or 0)
-                    amount = qty * rate * (1 - discount)
-                except Exception:
-                    amount = 0.0
-                total_amount += amount
-                self.table.setItem(row, 10, QTableWidgetItem(self.format_number(amount)))
-
-                self.table.setItem(row, 11, QTableWidgetItem(item.get("Trade", "")))
-                self.table.setItem(row, 12, QTableWidgetItem(item.get("Remark", "")))
-
-            # Update filtered total amount label
-            self.label_total_amount.setText(f"Total Amount: {self.format_number(total_amount)}")
-        finally:
-            # Re-enable header signals, sorting and table signals
-            self.table.horizontalHeader().blockSignals(False)
-            self.table.setSortingEnabled(True)
-            self.table.blockSignals(False)
+        """Reload the BQ table: filtering, sorting and the total are done in SQL, one page at a time."""
+        self.model.set_query(
+            self.combo_filter_field.currentText(), self.edit_filter.text(),
+            self.combo_sort_field.currentText(), self.sort_ascending
+        )
+        # Update filtered total amount label
+        self.label_total_amount.setText(f"Total Amount: {self.format_number(self.model.total_amount)}")
 
     def import_excel(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Excel File", "", "Excel Files (*.xlsx *.xls)")
         if file_path:
+            dialog = QProgressDialog("Importing BQ items...", None, 0, 0, self)
+            dialog.setWindowModality(Qt.WindowModal)
+            dialog.setMinimumDuration(500)
+
+            def on_progress(done, total):
+                if total:
+                    dialog.setMaximum(max(total, done))
+                dialog.setValue(done)
+                dialog.setLabelText(f"Importing BQ items... {done:,} rows")
+                QApplication.processEvents()
+
             try:
-                count = self.manager.import_from_excel(file_path)
+                count = self.manager.import_from_excel(file_path, progress=on_progress)
+                dialog.close()
                 self.refresh_table()
                 QMessageBox.information(self, "Success", f"Imported {count} records successfully.")
             except Exception as e:
+                dialog.close()
+                self.refresh_table()
                 QMessageBox.critical(self, "Error", f"Failed to import: {str(e)}")
 
     def toggle_sort_order(self):
@@ -184,22 +258,23 @@ class Ui_BQManager(QWidget):
             self.sort_ascending = True
             self.btn_sort_toggle.setText("Asc")
 
-        # Refresh table (this will re-enable table sorting after populate)
+        # Refresh table (the query sorts in SQL)
         self.refresh_table()
 
     def export_excel(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "Save Excel File", "", "Excel Files (*.xlsx)")
         if file_path:
-            try:
-                count = self.manager.export_to_excel(file_path)
-                QMessageBox.information(self, "Success", f"Exported {count} records successfully.")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to export: {str(e)}")
-
-    def on_table_item_changed(self, item):
-        """Auto-save edited BQ fields and recalculate amount for the row and filtered total."""
-        col = item.column()
-        row = item.row()
+            # Runs on a worker connection behind a progress dialog; Cancel stops before the file is saved
+            Task_Runner.instance().run_with_progress(
+                self, "bq.export", "Exporting BQ items...", self.manager, "export_to_excel", file_path,
+                on_result=lambda count: QMessageBox.information(self, "Success", f"Exported {count} records successfully."),
+                on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to export: {e}"))
+
+    def on_table_item_changed(self, index, value):
+        """Stage an edited BQ field on the autosave queue and recalculate amount for the row
+        and filtered total. Called by the model's setData; returning False leaves the cell unchanged."""
+        col = index.column()
+        row = index.row()
 
         # Map editable columns to DB field names
         editable_cols = {
@@ -208,16 +283,15 @@ class Ui_BQManager(QWidget):
         }
 
         if col not in editable_cols:
-            return
+            return False
 
         # Get BQ ID for the row
-        bq_id_item = self.table.item(row, 0)
-        if not bq_id_item:
-            return
-        bq_id = bq_id_item.text()
+        bq_id = self.model.bq_id(row)
+        if not bq_id:
+            return False
 
         field = editable_cols[col]
-        text = item.text().strip()
+        text = str(value).strip()
 
         # Convert numeric fields
         if field in ('Qty', 'Rate', 'Discount'):
@@ -225,55 +299,22 @@ class Ui_BQManager(QWidget):
                 val = float(text) if text != '' else 0.0
             except Exception:
                 QMessageBox.warning(self, "Invalid value", f"Cannot convert '{text}' to number for {field}. Reverting.")
-                db_item = self.manager.get_bq_item(bq_id)
-                prev = db_item.get(field, 0)
-                self.table.blockSignals(True)
-                self.table.setItem(row, col, QTableWidgetItem(str(prev)))
-                self.table.blockSignals(False)
-                return
+                return False
         else:
             val = text
 
-        # Save to DB
-        try:
-            self.manager.update_bq_item(bq_id, {field: val})
-        except Exception as e:
-            QMessageBox.critical(self, "Save Error", f"Failed to save change: {e}")
-            return
+        # Written behind by the autosave queue; edits to the same item coalesce into one UPDATE
+        Autosave_Queue.instance().stage(self.manager, "update_bq_item", bq_id, {field: val}, on_error=self.on_autosave_failed)
 
-        # Recalculate amount for this row
-        try:
-            qty = float(self.table.item(row, 6).text() or 0)
-        except Exception:
-            qty = 0.0
-        try:
-            rate = float(self.table.item(row, 8).text() or 0)
-        except Exception:
-            rate = 0.0
-        try:
-            discount = float(self.table.item(row, 9).text() or 0)
-        except Exception:
-            discount = 0.0
-
-        amount = qty * rate * (1 - discount)
+        # Update the row in place (recalculates Amount) and the filtered total
+        self.model.update_row(row, {field: val})
+        self.label_total_amount.setText(f"Total Amount: {self.format_number(self.model.total_amount)}")
+        return True
 
-        # Update amount cell without triggering itemChanged
-        self.table.blockSignals(True)
-        self.table.setItem(row, 10, QTableWidgetItem(self.format_number(amount)))
-        self.table.blockSignals(False)
-
-        # Recompute filtered total from visible rows
-        total = 0.0
-        for r in range(self.table.rowCount()):
-            amt_item = self.table.item(r, 10)
-            if not amt_item:
-                continue
-            try:
-                amt_text = amt_item.text().replace(',', '')
-                total += float(amt_text or 0)
-            except Exception:
-                pass
-        self.label_total_amount.setText(f"Total Amount: {self.format_number(total)}")
+    def on_autosave_failed(self, bq_id, message):
+        QMessageBox.critical(self, "Save Error", f"Failed to save changes to {bq_id}: {message}")
+        # Reload so the table shows what the database holds
+        self.refresh_table()
 
     def add_item(self):
         # Simple add - in real app, use dialog
@@ -282,8 +323,8 @@ class Ui_BQManager(QWidget):
         self.refresh_table()
 
     def delete_item(self):
-        current_row = self.table.currentRow()
+        current_row = self.table.currentIndex().row()
         if current_row >= 0:
-            bq_id = self.table.item(current_row, 0).text()
+            bq_id = self.model.bq_id(current_row)
             self.manager.delete_bq_item(bq_id)
-            self.refresh_table()
\ No newline at end of file
+            self.refresh_table()
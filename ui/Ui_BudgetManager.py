@@ -1,8 +1,10 @@
 from PyQt5.QtWidgets import QWidget, QListWidgetItem, QPushButton, QFileDialog, QMessageBox, QTableWidget, QTableWidgetItem, QLabel, QVBoxLayout
 from PyQt5.QtCore import QDate, Qt
+from PyQt5.QtGui import QColor
 from PyQt5 import uic
 import os
 import datetime
+from .Task_runner import Task_Runner
 
 class Ui_BudgetManager(QWidget):
     def __init__(self, manager):
@@ -183,29 +185,47 @@ class Ui_BudgetManager(QWidget):
         fn, _ = QFileDialog.getSaveFileName(self, "Save Analysis as Excel", "budget_analysis.xlsx", "Excel Files (*.xlsx)")
         if not fn:
             return
-        try:
-            self.manager.export_analysis_to_excel(fn)
-            QMessageBox.information(self, "Export Complete", f"Analysis exported to {fn}")
-            #start the file
-            os.startfile(fn)
-        except Exception as e:
-            QMessageBox.critical(self, "Export Failed", f"Failed to export analysis: {e}")
+        Task_Runner.instance().run_with_progress(
+            self, "budget.export", "Exporting budget analysis...", self.manager, "export_analysis_to_excel", fn,
+            on_result=lambda fn: self.export_done("Analysis", fn), on_error=lambda e: QMessageBox.critical(self, "Export Failed", f"Failed to export analysis: {e}"))
 
     def export_cashflow(self):
         fn, _ = QFileDialog.getSaveFileName(self, "Save Cash Flow as Excel", "cash_flow.xlsx", "Excel Files (*.xlsx)")
         if not fn:
             return
+        Task_Runner.instance().run_with_progress(
+            self, "budget.export", "Exporting cash flow...", self.manager, "export_cashflow_to_excel", fn,
+            on_result=lambda fn: self.export_done("Cash Flow", fn), on_error=lambda e: QMessageBox.critical(self, "Export Failed", f"Failed to export cash flow: {e}"))
+
+    def export_done(self, what, fn):
+        QMessageBox.information(self, "Export Complete", f"{what} exported to {fn}")
         try:
-            self.manager.export_cashflow_to_excel(fn)
-            QMessageBox.information(self, "Export Complete", f"Cash Flow exported to {fn}")
+            #start the file
             os.startfile(fn)
         except Exception as e:
-            QMessageBox.critical(self, "Export Failed", f"Failed to export cash flow: {e}")
+            QMessageBox.critical(self, "Export Failed", f"Failed to open {fn}: {e}")
 
     def refresh_cashflow(self):
+        """Load the cash flow tables on a worker thread; show_cashflow fills the tab when they arrive."""
+        Task_Runner.instance().submit("budget.cashflow", self.manager, self.load_cashflow, self.lineEdit_trade.text(),
+                                      on_result=self.show_cashflow)
+
+    @staticmethod
+    def load_cashflow(manager, trade):
+        """Everything the Cash Flow tab shows. Runs on a worker thread, so it only queries."""
+        client_rows, total_paid = manager.get_cashflow_client()
+        return {
+            "client": (client_rows, total_paid),
+            "subcontracts": manager.get_cashflow_subcontracts(),
+            "analysis": manager.get_budget_analysis(trade) if trade else None
+        }
+
+    def show_cashflow(self, data):
+        total_paid = 0
+        analysis = data["analysis"]
         # Refresh client cash flow table
         try:
-            rows, total_paid = self.manager.get_cashflow_client()
+            rows, total_paid = data["client"]
             self.table_client_cf.setRowCount(len(rows))
             def fmt(v):
                 if v is None:
@@ -238,12 +258,9 @@ class Ui_BudgetManager(QWidget):
             # Compute percentage vs current trade income (defer expense percentage until subcontract totals available)
             pct_text = '0.00%'
             try:
-                trade = self.lineEdit_trade.text()
-                if trade:
-                    analysis = self.manager.get_budget_analysis(trade)
-                    income = analysis.get('total_income', 0) if analysis else 0
-                    pct = (total_paid / income * 100) if income else 0
-                    pct_text = f"{pct:,.2f}%"
+                income = analysis.get('total_income', 0) if analysis else 0
+                pct = (total_paid / income * 100) if income else 0
+                pct_text = f"{pct:,.2f}%"
             except Exception:
                 pass
             # Set a placeholder now; we'll update with subcontract percentage after SC totals are computed
@@ -253,9 +270,9 @@ class Ui_BudgetManager(QWidget):
 
         # Refresh subcontract cash flow pivot
         try:
-            months, sc_list, rows, total_paid_sc = self.manager.get_cashflow_subcontracts()
-            # build headers: Month | Total | SCXX (Subcontract Name) with two lines
-            headers = ['Month', 'Total'] + [f"{no}\n({name})" if name else no for no, name in sc_list]
+            months, sc_list, rows, total_paid_sc = data["subcontracts"]
+            # build headers: Month | Total | Net Cash | SCXX (Subcontract Name) with two lines
+            headers = ['Month', 'Total', 'Net Cash'] + [f"{no}\n({name})" if name else no for no, name in sc_list]
             self.table_sc_cf.setColumnCount(len(headers))
             self.table_sc_cf.setHorizontalHeaderLabels(headers)
             # Allow header word wrap for multi-line headers
@@ -263,6 +280,7 @@ class Ui_BudgetManager(QWidget):
                 self.table_sc_cf.horizontalHeader().setDefaultAlignment(Qt.AlignCenter)
             except Exception:
                 pass
+            self.table_sc_cf.setUpdatesEnabled(False)
             self.table_sc_cf.setRowCount(len(rows))
             for r_idx, r in enumerate(rows):
                 self.table_sc_cf.setItem(r_idx, 0, QTableWidgetItem(str(r.get('Month'))))
@@ -270,12 +288,20 @@ class Ui_BudgetManager(QWidget):
                 it_total = QTableWidgetItem(fmt(r.get('Total', 0.0)))
                 it_total.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
                 self.table_sc_cf.setItem(r_idx, 1, it_total)
-                for c_idx, (sc_no, sc_name) in enumerate(sc_list, start=2):
+                # Net cash position: accumulated client paid - accumulated subcontract paid
+                net = r.get('Net Cash', 0.0)
+                it_net = QTableWidgetItem(fmt(net))
+                it_net.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if net < 0:
+                    it_net.setForeground(QColor('red'))
+                self.table_sc_cf.setItem(r_idx, 2, it_net)
+                for c_idx, (sc_no, sc_name) in enumerate(sc_list, start=3):
                     val = r.get(sc_no, 0.0)
                     txt = fmt(val)
                     it_sc = QTableWidgetItem(txt)
                     it_sc.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
                     self.table_sc_cf.setItem(r_idx, c_idx, it_sc)
+            self.table_sc_cf.setUpdatesEnabled(True)
             # Update subtotal label (show as parenthesis - deduction) and bold; color red if negative
             def fmt_html(v, bold=False, force_paren=False):
                 if v is None:
@@ -293,11 +319,8 @@ class Ui_BudgetManager(QWidget):
             try:
                 # Compute projected subcontract expense from analysis (Works + VO agreed) and subtract Contra Charge
                 proj_exp = 0
-                trade = self.lineEdit_trade.text()
-                if trade:
-                    analysis = self.manager.get_budget_analysis(trade)
-                    if analysis:
-                        proj_exp = (analysis.get('sc_works', 0) + analysis.get('sc_vo_agreed', 0) - analysis.get('contra_charge', 0))
+                if analysis:
+                    proj_exp = (analysis.get('sc_works', 0) + analysis.get('sc_vo_agreed', 0) - analysis.get('contra_charge', 0))
                 negated_sub = -total_paid_sc
                 pct_exp_text = '0.00%'
                 # Only compute percentage if the projected expense is a positive number
@@ -313,7 +336,7 @@ class Ui_BudgetManager(QWidget):
 
             # Update total cash flow (client total - subcontract total) and update client percentage vs subcontract payments
             try:
-                _, total_paid_client = self.manager.get_cashflow_client()
+                total_paid_client = total_paid
                 total_cash_flow = total_paid_client - total_paid_sc
                 # format and color if negative
                 if total_cash_flow < 0:
@@ -334,12 +357,9 @@ class Ui_BudgetManager(QWidget):
                 # Compute income pct again safely
                 pct_text = '0.00%'
                 try:
-                    trade = self.lineEdit_trade.text()
-                    if trade:
-                        analysis = self.manager.get_budget_analysis(trade)
-                        income = analysis.get('total_income', 0) if analysis else 0
-                        pct = (total_paid_client / income * 100) if income else 0
-                        pct_text = f"{pct:,.2f}%"
+                    income = analysis.get('total_income', 0) if analysis else 0
+                    pct = (total_paid_client / income * 100) if income else 0
+                    pct_text = f"{pct:,.2f}%"
                 except Exception:
                     pass
 
@@ -0,0 +1,121 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QCheckBox, QLabel, QDoubleSpinBox, QPushButton,
+                             QTableWidget, QTableWidgetItem, QTabWidget, QFileDialog, QMessageBox, QHeaderView)
+from PyQt5.QtCore import Qt
+
+
+class Ui_DiagnosticsDialog(QDialog):
+    """
+    Tool > Diagnostics: switch the query profiler on and off and see where database
+    time goes, per statement (grouped by SQL, manager method and UI action) and in
+    the slow query log with each slow statement's query plan.
+    """
+    STAT_COLUMNS = [("Total ms", "total_ms"), ("Count", "count"), ("Mean ms", "mean_ms"), ("p50 ms", "p50_ms"),
+                    ("p95 ms", "p95_ms"), ("Max ms", "max_ms"), ("Rows", "rows"), ("Caller", "caller"),
+                    ("Action", "action"), ("SQL", "sql")]
+    SLOW_COLUMNS = [("Time", "time"), ("ms", "ms"), ("Rows", "rows"), ("Caller", "caller"), ("Action", "action"),
+                    ("SQL", "sql"), ("Plan", "plan")]
+    MAX_ROWS = 500
+
+    def __init__(self, profiler, parent=None):
+        super().__init__(parent)
+        self.profiler = profiler
+        self.setWindowTitle("Diagnostics")
+        self.resize(1100, 600)
+        layout = QVBoxLayout(self)
+
+        options = QHBoxLayout()
+        self.check_enabled = QCheckBox("Record query timings")
+        self.check_enabled.setChecked(profiler.enabled)
+        self.check_enabled.toggled.connect(self.set_enabled)
+        options.addWidget(self.check_enabled)
+        options.addWidget(QLabel("Slow query threshold (ms):"))
+        self.spin_slow = QDoubleSpinBox()
+        self.spin_slow.setRange(0, 60000)
+        self.spin_slow.setDecimals(1)
+        self.spin_slow.setValue(profiler.slow_ms)
+        self.spin_slow.valueChanged.connect(lambda value: setattr(self.profiler, "slow_ms", value))
+        options.addWidget(self.spin_slow)
+        options.addStretch()
+        self.label_summary = QLabel()
+        options.addWidget(self.label_summary)
+        layout.addLayout(options)
+
+        if profiler.slow_log_path:
+            layout.addWidget(QLabel(f"Slow queries are also written to {profiler.slow_log_path}"))
+
+        self.tabs = QTabWidget()
+        self.table_stats = self._table(self.STAT_COLUMNS)
+        self.table_slow = self._table(self.SLOW_COLUMNS)
+        self.tabs.addTab(self.table_stats, "Statements")
+        self.tabs.addTab(self.table_slow, "Slow queries")
+        layout.addWidget(self.tabs)
+
+        buttons = QHBoxLayout()
+        for text, slot in (("Refresh", self.refresh), ("Reset", self.reset), ("Save JSON...", self.save_json)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        buttons.addStretch()
+        close = QPushButton("Close")
+        close.clicked.connect(self.accept)
+        buttons.addWidget(close)
+        layout.addLayout(buttons)
+
+        self.refresh()
+
+    @staticmethod
+    def _table(columns):
+        table = QTableWidget(0, len(columns))
+        table.setHorizontalHeaderLabels([title for title, _ in columns])
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setSelectionBehavior(QTableWidget.SelectRows)
+        table.setWordWrap(False)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    def _fill(self, table, columns, rows):
+        table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, (_, key) in enumerate(columns):
+                value = row.get(key)
+                if isinstance(value, list):
+                    text = " | ".join(value)
+                elif isinstance(value, float):
+                    text = f"{value:,.3f}"
+                else:
+                    text = "" if value is None else str(value)
+                item = QTableWidgetItem(text)
+                item.setToolTip(text)
+                if isinstance(value, (int, float)):
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(r, c, item)
+
+    def refresh(self):
+        stats = self.profiler.report()
+        slow = list(reversed(self.profiler.slow))  # newest first
+        self._fill(self.table_stats, self.STAT_COLUMNS, stats[:self.MAX_ROWS])
+        self._fill(self.table_slow, self.SLOW_COLUMNS, slow[:self.MAX_ROWS])
+        total = sum(row["total_ms"] for row in stats)
+        count = sum(row["count"] for row in stats)
+        self.label_summary.setText(f"{count:,} statements, {total:,.1f} ms since {self.profiler.started:%H:%M:%S}")
+        self.tabs.setTabText(1, f"Slow queries ({len(slow)})")
+
+    def set_enabled(self, enabled):
+        if enabled:
+            self.profiler.enable()
+        else:
+            self.profiler.disable()
+
+    def reset(self):
+        self.profiler.reset()
+        self.refresh()
+
+    def save_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Query Profile", "query_profile.json", "JSON Files (*.json)")
+        if not path:
+            return
+        try:
+            self.profiler.dump(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Diagnostics", f"Failed to save {path}: {e}")
@@ -1,17 +1,53 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QSplitter, QListWidget, 
                              QListWidgetItem, QFormLayout, QLabel, QLineEdit, QDateEdit, 
                              QDoubleSpinBox, QTextEdit, QTableWidget, QTableWidgetItem, 
-                             QPushButton, QHeaderView, QMessageBox, QMenu, QAction, QComboBox)
-from PyQt5.QtCore import Qt, QDate
+                             QPushButton, QHeaderView, QMessageBox, QMenu, QAction, QComboBox,
+                             QStyledItemDelegate)
+from PyQt5.QtCore import Qt, QDate, QStringListModel
 from PyQt5.QtGui import QDoubleValidator, QColor
 from PyQt5 import uic
 import os
 import datetime
+from .Task_runner import Task_Runner
+
+class RefComboDelegate(QStyledItemDelegate):
+    """
+    Dropdown editor for a reference column. The cell holds the label text and a
+    combobox on the shared reference model is only created while the cell is edited,
+    so loading an IP does not build a widget per row.
+    """
+    def __init__(self, view, name):
+        super().__init__(view)
+        self.view = view
+        self.name = name
+
+    def createEditor(self, parent, option, index):
+        model, _ = self.view.ref_models[self.name]
+        combo = QComboBox(parent)
+        combo.setModel(model)
+        # Save as soon as a reference is picked, like the old per-row comboboxes
+        combo.activated.connect(lambda _: self.commit_and_close(combo))
+        return combo
+
+    def commit_and_close(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
+
+    def setEditorData(self, editor, index):
+        _, rows = self.view.ref_models[self.name]
+        editor.setCurrentIndex(rows.get(index.data() or "", 0))
+
+    def setModelData(self, editor, model, index):
+        if editor.currentText() != (index.data() or ""):
+            model.setData(index, editor.currentText())
+
 
 class Ui_PaymentManager(QWidget):
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
+        # Shared dropdown models for the item table, see ref_model
+        self.ref_models = {}
         self.init_ui()
         self.refresh_ips()
 
@@ -33,6 +69,8 @@ class Ui_PaymentManager(QWidget):
             self.item_table.setHorizontalHeaderLabels(headers)
             self.item_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
             self.item_table.hideColumn(12)  # hide ID column
+            for col, name in ((2, "bq"), (3, "vo"), (4, "doc")):
+                self.item_table.setItemDelegateForColumn(col, RefComboDelegate(self, name))
         except Exception:
             pass
 
@@ -151,84 +189,81 @@ class Ui_PaymentManager(QWidget):
         else:
             date_edit.setDate(QDate.currentDate())
 
+    def ref_model(self, name, refs):
+        """
+        One QStringListModel per reference list, shared by every dropdown editor in the
+        item table. Returns (model, {label: row}).
+        """
+        refs = [""] + refs
+        model, index = self.ref_models.get(name, (None, None))
+        if model is None:
+            model = QStringListModel(self)
+        if model.stringList() != refs:
+            model.setStringList(refs)
+            index = {ref: i for i, ref in enumerate(refs)}
+        self.ref_models[name] = (model, index)
+        return model, index
+
+    def ref_item(self, display, editable):
+        item = QTableWidgetItem(display)
+        if not editable:
+            item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+        return item
+
     def refresh_item_table(self, ip_no):
+        """
+        Load the IP's items on a worker thread; show_item_table fills the table when they
+        arrive. Clicking another IP first drops the pending load.
+        """
+        # Empty the table straight away so no edit lands on the previous IP's rows
         self.loading_item = True
         self.item_table.setRowCount(0)
-        items = self.manager.get_ip_items(ip_no)
-        
-        # Check if this is the newest IP
-        all_apps = self.manager.get_all_payment_applications()
-        if all_apps:
-            newest_ip = max(app['IP'] for app in all_apps)
-            is_newest_ip = (ip_no == newest_ip)
-        else:
-            is_newest_ip = True
-        
-        # Get existing refs for dropdowns
-        bq_refs = [""] + self.manager.get_existing_bq_refs()
-        vo_refs = [""] + self.manager.get_existing_vo_refs()
-        doc_refs = [""] + self.manager.get_existing_doc_refs()
-        
+        self.loading_item = False
+        Task_Runner.instance().submit("payment.items", self.manager, self.load_item_table, ip_no,
+                                      on_result=lambda data: self.show_item_table(ip_no, data))
+
+    @staticmethod
+    def load_item_table(manager, ip_no):
+        """Everything the item table shows. Runs on a worker thread, so it only queries."""
+        all_apps = manager.get_all_payment_applications()
+        return {
+            # Items with their BQ/VO amounts and dropdown labels in one query
+            "items": manager.get_ip_item_grid(ip_no),
+            # Only the newest IP is editable
+            "is_newest": not all_apps or ip_no == max(app['IP'] for app in all_apps),
+            # Existing refs for dropdowns (cached by the manager until the next write)
+            "refs": {"bq": manager.get_existing_bq_refs(), "vo": manager.get_existing_vo_refs(),
+                     "doc": manager.get_existing_doc_refs()}
+        }
+
+    def show_item_table(self, ip_no, data):
+        items = data["items"]
+        is_newest_ip = data["is_newest"]
+        for name, refs in data["refs"].items():
+            self.ref_model(name, refs)
+
+        self.loading_item = True
+        self.item_table.setUpdatesEnabled(False)
         self.item_table.setRowCount(len(items))
         for row, item in enumerate(items):
             self.item_table.setItem(row, 0, QTableWidgetItem(str(item['Item'])))
             self.item_table.setItem(row, 1, QTableWidgetItem(item['Type'] or ""))
-            self.item_table.setItem(row, 5, QTableWidgetItem(item['Description'] or ""))
-            
-            # Applied Amount - make read-only for all IPs except newest
-            applied_item = QTableWidgetItem(self.format_number(item['Applied Amount'] or 0))
-            if not is_newest_ip:
-                applied_item.setFlags(applied_item.flags() & ~Qt.ItemIsEditable)
-                applied_item.setBackground(QColor(240, 240, 240))  # Light grey background
-            # BQ Ref combobox - disable for all IPs except newest
-            bq_combo = QComboBox()
-            bq_combo.addItems(bq_refs)
-            current_bq = item['BQ Ref'] or ""
-            bq_display = next((ref for ref in bq_refs if ref.startswith(current_bq + " - ") or ref == current_bq), current_bq)
-            bq_combo.setCurrentText(bq_display)
-            bq_combo.setEnabled(is_newest_ip)
-            if is_newest_ip:
-                bq_combo.currentTextChanged.connect(lambda text, r=row: self.on_ref_changed(r, 2, text))
-            self.item_table.setCellWidget(row, 2, bq_combo)
-
-            # VO Ref combobox - disable for all IPs except newest
-            vo_combo = QComboBox()
-            vo_combo.addItems(vo_refs)
-            current_vo = item['VO Ref'] or ""
-            vo_display = next((ref for ref in vo_refs if ref.startswith(current_vo + " - ") or ref == current_vo), current_vo)
-            vo_combo.setCurrentText(vo_display)
-            vo_combo.setEnabled(is_newest_ip)
-            if is_newest_ip:
-                vo_combo.currentTextChanged.connect(lambda text, r=row: self.on_ref_changed(r, 3, text))
-            self.item_table.setCellWidget(row, 3, vo_combo)
-
-            # DOC Ref combobox
-            doc_combo = QComboBox()
-            doc_combo.addItems(doc_refs)
-            current_doc = item['DOC Ref'] or ""
-            doc_display = next((ref for ref in doc_refs if ref.startswith(current_doc + " - ") or ref == current_doc), current_doc)
-            doc_combo.setCurrentText(doc_display)
-            doc_combo.setEnabled(is_newest_ip)
-            if is_newest_ip:
-                doc_combo.currentTextChanged.connect(lambda text, r=row: self.on_ref_changed(r, 4, text))
-            self.item_table.setCellWidget(row, 4, doc_combo)
+
+            # BQ / VO / DOC Ref dropdowns (RefComboDelegate) - read-only for all IPs except newest
+            self.item_table.setItem(row, 2, self.ref_item(item['BQ Display'], is_newest_ip))
+            self.item_table.setItem(row, 3, self.ref_item(item['VO Display'], is_newest_ip))
+            self.item_table.setItem(row, 4, self.ref_item(item['DOC Display'], is_newest_ip))
 
             # Description
             self.item_table.setItem(row, 5, QTableWidgetItem(item['Description'] or ""))
 
             # BQ Amount (read-only; derived from BQ Ref)
-            bq_amt = 0.0
-            if current_bq:
-                bq_amt = self.manager.get_bq_amount(current_bq)
-            bq_item = QTableWidgetItem(self.format_number(bq_amt))
+            bq_item = QTableWidgetItem(self.format_number(item['BQ Amount']))
             bq_item.setFlags(bq_item.flags() & ~Qt.ItemIsEditable)
             self.item_table.setItem(row, 6, bq_item)
 
             # VO Amount (read-only; derived from VO Ref application amount)
-            vo_amt = 0.0
-            if current_vo:
-                vo_amt = self.manager.get_vo_application_amount(current_vo)
-            vo_item = QTableWidgetItem(self.format_number(vo_amt))
+            vo_item = QTableWidgetItem(self.format_number(item['VO Amount']))
             vo_item.setFlags(vo_item.flags() & ~Qt.ItemIsEditable)
             self.item_table.setItem(row, 7, vo_item)
 
@@ -254,6 +289,7 @@ class Ui_PaymentManager(QWidget):
             self.item_table.setItem(row, 12, QTableWidgetItem(str(item['Item']))) # Hidden ID
             self.item_table.item(row, 0).setFlags(self.item_table.item(row, 0).flags() ^ Qt.ItemIsEditable)
             
+        self.item_table.setUpdatesEnabled(True)
         self.loading_item = False
 
     def add_ip(self):
@@ -376,8 +412,9 @@ class Ui_PaymentManager(QWidget):
         row = item.row()
         col = item.column()
 
-        # Skip combobox columns (2,3,4) as they are handled separately
+        # Reference columns (2,3,4) are edited through RefComboDelegate
         if col in [2, 3, 4]:
+            self.on_ref_changed(row, col, item.text())
             return
 
         # Check if this IP is NOT the newest - if so, Applied Amount should be locked
@@ -415,9 +452,20 @@ class Ui_PaymentManager(QWidget):
         data = {field: value}
         self.manager.update_ip_item(self.current_ip, item_no, data)
 
-        # If Applied changed, recalc totals
-        if field == "Applied Amount":
-            self.calculate_totals()
+        # Header totals are kept current by the item triggers; just show them
+        if field in ["Applied Amount", "Certified Amount", "Paid Amount"]:
+            self.refresh_totals()
+
+    def refresh_totals(self):
+        """Show the current IP's header amounts without reloading the item table."""
+        app = self.manager.get_payment_application(self.current_ip)
+        if not app:
+            return
+        self.spin_accumulated.setText(self.format_number(app['Accumulated Applied Amount'] or 0))
+        self.spin_previous.setText(self.format_number(app['Previous Applied Amount'] or 0))
+        self.spin_this.setText(self.format_number(app['This Applied Amount'] or 0))
+        self.spin_certified.setText(self.format_number(app['Certified Amount'] or 0))
+        self.spin_paid.setText(self.format_number(app['Paid Amount'] or 0))
 
     def calculate_totals(self):
         if not self.current_ip:
@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import QWidget, QListWidget, QListWidgetItem, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QLineEdit, QTextEdit, QDateEdit, QComboBox, QDoubleSpinBox, QCheckBox, QPushButton, QTableWidget, QTableWidgetItem, QMessageBox
-from PyQt5.QtCore import QDate, Qt, QTimer
+from PyQt5.QtCore import QDate, Qt
 import os
+from .Autosave_queue import Autosave_Queue
 
 class Ui_SC_VOManager(QWidget):
     def __init__(self, manager):
@@ -91,8 +92,9 @@ class Ui_SC_VOManager(QWidget):
             self.checkBox_agree.stateChanged.connect(lambda: self.auto_save_vo())
             self.checkBox_reject.stateChanged.connect(lambda: self.auto_save_vo())
             self.comboBox_subcontract.currentIndexChanged.connect(lambda: self.auto_save_vo())
-            # QTextEdit does not have editingFinished; debounce textChanged for autosave
-            self.textEdit_remark.textChanged.connect(lambda: QTimer.singleShot(500, self.auto_save_vo))
+            # QTextEdit does not have editingFinished; every keystroke is staged and the
+            # autosave queue coalesces them into one write per interval
+            self.textEdit_remark.textChanged.connect(lambda: self.auto_save_vo())
             # UX polish: amount prefixes, decimals and tooltips
             try:
                 self.doubleSpinBox_app.setPrefix('HK$ ')
@@ -261,6 +263,16 @@ class Ui_SC_VOManager(QWidget):
             pass
 
     def load_details_by_ref(self, vo_ref):
+        # Unsaved edits must reach the database before the record is read back
+        Autosave_Queue.instance().flush(wait=True)
+        # Filling the fields fires their change signals: keep them from autosaving
+        self.loading_vo_details = True
+        try:
+            self._load_vo(vo_ref)
+        finally:
+            self.loading_vo_details = False
+
+    def _load_vo(self, vo_ref):
         vo = self.manager.get_sc_vo(vo_ref)
         if vo:
             self.lineEdit_ref.setText(vo['VO ref'])
@@ -314,7 +326,7 @@ class Ui_SC_VOManager(QWidget):
                 }
 
     def auto_save_vo(self):
-        """Autosave the current SC VO detail fields into the database; only changed fields are written."""
+        """Stage the changed SC VO detail fields on the autosave queue; only changed fields are written."""
         if getattr(self, 'loading_vo_details', False):
             return
         try:
@@ -335,49 +347,37 @@ class Ui_SC_VOManager(QWidget):
                 'Remark': self.textEdit_remark.toPlainText()
             }
             base = getattr(self, '_vo_loaded_rec', None)
-            if base:
-                changed = {}
-                for k, v in data.items():
-                    if base.get(k) != v:
-                        changed[k] = v
+            if base and base.get('VO ref') == vo_ref:
+                changed = {k: v for k, v in data.items() if base.get(k) != v}
                 if not changed:
                     return
             else:
                 changed = data
+                base = self._vo_loaded_rec = {'VO ref': vo_ref}
 
-            # Perform update
-            try:
-                self.manager.update_sc_vo(vo_ref, changed)
-                # refresh cache
-                rec = self.manager.get_sc_vo(vo_ref)
-                try:
-                    self._vo_loaded_rec = rec.copy()
-                except Exception:
-                    self._vo_loaded_rec = rec
-                # Update table view for this VO so amounts stay in sync
-                try:
-                    for r in range(self.table_sc_vos.rowCount()):
+            # The cache now holds what the database will hold once the queue flushes
+            base.update(changed)
+            Autosave_Queue.instance().stage(self.manager, "update_sc_vo", vo_ref, changed, on_error=self.on_autosave_failed)
+
+            # Update table view for this VO so amounts stay in sync
+            if 'Application Amount' in changed or 'Agree Amount' in changed:
+                for r in range(self.table_sc_vos.rowCount()):
+                    if self.table_sc_vos.item(r, 0) and self.table_sc_vos.item(r, 0).text() == vo_ref:
                         try:
-                            if self.table_sc_vos.item(r, 0) and self.table_sc_vos.item(r, 0).text() == vo_ref:
-                                # Update application & agree amount formatting
-                                try:
-                                    self.table_sc_vos.item(r, 2).setText(self.format_number(rec.get('Application Amount', 0)))
-                                except Exception:
-                                    pass
-                                try:
-                                    self.table_sc_vos.item(r, 3).setText(self.format_number(rec.get('Agree Amount', 0)))
-                                except Exception:
-                                    pass
-                                break
+                            self.table_sc_vos.item(r, 2).setText(self.format_number(base.get('Application Amount', 0)))
+                            self.table_sc_vos.item(r, 3).setText(self.format_number(base.get('Agree Amount', 0)))
                         except Exception:
-                            continue
-                except Exception:
-                    pass
-            except Exception as e:
-                QMessageBox.warning(self, 'Save Failed', f'Failed to save changes: {e}')
+                            pass
+                        break
         except Exception:
             pass
 
+    def on_autosave_failed(self, vo_ref, message):
+        QMessageBox.warning(self, 'Save Failed', f'Failed to save changes to {vo_ref}: {message}')
+        # Show what the database really holds
+        if self.lineEdit_ref.text() == vo_ref:
+            self.load_details_by_ref(vo_ref)
+
     def clear_form(self):
         self.lineEdit_ref.clear()
         self.lineEdit_desc.clear()
@@ -3,6 +3,7 @@ from PyQt5.QtCore import QDate, Qt, QTimer
 from PyQt5 import uic
 import os
 import datetime
+from .Autosave_queue import Autosave_Queue
 
 class Ui_SubcontractManager(QWidget):
     def __init__(self, manager):
@@ -51,25 +52,20 @@ class Ui_SubcontractManager(QWidget):
         self.loading_persons = False
         self.loading_details = False
 
-        # Autosave debounce timer + UI save status
+        # Live-change signals stage every keystroke; the autosave queue coalesces them
         try:
-            self._autosave_timer = QTimer(self)
-            self._autosave_timer.setSingleShot(True)
-            self._autosave_timer.timeout.connect(self.auto_save_subcontract)
-
-            # Connect live-change signals to start autosave debounce
-            self.lineEdit_name.textChanged.connect(self._start_autosave)
-            self.lineEdit_company.textChanged.connect(self._start_autosave)
+            self.lineEdit_name.textChanged.connect(lambda: self.auto_save_subcontract())
+            self.lineEdit_company.textChanged.connect(lambda: self.auto_save_subcontract())
             # For spinboxes, use their lineEdit text changes
             try:
-                self.doubleSpinBox_sum.lineEdit().textChanged.connect(self._start_autosave)
-                self.doubleSpinBox_final.lineEdit().textChanged.connect(self._start_autosave)
+                self.doubleSpinBox_sum.lineEdit().textChanged.connect(lambda: self.auto_save_subcontract())
+                self.doubleSpinBox_final.lineEdit().textChanged.connect(lambda: self.auto_save_subcontract())
             except Exception:
                 pass
             # ComboBox changes already call auto_save directly on index change
         except Exception:
             # If UI widgets are missing, ignore
-            self._autosave_timer = None
+            pass
 
         # Initial Load
         self.refresh_list()
@@ -101,7 +97,7 @@ class Ui_SubcontractManager(QWidget):
             pass
 
         try:
-            persons = self.manager.get_subcontract_persons(sc_no)
+            persons = self.manager.get_dossier(sc_no)["persons"]
             for p in persons:
                 row = self.table_person.rowCount()
                 self.table_person.insertRow(row)
@@ -129,13 +125,9 @@ class Ui_SubcontractManager(QWidget):
         self.table_payment.setColumnCount(4)
         self.table_payment.setHorizontalHeaderLabels(["IP", "Draft Date", "This Applied", "Accumulated"])
 
-        # Prefer direct payment applications if payment manager is wired
-        apps = []
-        if hasattr(self, '_sc_payment_ui') and hasattr(self._sc_payment_ui, 'manager'):
-            try:
-                apps = self._sc_payment_ui.manager.get_all_payment_applications(sc_no)
-            except Exception:
-                apps = []
+        # Prefer the payment applications (IP headers); fall back to the links table
+        dossier = self.manager.get_dossier(sc_no)
+        apps = dossier["payments"]
 
         # debug logging removed
 
@@ -177,7 +169,7 @@ class Ui_SubcontractManager(QWidget):
                     continue
         else:
             # Fallback to payment links table (older method)
-            links = self.manager.get_sc_payment_links(sc_no)
+            links = dossier["payment_links"]
             # Use same columns but we will only fill IP and Remark; Applied/Accumulated blank
             self.table_payment.setColumnCount(4)
             self.table_payment.setHorizontalHeaderLabels(["IP", "Remark", "This Applied", "Accumulated"])
@@ -207,10 +199,8 @@ class Ui_SubcontractManager(QWidget):
                 pass
 
             # Prefer direct Sub Con Works table
-            try:
-                works = self.manager.get_sc_works(sc_no)
-            except Exception:
-                works = []
+            dossier = self.manager.get_dossier(sc_no)
+            works = dossier["works"]
 
             if works:
                 for w in works:
@@ -249,7 +239,7 @@ class Ui_SubcontractManager(QWidget):
                     self.table_works.setItem(row, 7, QTableWidgetItem(str(w.get('Trade', ''))))
             else:
                 # Fallback to older link table
-                links = self.manager.get_sc_works_links(sc_no)
+                links = dossier["works_links"]
                 for link in links:
                     row = self.table_works.rowCount()
                     self.table_works.insertRow(row)
@@ -302,47 +292,19 @@ class Ui_SubcontractManager(QWidget):
             except Exception:
                 pass
 
-            # Combine linked VO refs from SC VO Links table and direct SC VO records for the subcontract
-            vo_refs = []
-            try:
-                links = self.manager.get_sc_vo_links(sc_no)
-                for link in links:
-                    ref = link.get('VO ref')
-                    if ref and ref not in vo_refs:
-                        vo_refs.append(ref)
-            except Exception:
-                links = []
-
-            try:
-                direct_vos = self.manager.get_sc_vos(sc_no)
-                for vo in direct_vos:
-                    ref = vo.get('VO ref')
-                    if ref and ref not in vo_refs:
-                        vo_refs.append(ref)
-            except Exception:
-                direct_vos = []
-
-            # Populate rows for each referenced VO
-            for ref in vo_refs:
-                vo = None
-                try:
-                    vo = self.manager.get_sc_vo(ref)
-                except Exception:
-                    vo = None
-
+            # Linked VOs (SC VO Links) then the subcontract's own VOs, with their details, in one query
+            for vo in self.manager.get_dossier(sc_no)["vos"]:
+                ref = vo.get('VO ref')
                 row = self.table_vo.rowCount()
                 self.table_vo.insertRow(row)
                 # VO Ref
                 self.table_vo.setItem(row, 0, QTableWidgetItem(str(ref or '')))
-                # Description (from VO record if present)
-                desc = ''
-                if vo:
-                    desc = str(vo.get('Description', ''))
-                self.table_vo.setItem(row, 1, QTableWidgetItem(desc))
-
-                # Application Amount and Agree Amount from VO record when available
-                app_amt = vo.get('Application Amount', 0) if vo else 0
-                agree_amt = vo.get('Agree Amount', 0) if vo else 0
+                # Description (blank when a linked VO no longer exists)
+                self.table_vo.setItem(row, 1, QTableWidgetItem(str(vo.get('Description') or '')))
+
+                # Application Amount and Agree Amount from the VO record
+                app_amt = vo.get('Application Amount') or 0
+                agree_amt = vo.get('Agree Amount') or 0
                 try:
                     self.table_vo.setItem(row, 2, QTableWidgetItem(self.format_number(app_amt)))
                 except Exception:
@@ -352,15 +314,8 @@ class Ui_SubcontractManager(QWidget):
                 except Exception:
                     self.table_vo.setItem(row, 3, QTableWidgetItem(str(agree_amt)))
 
-                # Remark column: try to use link remark if present
-                remark = ''
-                try:
-                    for l in links:
-                        if l.get('VO ref') == ref:
-                            remark = str(l.get('Remark', ''))
-                            break
-                except Exception:
-                    pass
+                # Remark column: the link remark
+                remark = str(vo.get('Link Remark') or '')
                 self.table_vo.setItem(row, 4, QTableWidgetItem(remark))
 
             # Resize columns to contents for readability
@@ -498,11 +453,14 @@ class Ui_SubcontractManager(QWidget):
         self.refresh_list()
 
     def load_details(self, item):
+        # Unsaved edits must reach the database before the record is read back
+        Autosave_Queue.instance().flush(wait=True)
         # Prevent autosave while filling UI fields
         self.loading_details = True
         try:
             no = item.data(32)
-            rec = self.manager.get_subcontract(no)  # Need to add get_subcontract
+            # One dossier load feeds the header and every link table below
+            rec = self.manager.get_dossier(no)["subcontract"]
             if rec:
                 self.lineEdit_no.setText(rec['Sub Contract No'])
                 self.lineEdit_name.setText(rec['Sub Contract Name'])
@@ -806,19 +764,19 @@ class Ui_SubcontractManager(QWidget):
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to add contract type: {str(e)}")
 
-    def _start_autosave(self):
-        """Start or restart the autosave debounce timer."""
+    def show_save_status(self, text):
         try:
-            if self._autosave_timer:
-                self._autosave_timer.start(800)
+            if hasattr(self, 'label_save_status'):
+                self.label_save_status.setText(text)
+                QTimer.singleShot(1500, lambda: self.label_save_status.setText(''))
         except Exception:
             pass
 
     def auto_save_subcontract(self):
-        """Autosave the current subcontract detail fields into the database.
+        """Stage the changed subcontract detail fields on the autosave queue.
 
-        Only changed fields will be written to avoid overwriting concurrent changes from others.
-        Adds debug prints to help diagnose why Contract Type might not persist.
+        Only changed fields are written, to avoid overwriting concurrent changes from others;
+        the status label shows 'Saved' once the queue has committed them.
         """
         if getattr(self, 'loading_details', False):
             return
@@ -836,77 +794,27 @@ class Ui_SubcontractManager(QWidget):
 
         # Compute changed fields compared to the last loaded record (if available)
         base = getattr(self, '_loaded_rec', None)
-        if base:
-            changed = {}
-            for k, v in data.items():
-                if base.get(k) != v:
-                    changed[k] = v
+        if base and base.get('Sub Contract No') == sc_no:
+            changed = {k: v for k, v in data.items() if base.get(k) != v}
             if not changed:
-                # Nothing changed; show brief saved feedback and skip DB write
-                try:
-                    if hasattr(self, 'label_save_status'):
-                        self.label_save_status.setText('Saved')
-                        QTimer.singleShot(1500, lambda: self.label_save_status.setText(''))
-                except Exception:
-                    pass
                 return
         else:
             changed = data
+            base = self._loaded_rec = {'Sub Contract No': sc_no}
 
-        try:
-            rows = self.manager.update_subcontract(sc_no, changed)
+        # The cache now holds what the database will hold once the queue flushes
+        base.update(changed)
+        Autosave_Queue.instance().stage(self.manager, "update_subcontract", sc_no, changed,
+                                        on_saved=lambda *_: self.show_save_status('Saved'),
+                                        on_error=self.on_autosave_failed)
 
-            # verify saved by reloading record and checking changed fields
-            rec = None
-            try:
-                rec = self.manager.get_subcontract(sc_no)
-                mismatch = False
-                for k, v in changed.items():
-                    if not rec or rec.get(k) != v:
-                        mismatch = True
-                        break
-                if mismatch:
-                    # Try retrying single-field saves (helpful when one field is problematic)
-                    try:
-                        for k, v in changed.items():
-                            self.manager.update_subcontract(sc_no, {k: v})
-                    except Exception:
-                        pass
-                    rec2 = self.manager.get_subcontract(sc_no)
-                    for k, v in changed.items():
-                        if not rec2 or rec2.get(k) != v:
-                            QMessageBox.warning(self, "Save Failed", "Changes were not persisted to the database. Please try again or check DB schema.")
-                            if hasattr(self, 'label_save_status'):
-                                self.label_save_status.setText('Error')
-                                QTimer.singleShot(1500, lambda: self.label_save_status.setText(''))
-                            return
-            except Exception:
-                # get_subcontract failed after update - show warning
-                pass
+        # Update the list string for the item
+        if "Sub Contract Name" in changed:
+            current_item.setText(f"{sc_no} - {data['Sub Contract Name']}")
 
-            # Update the list string for the item
-            for i in range(self.recordList.count()):
-                item = self.recordList.item(i)
-                if item.data(32) == sc_no:
-                    item.setText(f"{sc_no} - {data['Sub Contract Name']}")
-                    break
-
-            # Show saved feedback
-            try:
-                if hasattr(self, 'label_save_status'):
-                    self.label_save_status.setText('Saved')
-                    QTimer.singleShot(1500, lambda: self.label_save_status.setText(''))
-            except Exception:
-                pass
-
-            # Update cached loaded record
-            if rec:
-                try:
-                    self._loaded_rec = rec.copy()
-                except Exception:
-                    self._loaded_rec = {k: rec.get(k) for k in ('Sub Contract No', 'Sub Contract Name', 'Company Name', 'Contract Type', 'Contract Sum', 'Final Account Amount')}
-        except Exception as e:
-            QMessageBox.critical(self, "Save Error", f"Failed to autosave: {e}")
+    def on_autosave_failed(self, sc_no, message):
+        self.show_save_status('Error')
+        QMessageBox.critical(self, "Save Error", f"Failed to autosave {sc_no}: {message}")
 
     def delete_contract_type(self):
         current = self.comboBox_type.currentText()
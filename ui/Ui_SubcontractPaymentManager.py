@@ -2,16 +2,23 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QSplitter, QList
                              QListWidgetItem, QFormLayout, QLabel, QLineEdit, QDateEdit, 
                              QDoubleSpinBox, QTextEdit, QTableWidget, QTableWidgetItem, 
                              QPushButton, QHeaderView, QMessageBox, QMenu, QAction, QComboBox)
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import Qt, QDate, QStringListModel
 from PyQt5.QtGui import QDoubleValidator, QColor
 import datetime
+from .Ui_PaymentManager import RefComboDelegate
 
 class Ui_SubcontractPaymentManager(QWidget):
+    # Item table reference columns -> lookup map; each amount column sits right after its ref
+    REF_COLUMNS = {2: "works", 4: "vo", 6: "cc"}
+    REF_FIELDS = {2: "Contract Work ref", 4: "VO ref", 6: "Contra Charge ref"}
+
     def __init__(self, manager, subcontract_manager):
         super().__init__()
         self.manager = manager
         self.subcontract_manager = subcontract_manager
         self.sub_contract_no = None
+        # Shared dropdown models for the item table, see ref_model
+        self.ref_models = {}
         self.init_ui()
         self.load_subcontracts()
 
@@ -41,6 +48,9 @@ class Ui_SubcontractPaymentManager(QWidget):
         ])
         self.item_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
         self.item_table.hideColumn(13)
+        # Reference dropdowns: one combobox while a cell is edited, on a model shared by all rows
+        for col, name in self.REF_COLUMNS.items():
+            self.item_table.setItemDelegateForColumn(col, RefComboDelegate(self, name))
 
         # Connect signals
         self.combo_subcontract.currentIndexChanged.connect(self.on_subcontract_changed)
@@ -178,11 +188,35 @@ class Ui_SubcontractPaymentManager(QWidget):
             self.refresh_item_table(ip_no)
         self.loading_item = False
 
+    def ref_model(self, name, refs):
+        """
+        One QStringListModel per reference list, shared by every dropdown editor in the
+        item table. Returns (model, {label: row}).
+        """
+        refs = [""] + refs
+        model, index = self.ref_models.get(name, (None, None))
+        if model is None:
+            model = QStringListModel(self)
+        if model.stringList() != refs:
+            model.setStringList(refs)
+            index = {ref: i for i, ref in enumerate(refs)}
+        self.ref_models[name] = (model, index)
+        return model, index
+
+    def amount_item(self, value):
+        item = QTableWidgetItem(self.format_number(value))
+        item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        return item
+
     def refresh_item_table(self, ip_no):
-        """Populate the items table using comboboxes for reference fields."""
+        """Populate the items table; refs and their amounts come from the subcontract's lookup maps."""
         self.loading_item = True
         self.item_table.setRowCount(0)
-        items = self.manager.get_ip_items(self.sub_contract_no, ip_no)
+        # Items joined to works / VO / contra charge amounts without a query per row
+        items = self.manager.get_ip_item_grid(self.sub_contract_no, ip_no)
+        for name, refs in self.manager.get_ref_labels(self.sub_contract_no).items():
+            self.ref_model(name, refs)
 
         # Check if this is the newest IP
         all_apps = self.manager.get_all_payment_applications(self.sub_contract_no)
@@ -192,16 +226,7 @@ class Ui_SubcontractPaymentManager(QWidget):
         else:
             is_newest_ip = True
 
-        # Get existing refs for dropdowns
-        works_refs = [""] + [w['Works'] for w in self.subcontract_manager.get_sc_works(self.sub_contract_no)]
-        vo_objs = self.subcontract_manager.get_sc_vos(self.sub_contract_no)
-        vo_refs = [""] + [f"{v['VO ref']} - {v.get('Description','')[:60]}" for v in vo_objs]
-        try:
-            cc_objs = self.subcontract_manager.db.fetch_all('SELECT * FROM "Contra Charge" WHERE "Deduct To" = ?', (self.sub_contract_no,))
-        except Exception:
-            cc_objs = []
-        cc_refs = [""] + [f"{c['CC No']} - {c.get('Title','')}" for c in cc_objs]
-
+        self.item_table.setUpdatesEnabled(False)
         self.item_table.setRowCount(len(items))
         for row, item_data in enumerate(items):
             # Item no and Type
@@ -209,84 +234,15 @@ class Ui_SubcontractPaymentManager(QWidget):
             self.item_table.item(row, 0).setFlags(self.item_table.item(row,0).flags() ^ Qt.ItemIsEditable)
             self.item_table.setItem(row, 1, QTableWidgetItem(item_data.get('Type','') or ""))
 
-            # Contract Work Ref (dropdown)
-            cw_combo = QComboBox()
-            cw_combo.addItems(works_refs)
-            current_cw = item_data.get('Contract Work Ref') or ""
-            cw_combo.setCurrentText(current_cw)
-            cw_combo.setEnabled(is_newest_ip)
-            if is_newest_ip:
-                cw_combo.currentTextChanged.connect(lambda text, r=row: self.on_ref_changed(r, 2, text))
-            self.item_table.setCellWidget(row, 2, cw_combo)
-
-            # Works Amount (computed)
-            work_amt = 0.0
-            if current_cw:
-                try:
-                    w = next((x for x in self.subcontract_manager.get_sc_works(self.sub_contract_no) if x['Works'] == current_cw), None)
-                    if w:
-                        qty = float(w.get('Qty') or 0)
-                        rate = float(w.get('Rate') or 0)
-                        discount = float(w.get('Discount') or 0)
-                        work_amt = qty * rate * (1 - discount)
-                except Exception:
-                    work_amt = 0.0
-            work_amt_item = QTableWidgetItem(self.format_number(work_amt))
-            work_amt_item.setFlags(work_amt_item.flags() & ~Qt.ItemIsEditable)
-            work_amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.item_table.setItem(row, 3, work_amt_item)
-
-            # VO Ref (dropdown with description)
-            vo_combo = QComboBox()
-            vo_combo.addItems(vo_refs)
-            current_vo = item_data.get('VO Ref') or ""
-            vo_display = next((ref for ref in vo_refs if ref.startswith(current_vo + " - ") or ref == current_vo), current_vo)
-            vo_combo.setCurrentText(vo_display)
-            vo_combo.setEnabled(is_newest_ip)
-            if is_newest_ip:
-                vo_combo.currentTextChanged.connect(lambda text, r=row: self.on_ref_changed(r, 4, text))
-            self.item_table.setCellWidget(row, 3, vo_combo)
-
-            # VO Amount (computed)
-            vo_amt = 0.0
-            if current_vo:
-                try:
-                    vo_key = current_vo.split(' - ')[0] if ' - ' in current_vo else current_vo
-                    v = self.subcontract_manager.get_sc_vo(vo_key)
-                    if v and v.get('Application Amount') is not None:
-                        vo_amt = float(v.get('Application Amount') or 0)
-                except Exception:
-                    vo_amt = 0.0
-            vo_amt_item = QTableWidgetItem(self.format_number(vo_amt))
-            vo_amt_item.setFlags(vo_amt_item.flags() & ~Qt.ItemIsEditable)
-            vo_amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.item_table.setItem(row, 5, vo_amt_item)
-
-            # Contra Charge Ref (dropdown with title)
-            cc_combo = QComboBox()
-            cc_combo.addItems(cc_refs)
-            current_cc = item_data.get('Contra Charge Ref') or ""
-            cc_display = next((ref for ref in cc_refs if ref.startswith(current_cc + " - ") or ref == current_cc), current_cc)
-            cc_combo.setCurrentText(cc_display)
-            cc_combo.setEnabled(is_newest_ip)
-            if is_newest_ip:
-                cc_combo.currentTextChanged.connect(lambda text, r=row: self.on_ref_changed(r, 6, text))
-            self.item_table.setCellWidget(row, 4, cc_combo)
-
-            # Contra Charge Amount (computed)
-            cc_amt = 0.0
-            if current_cc:
-                try:
-                    cc_key = current_cc.split(' - ')[0] if ' - ' in current_cc else current_cc
-                    rc = self.subcontract_manager.db.fetch_one('SELECT "Agree Amount" as amt FROM "Contra Charge" WHERE "CC No" = ?', (cc_key,))
-                    if rc and rc.get('amt') is not None:
-                        cc_amt = float(rc.get('amt') or 0)
-                except Exception:
-                    cc_amt = 0.0
-            cc_amt_item = QTableWidgetItem(self.format_number(cc_amt))
-            cc_amt_item.setFlags(cc_amt_item.flags() & ~Qt.ItemIsEditable)
-            cc_amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.item_table.setItem(row, 7, cc_amt_item)
+            # Contract Work / VO / Contra Charge refs (RefComboDelegate, editable on the newest IP only)
+            # and their amounts (computed, read-only)
+            for col, display, amount in ((2, 'Works Display', 'Works Amount'), (4, 'VO Display', 'VO Amount'),
+                                         (6, 'CC Display', 'Contra Charge Amount')):
+                ref_item = QTableWidgetItem(item_data[display])
+                if not is_newest_ip:
+                    ref_item.setFlags(ref_item.flags() & ~Qt.ItemIsEditable)
+                self.item_table.setItem(row, col, ref_item)
+                self.item_table.setItem(row, col + 1, self.amount_item(item_data[amount]))
 
             # Description
             self.item_table.setItem(row, 8, QTableWidgetItem(item_data.get('Description','') or ""))
@@ -312,91 +268,33 @@ class Ui_SubcontractPaymentManager(QWidget):
             self.item_table.setItem(row, 12, QTableWidgetItem(item_data.get('Remark','') or ""))
             self.item_table.setItem(row, 13, QTableWidgetItem(str(item_data.get('Item')))) # Hidden ID
 
+        self.item_table.setUpdatesEnabled(True)
         self.loading_item = False
 
     def on_ref_changed(self, row, col, text):
-        """Handle selection changes from reference comboboxes."""
-        # Extract key (before ' - ') if display includes description
-        ref_value = text.split(' - ')[0] if ' - ' in text else text
+        """Save a reference picked in a dropdown and show its amount."""
+        if col not in self.REF_FIELDS:
+            return
         try:
             item_no = int(self.item_table.item(row, 13).text())
         except Exception:
             return
 
-        data = {}
-        if col == 2:
-            data['Contract Work Ref'] = ref_value
-        elif col == 4:
-            data['VO Ref'] = ref_value
-        elif col == 6:
-            data['Contra Charge Ref'] = ref_value
-        else:
-            return
-
-        self.manager.update_ip_item(self.sub_contract_no, self.current_ip, item_no, data)
+        # Store the key (before ' - ') of the picked label
+        self.manager.update_ip_item(self.sub_contract_no, self.current_ip, item_no,
+                                    {self.REF_FIELDS[col]: self.manager.ref_key(text)})
         # Update computed amount columns for this row
         self.update_amount_cells(row)
 
     def update_amount_cells(self, row):
-        """Recompute works/VO/contra charge amount cells for a given row."""
-        try:
-            # Contract Work
-            cw_widget = self.item_table.cellWidget(row, 2)
-            current_cw = cw_widget.currentText() if cw_widget else ''
-            work_amt = 0.0
-            if current_cw:
-                try:
-                    cw_key = current_cw.split(' - ')[0] if ' - ' in current_cw else current_cw
-                    w = self.subcontract_manager.db.fetch_one('SELECT Qty, Rate, "Discount" FROM "Sub Con Works" WHERE Subcontract = ? AND Works = ?', (self.sub_contract_no, cw_key))
-                    if w:
-                        qty = float(w.get('Qty') or 0)
-                        rate = float(w.get('Rate') or 0)
-                        discount = float(w.get('Discount') or 0)
-                        work_amt = qty * rate * (1 - discount)
-                except Exception:
-                    work_amt = 0.0
-            work_amt_item = QTableWidgetItem(self.format_number(work_amt))
-            work_amt_item.setFlags(work_amt_item.flags() & ~Qt.ItemIsEditable)
-            work_amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.item_table.setItem(row, 3, work_amt_item)
-
-            # VO Amount
-            vo_widget = self.item_table.cellWidget(row, 3) if False else self.item_table.cellWidget(row, 3)  # placeholder; vo is at col 3 combo widget
-            # Actually VO combo is at col 3 (display) but VO amount is at col 5
-            vo_widget = self.item_table.cellWidget(row, 3)
-            current_vo = vo_widget.currentText() if vo_widget else ''
-            vo_amt = 0.0
-            if current_vo:
-                try:
-                    vo_key = current_vo.split(' - ')[0] if ' - ' in current_vo else current_vo
-                    v = self.subcontract_manager.get_sc_vo(vo_key)
-                    if v and v.get('Application Amount') is not None:
-                        vo_amt = float(v.get('Application Amount') or 0)
-                except Exception:
-                    vo_amt = 0.0
-            vo_amt_item = QTableWidgetItem(self.format_number(vo_amt))
-            vo_amt_item.setFlags(vo_amt_item.flags() & ~Qt.ItemIsEditable)
-            vo_amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.item_table.setItem(row, 5, vo_amt_item)
-
-            # Contra Charge Amount
-            cc_widget = self.item_table.cellWidget(row, 4)
-            current_cc = cc_widget.currentText() if cc_widget else ''
-            cc_amt = 0.0
-            if current_cc:
-                try:
-                    cc_key = current_cc.split(' - ')[0] if ' - ' in current_cc else current_cc
-                    rc = self.subcontract_manager.db.fetch_one('SELECT "Agree Amount" as amt FROM "Contra Charge" WHERE "CC No" = ?', (cc_key,))
-                    if rc and rc.get('amt') is not None:
-                        cc_amt = float(rc.get('amt') or 0)
-                except Exception:
-                    cc_amt = 0.0
-            cc_amt_item = QTableWidgetItem(self.format_number(cc_amt))
-            cc_amt_item.setFlags(cc_amt_item.flags() & ~Qt.ItemIsEditable)
-            cc_amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.item_table.setItem(row, 7, cc_amt_item)
-        except Exception:
-            pass
+        """Recompute works/VO/contra charge amount cells for a given row from the lookup maps."""
+        loading = self.loading_item
+        self.loading_item = True
+        for col, name in self.REF_COLUMNS.items():
+            ref_item = self.item_table.item(row, col)
+            _, amount, *_ = self.manager.lookup_ref(self.sub_contract_no, name, ref_item.text() if ref_item else "")
+            self.item_table.setItem(row, col + 1, self.amount_item(amount))
+        self.loading_item = loading
 
     def add_ip(self):
         if not self.sub_contract_no:
@@ -494,7 +392,12 @@ class Ui_SubcontractPaymentManager(QWidget):
             return # Row might be initializing
 
         # Columns: 0=Item, 1=Type, 2=CW Ref, 3=WorksAmt, 4=VO Ref, 5=VOAmt, 6=CC Ref, 7=CCAmt, 8=Desc, 9=Applied, 10=Cert, 11=Paid, 12=Remark
-        
+
+        # Reference columns (2,4,6) are edited through RefComboDelegate
+        if col in self.REF_FIELDS:
+            self.on_ref_changed(row, col, item.text())
+            return
+
         data = {}
         if col == 1:
             data["Type"] = item.text()
@@ -517,9 +420,8 @@ class Ui_SubcontractPaymentManager(QWidget):
                 self.loading_item = True
                 item.setText(self.format_number(self.parse_formatted_number(item.text())))
                 self.loading_item = False
-                # Also update totals if applied amount changed
-                if col == 9:
-                    self.calculate_totals()
+                # Header totals are kept current by the item triggers; just show them
+                self.refresh_totals()
 
     def auto_save_header(self):
         if self.loading_item or not self.current_ip or not self.sub_contract_no:
@@ -540,29 +442,18 @@ class Ui_SubcontractPaymentManager(QWidget):
         if not self.current_ip or not self.sub_contract_no:
             return
             
-        # 1. Sum up "Applied Amount" from all items in THIS IP
-        items = self.manager.get_ip_items(self.sub_contract_no, self.current_ip)
-        this_applied = sum(item["Applied Amount"] for item in items)
-        
-        # 2. Get "Accumulated Applied Amount" from PREVIOUS IP
-        prev_ip = self.current_ip - 1
-        prev_app = self.manager.get_payment_application(self.sub_contract_no, prev_ip)
-        prev_accumulated = prev_app["Accumulated Applied Amount"] if prev_app else 0.0
-        
-        # 3. Calculate New Accumulated
-        new_accumulated = prev_accumulated + this_applied
-        
-        # 4. Update Header
-        data = {
-            "This Applied Amount": this_applied,
-            "Previous Applied Amount": prev_accumulated,
-            "Accumulated Applied Amount": new_accumulated
-        }
-        self.manager.update_payment_application(self.sub_contract_no, self.current_ip, data)
-        
-        # 5. Refresh UI
+        # Recompute this IP and every later IP of the subcontract in SQL
+        self.manager.calculate_ip_totals(self.sub_contract_no, self.current_ip)
+        self.refresh_totals()
+
+    def refresh_totals(self):
+        """Show the current IP's Applied Amount totals without reloading the item table
+        (Certified/Paid are the header's own, possibly unsaved, values)."""
+        app = self.manager.get_payment_application(self.sub_contract_no, self.current_ip)
+        if not app:
+            return
         self.loading_item = True
-        self.spin_this.setText(self.format_number(this_applied))
-        self.spin_previous.setText(self.format_number(prev_accumulated))
-        self.spin_accumulated.setText(self.format_number(new_accumulated))
+        self.spin_this.setText(self.format_number(app["This Applied Amount"] or 0.0))
+        self.spin_previous.setText(self.format_number(app["Previous Applied Amount"] or 0.0))
+        self.spin_accumulated.setText(self.format_number(app["Accumulated Applied Amount"] or 0.0))
         self.loading_item = False